@@ -1,43 +1,183 @@
 """AI processing module for bias detection and rewriting"""
-from typing import List, Dict, Any, Tuple, Optional
-import re
+from typing import List, Dict, Any, Iterator, Sequence, Tuple, Optional
+import hashlib
+import os
+import numpy as np
 from textblob import TextBlob  # type: ignore
-from backend.models import BiasMetrics
-from backend.text_utils import clean_text, split_into_sections, compare_texts
+from backend.models import BiasMetrics, SourceCredibility
+from backend.batch import get_scorer
+from backend.cache import MemoryBackend
+from backend.document import Document
+from backend.domains import parse_source
+from backend.errors import APIError
+from backend.parallel import PARALLEL_THRESHOLD, get_pool
+from backend.providers import get_provider
+from backend.rewriter import get_rewriter
+from backend.similarity import get_index
+from backend.lexicon import BIAS_LEXICON, EMOTION_LEXICON, default_scanner
+from backend.metrics import stage
+from backend.text_utils import clean_text, compare_texts
+from backend.vector_math import OnlineStats
 
-def analyze_text(text: str) -> BiasMetrics:
+# Bump whenever analysis output changes so cached results are not reused
+ANALYZER_VERSION = '1.3.3'
+
+# Sentiment of recently seen sections, keyed by a hash of the section text
+_section_scores = MemoryBackend(max_entries=int(os.environ.get('SECTION_CACHE_SIZE', '50000')))
+
+def analyze_text(text: str, parallel: Optional[bool] = None, cleaned: bool = False) -> BiasMetrics:
     """
-    Analyze text for bias and sentiment.
+    Analyze text for bias and sentiment. Pass cleaned=True for text that
+    has already been through clean_text.
+
+    With parallel=None, documents with at least PARALLEL_SECTION_THRESHOLD
+    sections to score use the process pool when PARALLEL_WORKERS is set;
+    True uses the pool regardless of size and False never does.
     """
     metrics = BiasMetrics()
     
-    # Preprocess text
-    text = clean_text(text)
-    if not text:
+    # Clean once; sections are offsets into the cleaned text
+    document = Document(text, cleaned=cleaned)
+    if not document.text:
         return metrics
 
-    # Split text into manageable sections
-    sections = split_into_sections(text)
-    
     # Process each section
-    section_sentiments: List[float] = []
-    section_subjectivities: List[float] = []
+    sentiment_stats = OnlineStats()
+    subjectivity_stats = OnlineStats()
 
-    for section in sections:
+    with stage('sentiment', len(text)):
+        scores_by_section = _score_sections(document.sections, parallel)
+    for scores in scores_by_section:
+        if scores is None:
+            continue
+        sentiment_stats.add(scores[0])
+        subjectivity_stats.add(scores[1])
+
+    # Calculate average scores if we have any valid sections
+    if sentiment_stats.count:
+        metrics.sentiment_score = sentiment_stats.mean
+        metrics.subjectivity_score = subjectivity_stats.mean
+
+    return metrics
+
+def analyze_text_stream(text: str) -> Iterator[Dict[str, Any]]:
+    """
+    Analyze text section by section, yielding each section's results as soon
+    as it is scored and finishing with the aggregate metrics. Section and
+    highlight offsets refer to the text as given, before cleaning.
+    """
+    metrics = BiasMetrics()
+    document = Document(text)
+
+    sentiment_stats = OnlineStats()
+    subjectivity_stats = OnlineStats()
+
+    for index, section in enumerate(document.sections):
         try:
-            sentiment, subjectivity = _analyze_sentiment(section)
-            section_sentiments.append(sentiment)
-            section_subjectivities.append(subjectivity)
+            sentiment, subjectivity = _section_sentiment(section)
         except Exception as e:
             print(f"Error analyzing sentiment: {str(e)}")
             continue
+        sentiment_stats.add(sentiment)
+        subjectivity_stats.add(subjectivity)
 
-    # Calculate average scores if we have any valid sections
-    if section_sentiments:
-        metrics.sentiment_score = sum(section_sentiments) / len(section_sentiments)
-        metrics.subjectivity_score = sum(section_subjectivities) / len(section_subjectivities)
+        highlights = document.scan(index)
+        start, end = document.to_original(*document.section_span(index))
+        yield {
+            'type': 'section',
+            'index': index,
+            'total': len(document),
+            'start': start,
+            'end': end,
+            'sentiment_score': sentiment,
+            'subjectivity_score': subjectivity,
+            'bias_indicators': [hit['text'] for hit in highlights if hit['category'] in BIAS_LEXICON],
+            'emotional_language': [hit['text'] for hit in highlights if hit['category'] in EMOTION_LEXICON],
+            'highlights': highlights
+        }
 
-    return metrics
+    if sentiment_stats.count:
+        metrics.sentiment_score = sentiment_stats.mean
+        metrics.subjectivity_score = subjectivity_stats.mean
+
+    yield {'type': 'summary', 'metrics': metrics.to_dict()}
+
+def analyze_texts(texts: List[str]) -> List[BiasMetrics]:
+    """
+    Analyze a batch of texts for sentiment.
+
+    All sections of all documents are tokenized up front and scored together
+    with the vectorized lexicon scorer, which applies TextBlob's negation rule
+    but trades its intensifier handling for much lower per-document overhead.
+    """
+    results = [BiasMetrics() for _ in texts]
+
+    # Flatten every section of every document, remembering which document owns it
+    sections: List[str] = []
+    owners: List[int] = []
+    for i, text in enumerate(texts):
+        document = Document(text)
+        sections.extend(document.sections)
+        owners.extend([i] * len(document))
+
+    if not sections:
+        return results
+
+    polarity, subjectivity = get_scorer().score(sections)
+    owner_ids = np.asarray(owners, dtype=np.intp)
+    counts = np.bincount(owner_ids, minlength=len(texts))
+    pol_means = np.bincount(owner_ids, weights=polarity, minlength=len(texts)) / np.maximum(counts, 1)
+    subj_means = np.bincount(owner_ids, weights=subjectivity, minlength=len(texts)) / np.maximum(counts, 1)
+
+    for i, metrics in enumerate(results):
+        if counts[i]:
+            metrics.sentiment_score = float(pol_means[i])
+            metrics.subjectivity_score = float(subj_means[i])
+
+    return results
+
+def _score_sections(sections: Sequence[str], parallel: Optional[bool] = None) -> List[Optional[Tuple[float, float]]]:
+    """
+    Score sections in order, skipping any already in the section cache.
+    Sections that fail to score are returned as None.
+    """
+    keys = [_section_key(section) for section in sections]
+    results: List[Optional[Tuple[float, float]]] = [_section_scores.get(key) for key in keys]
+    pending = [i for i, scores in enumerate(results) if scores is None]
+
+    pool = get_pool() if parallel is not False else None
+    if pool is not None and (parallel or len(pending) >= PARALLEL_THRESHOLD):
+        computed = pool.map(_analyze_sentiment, [sections[i] for i in pending])
+    else:
+        computed = []
+        for i in pending:
+            try:
+                computed.append(_analyze_sentiment(sections[i]))
+            except Exception as e:
+                print(f"Error analyzing sentiment: {str(e)}")
+                computed.append(None)
+
+    for i, scores in zip(pending, computed):
+        results[i] = scores
+        if scores is not None:
+            _section_scores.set(keys[i], scores)
+    return results
+
+def _section_key(section: str) -> str:
+    return hashlib.blake2b(section.encode('utf-8'), digest_size=16).hexdigest()
+
+def _section_sentiment(section: str) -> Tuple[float, float]:
+    """
+    Return the sentiment of a section, reusing the score of an identical section.
+    Updated articles mostly resend unchanged paragraphs, so only edited
+    sections reach TextBlob.
+    """
+    key = _section_key(section)
+    scores = _section_scores.get(key)
+    if scores is None:
+        scores = _analyze_sentiment(section)
+        _section_scores.set(key, scores)
+    return scores
 
 def _analyze_sentiment(text: str) -> Tuple[float, float]:
     """
@@ -52,59 +192,42 @@ def _analyze_sentiment(text: str) -> Tuple[float, float]:
     
     return sentiment, subjectivity
 
-def detect_bias(text: str, source_url: Optional[str] = None) -> Dict[str, Any]:
+def detect_bias(text: str, source_url: Optional[str] = None, cleaned: bool = False) -> Dict[str, Any]:
     """
     Detect bias in text and provide context.
     """
+    if not cleaned:
+        with stage('clean_text', len(text)):
+            text = clean_text(text)
+    # One pass over the text serves both the bias and emotional language lists
+    with stage('lexicon_scan', len(text)):
+        hits = default_scanner.scan(text)
     context_results: Dict[str, Any] = {
-        'bias_indicators': _find_bias_indicators(text),
-        'emotional_language': _detect_emotional_language(text),
+        'bias_indicators': [hit.text for hit in hits if hit.category in BIAS_LEXICON],
+        'emotional_language': [hit.text for hit in hits if hit.category in EMOTION_LEXICON],
         'source_credibility': _check_source_credibility(source_url) if source_url else None,
         'perspective': _analyze_perspective(text)
     }
     return context_results
 
-def find_similar_articles(text: str, url: Optional[str] = None) -> List[Dict[str, Any]]:
+def find_similar_articles(text: str, url: Optional[str] = None, k: int = 10) -> List[Dict[str, Any]]:
     """
     Find articles similar to the input text.
+    Returns up to k indexed articles, most similar first, excluding the article's own url.
     """
-    # This is a placeholder for future implementation
-    # Would typically integrate with a search API or article database
-    return []
+    return get_index().search(clean_text(text), k=k, exclude_url=url)
 
-def _find_bias_indicators(text: str) -> List[str]:
+def index_article(text: str, url: str, title: Optional[str] = None) -> int:
     """
-    Find common indicators of bias in text.
+    Add an article to the similarity index so later searches can find it.
     """
-    bias_patterns = [
-        r'\b(always|never|everyone|nobody)\b',
-        r'\b(must|should|ought to)\b',
-        r'\b(obviously|clearly|undoubtedly)\b'
-    ]
-    
-    indicators: List[str] = []
-    for pattern in bias_patterns:
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        indicators.extend(match.group() for match in matches)
-    
-    return indicators
+    return get_index().add(clean_text(text), url, title)
 
-def _detect_emotional_language(text: str) -> List[str]:
+def source_credibility(url: str) -> Dict[str, Any]:
     """
-    Detect emotional language in text.
+    Credibility score of an article's source, with the reasons for it.
     """
-    # Placeholder for more sophisticated emotional language detection
-    emotional_words = [
-        r'\b(hate|love|angry|happy|sad|furious|delighted)\b',
-        r'\b(terrible|amazing|awful|wonderful|horrible)\b'
-    ]
-    
-    detected: List[str] = []
-    for pattern in emotional_words:
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        detected.extend(match.group() for match in matches)
-    
-    return detected
+    return _check_source_credibility(url)
 
 def _check_source_credibility(url: Optional[str]) -> Dict[str, Any]:
     """
@@ -112,11 +235,26 @@ def _check_source_credibility(url: Optional[str]) -> Dict[str, Any]:
     """
     if not url:
         return {'score': 0.0, 'reasons': ['No URL provided']}
-    
-    # Placeholder for more sophisticated source checking
+
+    source = parse_source(url)
+    if source is None:
+        return {'score': 0.0, 'reasons': ['Could not determine the domain of the URL']}
+
+    credibility = SourceCredibility()
+    rating = credibility.lookup(source)
+    if rating is None:
+        return {
+            'score': credibility.DEFAULT_SCORE,
+            'domain': source.registrable_domain or source.host,
+            'reasons': [f'No credibility rating for {source.registrable_domain or source.host}']
+        }
+    reasons = [f'Rated {rating.score:g} by {rating.source}' if rating.source else f'Rated {rating.score:g}']
+    if rating.domain != source.host:
+        reasons.append(f'Rating of {rating.domain} applied to {source.host}')
     return {
-        'score': 0.5,
-        'reasons': ['Generic credibility check - actual implementation needed']
+        'score': rating.score,
+        'domain': rating.domain,
+        'reasons': reasons
     }
 
 def _analyze_perspective(text: str) -> Dict[str, Any]:
@@ -130,34 +268,73 @@ def _analyze_perspective(text: str) -> Dict[str, Any]:
         'reasons': ['Generic perspective analysis - actual implementation needed']
     }
 
-def rewrite_text(text: str, target_metrics: Optional[Dict[str, float]] = None) -> str:
+def rewrite_text(text: str, target_metrics: Optional[Dict[str, float]] = None,
+                 api_key: Optional[str] = None, cleaned: bool = False) -> str:
     """
     Rewrite text to reduce bias while maintaining meaning.
+
+    Loaded phrases are replaced from the local rule table (backend/rewriter.py).
+    Sentences that still read as biased are sent to the remote rewrite provider
+    when an API key is available, either passed in or from OPENAI_API_KEY; if
+    that fails the local rewrite is returned.
+    """
+    return rewrite_text_with_fallback(text, api_key, cleaned)[0]
+
+def rewrite_text_with_fallback(text: str, api_key: Optional[str] = None,
+                               cleaned: bool = False) -> Tuple[str, bool]:
     """
-    # Placeholder for actual rewriting implementation
-    return text
+    Rewrite text like rewrite_text, also returning whether the remote
+    rewrite failed and the local rewrite was returned in its place.
+    """
+    if not cleaned:
+        text = clean_text(text)
+    result = get_rewriter().rewrite(text)
+    provider = get_provider()
+    if not result.residue or not provider.configured(api_key):
+        return result.text, False
+
+    try:
+        rewritten = provider.rewrite([result.text[start:end] for start, end in result.residue], api_key)
+    except APIError as e:
+        print(f"Error rewriting with remote provider: {e.message}")
+        return result.text, True
+    pieces = []
+    pos = 0
+    for (start, end), sentence in zip(result.residue, rewritten):
+        pieces.append(result.text[pos:start])
+        pieces.append(sentence)
+        pos = end
+    pieces.append(result.text[pos:])
+    return ''.join(pieces), False
 
-def analyze_and_rewrite(text: str) -> Dict[str, Any]:
+def analyze_and_rewrite(text: str, api_key: Optional[str] = None, cleaned: bool = False) -> Dict[str, Any]:
     """
-    Analyze text for bias and provide a rewritten version.
+    Analyze text for bias and provide a rewritten version. `rewrite_fallback`
+    is true when the remote rewrite failed and the local rewrite is given.
     """
+    if not cleaned:
+        with stage('clean_text', len(text)):
+            text = clean_text(text)
+
     # Analyze original text
-    metrics = analyze_text(text)
+    metrics = analyze_text(text, cleaned=True)
     
     # Get bias detection results
-    bias_results = detect_bias(text)
+    bias_results = detect_bias(text, cleaned=True)
     
-    # Attempt to rewrite if significant bias is detected
-    rewritten_text = text
-    if metrics.bias_score > 0.6 or metrics.subjectivity_score > 0.7:
-        rewritten_text = rewrite_text(text)
+    # Always rewrite: the local rule pass is cheap, and only the sentences it leaves
+    # with loaded language go to the remote provider
+    with stage('rewrite', len(text)):
+        rewritten_text, fallback = rewrite_text_with_fallback(text, api_key, cleaned=True)
     
     # Compare original and rewritten text
-    diff = compare_texts(text, rewritten_text)
+    with stage('compare_texts', len(text)):
+        diff = compare_texts(text, rewritten_text)
     
     return {
         'original_metrics': metrics.to_dict(),
         'bias_detection': bias_results,
         'rewritten_text': rewritten_text,
+        'rewrite_fallback': fallback,
         'diff': diff
     }
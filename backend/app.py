@@ -1,13 +1,26 @@
 """Backend application module with API routes"""
-from typing import Union, Dict, Any
-from flask import Flask, request, jsonify, Response
+from typing import Union, Dict, Any, Iterator
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+import hashlib
+import json
 import logging
 import os
 import sys
 import secrets
-from backend.ai_processor import analyze_text, rewrite_text, analyze_and_rewrite
-from backend.errors import ValidationError, handle_error
+from backend.ai_processor import (
+    ANALYZER_VERSION, analyze_text, analyze_texts, analyze_text_stream,
+    rewrite_text, analyze_and_rewrite, find_similar_articles, index_article, source_credibility
+)
+from backend.cache import ResultCache, create_backend
+from backend.errors import BiasDetectorError, ValidationError, handle_error
+from backend.extraction import EXTRACTOR_VERSION, extract_article
+from backend.jobs import JobQueue, JobStore
+from backend.metrics import stage
+from backend.tracing import install as install_tracing
+from backend.singleflight import FileLockStore, SingleFlight
+from backend.text_utils import clean_text, compare_texts, normalize_whitespace
+from backend.warmup import warmup_status
 
 # Configure logging with more detailed format
 logging.basicConfig(
@@ -32,7 +45,98 @@ CORS(app,
      origins=os.environ.get('ALLOWED_ORIGINS', '*'),
      supports_credentials=True,
      methods=['GET', 'POST', 'OPTIONS'],
-     allow_headers=['Content-Type', 'X-OpenAI-Key'])
+     allow_headers=['Content-Type', 'X-OpenAI-Key', 'X-Trace'],
+     expose_headers=['Server-Timing'])
+
+# Requests sent with X-Trace: 1 get a Server-Timing header of their pipeline stages
+install_tracing(app)
+
+# Upper bound on documents accepted by a single batch request
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', '1000'))
+
+# Cache of endpoint results keyed by cleaned content; use the disk backend to share it between workers.
+# Identical requests arriving together are computed once per worker, or once per host with a lock file.
+result_cache = ResultCache(
+    create_backend(
+        os.environ.get('RESULT_CACHE_BACKEND', 'memory'),
+        path=os.environ.get('RESULT_CACHE_PATH'),
+        max_entries=int(os.environ.get('RESULT_CACHE_SIZE', '1024')),
+        default_ttl=float(os.environ.get('RESULT_CACHE_TTL', '3600'))
+    ),
+    version=ANALYZER_VERSION,
+    flights=SingleFlight(
+        FileLockStore(os.environ['SINGLE_FLIGHT_LOCK_PATH'],
+                      timeout=float(os.environ.get('SINGLE_FLIGHT_TIMEOUT', '30')))
+        if os.environ.get('SINGLE_FLIGHT_LOCK_PATH') else None
+    )
+)
+
+# Extracted article text keyed by a hash of the page's html
+extraction_cache = ResultCache(
+    create_backend(
+        os.environ.get('RESULT_CACHE_BACKEND', 'memory'),
+        path=os.environ.get('EXTRACTION_CACHE_PATH', 'cache/extraction.sqlite3'),
+        max_entries=int(os.environ.get('EXTRACTION_CACHE_SIZE', '256')),
+        default_ttl=float(os.environ.get('RESULT_CACHE_TTL', '3600'))
+    ),
+    name='extraction',
+    version=EXTRACTOR_VERSION
+)
+
+# Background queue for rewrites and comparisons that are too slow to run inside a request
+job_queue = JobQueue(
+    JobStore(os.environ.get('JOB_STORE_PATH', 'cache/jobs.sqlite3')),
+    workers=int(os.environ.get('JOB_WORKERS', '2')),
+    max_pending=int(os.environ.get('JOB_MAX_PENDING', '100'))
+)
+# Longest a GET on a job may block waiting for it to finish
+MAX_JOB_WAIT = float(os.environ.get('JOB_MAX_WAIT', '30'))
+
+def _require(payload: Dict[str, Any], *fields: str) -> None:
+    for field in fields:
+        if not payload.get(field):
+            raise ValidationError(f"No {field} provided")
+
+def _article_text(data: Dict[str, Any]) -> str:
+    """
+    Cleaned article text of a request: its `content`, or the main content
+    extracted from its raw `html`
+    """
+    html = data.get('html')
+    if html:
+        if not isinstance(html, str):
+            raise ValidationError("Article html must be a string")
+        # Keyed by the page itself (plus the URL the extractor is given): keying on
+        # a client-supplied URL and ETag let one client's html be served for another's page
+        url = data.get('url')
+        key = extraction_cache.make_key('html', f"{url or ''}\0{html}")
+        with stage('extraction', len(html)):
+            extracted = extraction_cache.get_or_compute(key, lambda: extract_article(html, url=url))
+        # Extracted text has no markup left and its entities are decoded, so it is not
+        # cleaned again: that would strip an escaped tag such as "&lt;b&gt;" as markup
+        return normalize_whitespace(extracted['text'])
+
+    content = data.get('content')
+    if not content:
+        raise ValidationError("No article content provided")
+    return clean_text(content)
+
+def _rewrite_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"rewritten_content": rewrite_text(payload['content'], payload['bias_analysis'])}
+
+def _analyze_and_rewrite_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return analyze_and_rewrite(payload['content'])
+
+def _compare_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"diff": compare_texts(payload['original'], payload['rewritten'])}
+
+JOB_TYPES = {
+    'rewrite': (_rewrite_job, ('content', 'bias_analysis')),
+    'analyze_and_rewrite': (_analyze_and_rewrite_job, ('content',)),
+    'compare': (_compare_job, ('original', 'rewritten')),
+}
+for _kind, (_handler, _) in JOB_TYPES.items():
+    job_queue.register(_kind, _handler)
 
 # Register error handlers
 @app.errorhandler(Exception)
@@ -113,9 +217,15 @@ def index():
                 <h2>API Endpoints</h2>
                 <ul>
                     <li><code>/health</code> - Health check endpoint</li>
+                    <li><code>/ready</code> - Readiness probe, healthy once warm-up has finished</li>
                     <li><code>/analyze</code> - Analyze article content for bias</li>
                     <li><code>/rewrite</code> - Rewrite article to present balanced viewpoint</li>
                     <li><code>/analyze_and_rewrite</code> - Analyze and rewrite in one step</li>
+                    <li><code>/api/v2/analyze/batch</code> - Analyze many articles in one request</li>
+                    <li><code>/api/v2/analyze/stream</code> - Stream per-section results as they are computed</li>
+                    <li><code>/api/v2/jobs</code> - Queue a rewrite or comparison and poll for its result</li>
+                    <li><code>/api/v2/similar</code> - Find indexed articles similar to a given article</li>
+                    <li><code>/api/v2/source-credibility</code> - Credibility rating of an article's source</li>
                     <li><code>/demo</code> - Interactive demo with sample article</li>
                 </ul>
             </div>
@@ -134,12 +244,19 @@ def health_check():
     """Health check endpoint for the API"""
     return jsonify({"status": "healthy", "message": "Bias Detector API is running"})
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe; fails until models and lexicons have been warmed up"""
+    status = warmup_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 @app.route('/analyze', methods=['POST'])
 def analyze() -> tuple[Response, int]:
     """
     Analyze article content for bias
     
     Expected JSON payload: {"url": "article_url", "content": "article_content"}
+    or {"url": "article_url", "html": "raw_page_html"}
     
     Returns:
         tuple[Response, int]: JSON response with analysis results and HTTP status code
@@ -153,14 +270,17 @@ def analyze() -> tuple[Response, int]:
         if not data:
             raise ValidationError("No JSON data provided")
             
-        content = data.get('content')
-        if not content:
-            raise ValidationError("No article content provided")
-            
-        context = {"url": data.get('url')} if data.get('url') else None
-        analysis = analyze_text(content, context)
+        text = _article_text(data)
+        analysis = result_cache.get_or_compute(
+            result_cache.make_key('analyze', text),
+            lambda: analyze_text(text, cleaned=True).to_dict()
+        )
+        if data.get('html'):
+            analysis = {**analysis, "content": text}
         
-        return jsonify(analysis), 200
+        with stage('serialization', len(text)):
+            response = jsonify(analysis)
+        return response, 200
     
     except ValidationError as e:
         return jsonify({"error": str(e)}), 400
@@ -187,7 +307,7 @@ def rewrite():
         if not analysis:
             raise ValidationError("No bias analysis provided")
             
-        rewritten = rewrite_text(content, analysis)
+        rewritten = rewrite_text(content, analysis, api_key=request.headers.get('X-OpenAI-Key') or None)
         
         return jsonify({
             "rewritten_content": rewritten
@@ -204,23 +324,238 @@ def analyze_and_rewrite_endpoint():
     """
     Analyze article for bias and rewrite it in one step
     Expected JSON payload: {"url": "article_url", "content": "article_content"}
+    or {"url": "article_url", "html": "raw_page_html"}
     """
     try:
         data = request.get_json()
         if not data:
             raise ValidationError("No JSON data provided")
             
-        content = data.get('content')
-        if not content:
-            raise ValidationError("No article content provided")
-            
-        context = {"url": data.get('url')} if data.get('url') else None
-        result = analyze_and_rewrite(content, context)
+        text = _article_text(data)
+        api_key = request.headers.get('X-OpenAI-Key') or None
+        # Results rewritten with a caller's key are cached (and coalesced) per key, so an
+        # arbitrary header cannot read results paid for with someone else's key. Results
+        # whose remote rewrite failed are not cached, so the failure is not replayed.
+        namespace = 'analyze_and_rewrite'
+        if api_key:
+            namespace += ':key:' + hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:32]
+        result = result_cache.get_or_compute(
+            result_cache.make_key(namespace, text),
+            lambda: analyze_and_rewrite(text, api_key, cleaned=True),
+            cacheable=lambda result: not result['rewrite_fallback']
+        )
+        if data.get('html'):
+            result = {**result, "content": text}
         
-        return jsonify(result), 200
+        with stage('serialization', len(text)):
+            response = jsonify(result)
+        return response, 200
     
     except ValidationError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         logger.exception("Error in analyze_and_rewrite endpoint")
         return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/v2/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """
+    Analyze a batch of articles in one call
+    Expected JSON payload: {"contents": ["article_content", ...]}
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            raise ValidationError("No JSON data provided")
+
+        contents = data.get('contents')
+        if not isinstance(contents, list) or not contents:
+            raise ValidationError("No article contents provided")
+        if len(contents) > MAX_BATCH_SIZE:
+            raise ValidationError(f"Batch size exceeds limit of {MAX_BATCH_SIZE}")
+        if not all(isinstance(content, str) for content in contents):
+            raise ValidationError("Article contents must be strings")
+
+        results = analyze_texts(contents)
+
+        return jsonify({"results": [metrics.to_dict() for metrics in results]}), 200
+
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in analyze_batch endpoint")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/v2/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """
+    Analyze article content, streaming results for each section as it finishes
+    Expected JSON payload: {"content": "article_content"}
+
+    Responds with newline-delimited JSON, or Server-Sent Events when the
+    client sends "Accept: text/event-stream". The last record has type "summary".
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            raise ValidationError("No JSON data provided")
+
+        content = data.get('content')
+        if not content:
+            raise ValidationError("No article content provided")
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    use_sse = request.accept_mimetypes.best == 'text/event-stream'
+
+    def generate() -> Iterator[str]:
+        try:
+            for event in analyze_text_stream(content):
+                payload = json.dumps(event)
+                yield f"event: {event['type']}\ndata: {payload}\n\n" if use_sse else payload + "\n"
+        except Exception as e:
+            logger.exception("Error in analyze_stream endpoint")
+            payload = json.dumps({"type": "error", "error": str(e)})
+            yield f"event: error\ndata: {payload}\n\n" if use_sse else payload + "\n"
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream' if use_sse else 'application/x-ndjson'
+    )
+    # Keep proxies from buffering the stream
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@app.route('/api/v2/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue a rewrite or comparison to run in the background
+    Expected JSON payload: {"type": "rewrite" | "analyze_and_rewrite" | "compare",
+                            "priority": 0-9 (optional, lower runs first), ...fields for the type}
+
+    Returns 202 with the job id; fetch the result from /api/v2/jobs/<job_id>.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            raise ValidationError("No JSON data provided")
+
+        kind = data.get('type')
+        if kind not in JOB_TYPES:
+            raise ValidationError(f"Unknown job type, expected one of: {', '.join(sorted(JOB_TYPES))}")
+        _, fields = JOB_TYPES[kind]
+        _require(data, *fields)
+
+        try:
+            priority = int(data.get('priority', 5))
+        except (TypeError, ValueError):
+            raise ValidationError("Priority must be an integer")
+
+        job = job_queue.submit(kind, {field: data[field] for field in fields}, priority=max(0, min(9, priority)))
+
+        response = jsonify({"job_id": job['id'], "status": job['status']})
+        response.headers['Location'] = f"/api/v2/jobs/{job['id']}"
+        return response, 202
+
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except BiasDetectorError as e:
+        return handle_error(e)
+    except Exception as e:
+        logger.exception("Error in submit_job endpoint")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/v2/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """
+    Get the status and, once finished, the result of a queued job
+    Pass ?wait=<seconds> to block until the job finishes or the wait expires.
+    """
+    try:
+        wait = max(0.0, min(MAX_JOB_WAIT, float(request.args.get('wait', 0))))
+    except ValueError:
+        return jsonify({"error": "wait must be a number of seconds"}), 400
+
+    job = job_queue.get(job_id, wait=wait)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
+
+
+@app.route('/api/v2/similar', methods=['POST'])
+def similar_articles():
+    """
+    Find indexed articles similar to the given article
+    Expected JSON payload: {"content": "article_content", "url": "article_url" (optional), "k": 10 (optional)}
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            raise ValidationError("No JSON data provided")
+
+        content = data.get('content')
+        if not content:
+            raise ValidationError("No article content provided")
+
+        try:
+            k = max(1, min(100, int(data.get('k', 10))))
+        except (TypeError, ValueError):
+            raise ValidationError("k must be an integer")
+
+        return jsonify({"similar_articles": find_similar_articles(content, data.get('url'), k=k)}), 200
+
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in similar_articles endpoint")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/v2/similar/index', methods=['POST'])
+def index_similar_article():
+    """
+    Add an article to the similarity index
+    Expected JSON payload: {"content": "article_content", "url": "article_url", "title": "article_title" (optional)}
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            raise ValidationError("No JSON data provided")
+
+        content = data.get('content')
+        if not content:
+            raise ValidationError("No article content provided")
+        url = data.get('url')
+        if not url:
+            raise ValidationError("No article url provided")
+
+        row = index_article(content, url, data.get('title'))
+        return jsonify({"indexed": True, "id": row}), 200
+
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in index_similar_article endpoint")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/v2/source-credibility', methods=['GET'])
+def check_source_credibility():
+    """
+    Look up the credibility rating of an article's source
+    Expected query string: ?url=article_url
+    """
+    try:
+        url = request.args.get('url')
+        if not url:
+            raise ValidationError("No url provided")
+
+        return jsonify(source_credibility(url)), 200
+
+    except ValidationError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Error in check_source_credibility endpoint")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,96 @@
+"""Vectorized sentiment scoring for batches of text sections"""
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+(?:['’]\w+)*")
+
+# TextBlob's negations: a lexicon word right after one scores -0.5 times its polarity
+NEGATIONS = ('no', 'not', "n't", 'never')
+
+class LexiconSentiment:
+    """
+    Polarity/subjectivity scorer built on TextBlob's sentiment lexicon.
+
+    Every token of every section is mapped to a lexicon index up front and the
+    per-section scores are then reduced with NumPy, so a batch costs one pass
+    over the tokens instead of one TextBlob per section. Like TextBlob, a
+    section scores the mean of its lexicon words and a word right after a
+    negation ("not good") has its polarity multiplied by -0.5; unlike TextBlob,
+    intensifiers are not applied, so scores are an approximation.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, Tuple[float, float]]] = None) -> None:
+        if lexicon is None:
+            lexicon = _load_textblob_lexicon()
+        # Index 0 is reserved for tokens that are not in the lexicon
+        self.vocabulary: Dict[str, int] = {}
+        polarity = [0.0]
+        subjectivity = [0.0]
+        for word, (pol, subj) in lexicon.items():
+            self.vocabulary[word] = len(polarity)
+            polarity.append(pol)
+            subjectivity.append(subj)
+        scored = len(polarity)
+        for word in NEGATIONS:
+            if word not in self.vocabulary:
+                self.vocabulary[word] = len(polarity)
+                polarity.append(0.0)
+                subjectivity.append(0.0)
+        self.polarity = np.asarray(polarity, dtype=np.float64)
+        self.subjectivity = np.asarray(subjectivity, dtype=np.float64)
+        self.scored = np.arange(len(polarity)) < scored
+        self.scored[0] = False
+        self.negation = np.zeros(len(polarity), dtype=bool)
+        self.negation[[self.vocabulary[word] for word in NEGATIONS]] = True
+
+    def score(self, sections: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Return arrays of (polarity, subjectivity), one entry per section"""
+        vocabulary = self.vocabulary
+        token_ids: List[int] = []
+        section_ids: List[int] = []
+        for i, section in enumerate(sections):
+            # Like TextBlob, a negation carries over one-letter words ("not a good")
+            ids = [vocabulary.get(tok, 0) for tok in _TOKEN_RE.findall(section.lower())
+                   if len(tok) > 1 or tok in vocabulary]
+            token_ids.extend(ids)
+            section_ids.extend([i] * len(ids))
+
+        n = len(sections)
+        ids_arr = np.asarray(token_ids, dtype=np.intp)
+        owners = np.asarray(section_ids, dtype=np.intp)
+        negated = np.zeros(len(ids_arr), dtype=bool)
+        negated[1:] = self.negation[ids_arr[:-1]] & (owners[1:] == owners[:-1])
+        known = self.scored[ids_arr]
+        ids_arr, owners = ids_arr[known], owners[known]
+        sign = np.where(negated[known], -0.5, 1.0)
+
+        counts = np.bincount(owners, minlength=n)
+        pol_sum = np.bincount(owners, weights=self.polarity[ids_arr] * sign, minlength=n)
+        subj_sum = np.bincount(owners, weights=self.subjectivity[ids_arr], minlength=n)
+        safe = np.maximum(counts, 1)
+        return pol_sum / safe, subj_sum / safe
+
+def _load_textblob_lexicon() -> Dict[str, Tuple[float, float]]:
+    """Read the averaged (polarity, subjectivity) of each word in TextBlob's lexicon"""
+    from textblob.en import sentiment  # type: ignore
+
+    lexicon: Dict[str, Tuple[float, float]] = {}
+    for word, senses in sentiment.items():
+        averaged = senses.get(None)
+        if averaged:
+            lexicon[word] = (float(averaged[0]), float(averaged[1]))
+    return lexicon
+
+_scorer: Optional[LexiconSentiment] = None
+_scorer_lock = threading.Lock()
+
+def get_scorer() -> LexiconSentiment:
+    """Return the shared scorer, building it on first use"""
+    global _scorer
+    if _scorer is None:
+        with _scorer_lock:
+            if _scorer is None:
+                _scorer = LexiconSentiment()
+    return _scorer
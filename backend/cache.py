@@ -0,0 +1,236 @@
+"""Result caching for analysis endpoints"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.singleflight import SingleFlight
+
+# Listeners are called with (cache_name, event) where event is 'hit' or 'miss'
+CacheListener = Callable[[str, str], None]
+
+class CacheBackend:
+    """Interface shared by cache storage backends"""
+
+    def get(self, key: str) -> Any:
+        """Return the cached value, or None if absent or expired"""
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+class MemoryBackend(CacheBackend):
+    """Thread-safe in-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: Optional[float] = None) -> None:
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, Tuple[Optional[float], Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class DiskBackend(CacheBackend):
+    """
+    SQLite-backed cache shared by every process that opens the same file.
+
+    Entries carry an absolute expiry time and a last-access time; when the
+    table grows past max_entries the least recently used rows are evicted.
+    """
+
+    def __init__(self, path: str, max_entries: int = 10000, default_ttl: Optional[float] = None) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL, accessed REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)')
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Any:
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires is not None and expires <= now:
+            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+            return None
+        conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+        return pickle.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.default_ttl if ttl is None else ttl
+        now = time.time()
+        expires = now + ttl if ttl else None
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires, accessed) VALUES (?, ?, ?, ?)',
+                (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), expires, now)
+            )
+            (count,) = conn.execute('SELECT COUNT(*) FROM cache').fetchone()
+            if count > self.max_entries:
+                conn.execute('DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?', (now,))
+                conn.execute(
+                    'DELETE FROM cache WHERE key IN '
+                    '(SELECT key FROM cache ORDER BY accessed ASC LIMIT max(0, (SELECT COUNT(*) FROM cache) - ?))',
+                    (self.max_entries,)
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def delete(self, key: str) -> None:
+        self._connect().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self) -> None:
+        self._connect().execute('DELETE FROM cache')
+
+    def __len__(self) -> int:
+        (count,) = self._connect().execute('SELECT COUNT(*) FROM cache').fetchone()
+        return int(count)
+
+class ResultCache:
+    """
+    Content-addressed cache of analysis results with hit/miss accounting.
+    Concurrent misses for the same key are computed once (see SingleFlight).
+    """
+
+    def __init__(self, backend: CacheBackend, name: str = 'results', version: str = '',
+                 flights: Optional[SingleFlight] = None) -> None:
+        self.backend = backend
+        self.name = name
+        self.version = version
+        self.flights = flights or SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self._listeners: List[CacheListener] = []
+
+    def add_listener(self, listener: CacheListener) -> None:
+        """Register a callback notified of every hit and miss"""
+        self._listeners.append(listener)
+
+    def make_key(self, namespace: str, content: str) -> str:
+        """Hash content together with the analyzer version and a namespace"""
+        digest = hashlib.sha256()
+        for part in (self.version, namespace, content):
+            digest.update(part.encode('utf-8'))
+            digest.update(b'\0')
+        return f"{namespace}:{digest.hexdigest()}"
+
+    def get(self, key: str) -> Any:
+        value = self.backend.get(key)
+        self._record('miss' if value is None else 'hit')
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.backend.set(key, value, ttl)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the cached value for key, computing and storing it on a miss.
+        A computed value for which cacheable() is false is returned but not stored.
+        """
+        value = self.get(key)
+        if value is None:
+            value = self.flights.do(key, lambda: self._compute(key, compute, ttl, cacheable))
+        return value
+
+    def _compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float],
+                 cacheable: Optional[Callable[[Any], bool]]) -> Any:
+        # With cross-process locking, another worker may have stored the value while we waited
+        value = self.backend.get(key) if self.flights.lock_store is not None else None
+        if value is None:
+            value = compute()
+            if cacheable is None or cacheable(value):
+                self.set(key, value, ttl)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'coalesced': self.flights.coalesced,
+                'entries': len(self.backend)}
+
+    def _record(self, event: str) -> None:
+        if event == 'hit':
+            self.hits += 1
+        else:
+            self.misses += 1
+        for listener in self._listeners:
+            try:
+                listener(self.name, event)
+            except Exception:
+                pass
+
+def create_backend(kind: str = 'memory', path: Optional[str] = None,
+                   max_entries: int = 1024, default_ttl: Optional[float] = None) -> CacheBackend:
+    """Build a cache backend by name ('memory' or 'disk')"""
+    if kind == 'memory':
+        return MemoryBackend(max_entries=max_entries, default_ttl=default_ttl)
+    if kind == 'disk':
+        return DiskBackend(path or 'cache/results.sqlite3', max_entries=max_entries, default_ttl=default_ttl)
+    raise ValueError(f"Unknown cache backend: {kind}")
@@ -0,0 +1,255 @@
+"""Persistent source credibility ratings shared by every worker process"""
+import argparse
+import atexit
+import csv
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from backend.cache import MemoryBackend
+from backend.domains import CompactDomainTrie, DomainTrie, normalize_host
+
+class Rating(NamedTuple):
+    domain: str
+    score: float
+    source: Optional[str]
+
+class CredibilityStore:
+    """
+    Domain ratings in a SQLite file, read through an in-process LRU.
+
+    Ratings are written with an upsert, so concurrent workers never lose each
+    other's updates. Lookups of unrated domains are counted in memory and
+    written in batches, so operators can see what needs a rating without a
+    write per request. The LRU entries expire after `cache_ttl` seconds so
+    that ratings changed by other processes are picked up.
+    """
+
+    def __init__(self, path: str, cache_size: int = 10000, cache_ttl: float = 300.0,
+                 batch_size: int = 100, flush_interval: float = 5.0) -> None:
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._cache = MemoryBackend(max_entries=cache_size, default_ttl=cache_ttl)
+        self._local = threading.local()
+        self._pending: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        # Newest rating write seen, re-read from the table at most every cache_ttl seconds
+        self._latest_update: Optional[float] = None
+        self._latest_checked = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS ratings ('
+            'domain TEXT PRIMARY KEY, score REAL NOT NULL, source TEXT, updated REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ratings_updated ON ratings (updated)')
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS unrated ('
+            'domain TEXT PRIMARY KEY, lookups INTEGER NOT NULL, first_seen REAL NOT NULL, last_seen REAL NOT NULL)'
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, domain: str) -> Optional[Rating]:
+        """Return the domain's rating, or None if it has not been rated"""
+        domain = domain.lower()
+        cached = self._cache.get(domain)
+        if cached is None:
+            row = self._connect().execute(
+                'SELECT score, source FROM ratings WHERE domain = ?', (domain,)
+            ).fetchone()
+            # Unrated domains are cached too, as (None, None)
+            cached = (row[0], row[1]) if row else (None, None)
+            self._cache.set(domain, cached)
+        score, source = cached
+        return Rating(domain, score, source) if score is not None else None
+
+    def updated_since(self, timestamp: float) -> bool:
+        """Whether a rating has been written after timestamp (a time.time() value)"""
+        now = time.monotonic()
+        if self._latest_update is None or now - self._latest_checked >= self.cache_ttl:
+            (latest,) = self._connect().execute('SELECT MAX(updated) FROM ratings').fetchone()
+            self._latest_update = max(latest or 0.0, self._latest_update or 0.0)
+            self._latest_checked = now
+        return self._latest_update > timestamp
+
+    def record_unrated(self, domain: str) -> None:
+        """Count a lookup of an unrated domain; written with the next batch"""
+        with self._pending_lock:
+            self._pending[domain.lower()] = self._pending.get(domain.lower(), 0) + 1
+            due = len(self._pending) >= self.batch_size or \
+                time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write buffered unrated-domain counts"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return
+        now = time.time()
+        self._transaction(
+            'INSERT INTO unrated (domain, lookups, first_seen, last_seen) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(domain) DO UPDATE SET lookups = lookups + excluded.lookups, last_seen = excluded.last_seen',
+            [(domain, count, now, now) for domain, count in pending.items()]
+        )
+
+    def set(self, domain: str, score: float, source: Optional[str] = None) -> None:
+        self.import_ratings([(domain, score)], source)
+
+    def import_ratings(self, ratings: Iterable[Tuple[str, float]], source: Optional[str] = None,
+                       chunk_size: int = 10000) -> int:
+        """
+        Upsert (domain, score) pairs, chunk_size rows per transaction, and
+        return how many were written. Domains are normalized as lookups are
+        (lower case, IDNA, no leading www.). Imported domains leave the
+        unrated list.
+        """
+        written = 0
+        chunk: List[Tuple[Any, ...]] = []
+        for domain, score in ratings:
+            chunk.append((normalize_host(domain), float(score), source, time.time()))
+            if len(chunk) >= chunk_size:
+                written += self._write_ratings(chunk)
+                chunk = []
+        if chunk:
+            written += self._write_ratings(chunk)
+        return written
+
+    def _write_ratings(self, rows: List[Tuple[Any, ...]]) -> int:
+        self._transaction(
+            'INSERT INTO ratings (domain, score, source, updated) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(domain) DO UPDATE SET score = excluded.score, source = excluded.source, '
+            'updated = excluded.updated',
+            rows,
+            ('DELETE FROM unrated WHERE domain = ?', [(row[0],) for row in rows])
+        )
+        for row in rows:
+            self._cache.delete(row[0])
+        self._latest_update = max(self._latest_update or 0.0, max(row[3] for row in rows))
+        return len(rows)
+
+    def _transaction(self, sql: str, rows: List[Tuple[Any, ...]], *more: Tuple[str, List[Tuple[Any, ...]]]) -> None:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(sql, rows)
+            for extra_sql, extra_rows in more:
+                conn.executemany(extra_sql, extra_rows)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def unrated(self, limit: int = 100) -> Iterator[Tuple[str, int]]:
+        """Most looked-up unrated domains as (domain, lookups)"""
+        self.flush()
+        yield from self._connect().execute(
+            'SELECT domain, lookups FROM unrated ORDER BY lookups DESC LIMIT ?', (limit,)
+        )
+
+    def __len__(self) -> int:
+        (count,) = self._connect().execute('SELECT COUNT(*) FROM ratings').fetchone()
+        return int(count)
+
+    def build_index(self, path: str) -> int:
+        """
+        Write every rating to a compact domain trie file and return how many
+        were written. The file's mtime is set to when the ratings were read,
+        so later writes can be told apart with updated_since().
+        """
+        trie = DomainTrie()
+        read_at = time.time()
+        for domain, score, source in self._connect().execute('SELECT domain, score, source FROM ratings'):
+            trie.insert(domain, score, source)
+        trie.write(path)
+        os.utime(path, (read_at, read_at))
+        return len(trie)
+
+def read_ratings(path: str) -> Iterator[Tuple[str, float]]:
+    """
+    Read (domain, score) pairs from a ratings list: a JSON object of
+    domain -> score (the format of the old credibility_cache.json), JSON
+    lines with 'domain' and 'score', or CSV with domain and score columns.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.json'):
+            yield from json.load(f).items()
+        elif path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record['domain'], record['score']
+        else:
+            for row in csv.reader(f):
+                if len(row) >= 2 and row[0] and not row[0].startswith('#') and row[0] != 'domain':
+                    yield row[0], float(row[1])
+
+_store: Optional[CredibilityStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> CredibilityStore:
+    """Return the shared credibility store, opening it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CredibilityStore(os.environ.get('CREDIBILITY_DB_PATH', 'cache/credibility.sqlite3'))
+                atexit.register(_store.flush)
+    return _store
+
+_index: Optional[CompactDomainTrie] = None
+_index_mtime = 0.0
+_index_checked = 0.0
+
+def get_domain_index(check_interval: float = 5.0) -> Optional[CompactDomainTrie]:
+    """
+    Return the memory-mapped ratings trie, or None if it has not been built.
+    The file is re-opened when a rebuild replaces it.
+    """
+    global _index, _index_mtime, _index_checked
+    now = time.monotonic()
+    if now - _index_checked < check_interval and _index_checked:
+        return _index
+    with _store_lock:
+        _index_checked = now
+        path = os.environ.get('CREDIBILITY_INDEX_PATH', 'cache/credibility.trie')
+        mtime = os.path.getmtime(path) if os.path.exists(path) else 0.0
+        if mtime != _index_mtime:
+            _index = CompactDomainTrie(path) if mtime else None
+            _index_mtime = mtime
+    return _index
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import domain ratings and rebuild the credibility index")
+    parser.add_argument('files', nargs='*', help='Ratings lists (.csv, .json or .jsonl)')
+    parser.add_argument('--source', help='Name recorded with each imported rating')
+    args = parser.parse_args()
+
+    store = get_store()
+    for path in args.files:
+        count = store.import_ratings(read_ratings(path), source=args.source or os.path.basename(path))
+        print(f"{path}: imported {count} ratings")
+
+    # Lookups read the trie, so rebuild it from the full table after every import
+    index_path = os.environ.get('CREDIBILITY_INDEX_PATH', 'cache/credibility.trie')
+    print(f"{index_path}: indexed {store.build_index(index_path)} domains")
+
+if __name__ == '__main__':
+    main()
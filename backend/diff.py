@@ -0,0 +1,157 @@
+"""Sequence diffing for comparing original and rewritten articles"""
+import bisect
+import difflib
+import time
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+# (tag, a_start, a_end, b_start, b_end) with tag 'equal', 'delete', 'insert' or 'replace'
+Opcode = Tuple[str, int, int, int, int]
+
+# Regions without unique anchors up to this many cell comparisons go to difflib
+QUADRATIC_LIMIT = 250_000
+
+def intern_sequences(a: Sequence[str], b: Sequence[str]) -> Tuple[List[int], List[int]]:
+    """Replace equal strings with equal small ints so comparisons are O(1)"""
+    ids: Dict[str, int] = {}
+    a_ids = [ids.setdefault(item, len(ids)) for item in a]
+    b_ids = [ids.setdefault(item, len(ids)) for item in b]
+    return a_ids, b_ids
+
+def patience_opcodes(a: Sequence[Hashable], b: Sequence[Hashable],
+                     deadline: Optional[float] = None) -> List[Opcode]:
+    """
+    Diff two sequences with patience diff.
+
+    Items unique to both sides of a region are matched up along their
+    longest increasing subsequence and used as anchors. Runs between anchors
+    are diffed recursively, and regions with no anchors fall back to difflib
+    when small. Anything left when `deadline` (a time.monotonic() value)
+    passes is reported as a single replace hunk rather than diffed further.
+    """
+    opcodes: List[Opcode] = []
+    # Work stack: (0, alo, ahi, blo, bhi) diffs a region, (1, ai, bi) emits an anchor match
+    stack: List[Tuple[int, ...]] = [(0, 0, len(a), 0, len(b))]
+
+    while stack:
+        task = stack.pop()
+        if task[0] == 1:
+            _, ai, bi = task
+            _append(opcodes, 'equal', ai, ai + 1, bi, bi + 1)
+            continue
+        _, alo, ahi, blo, bhi = task
+
+        # Common prefix and suffix
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            _append(opcodes, 'equal', alo, alo + 1, blo, blo + 1)
+            alo += 1
+            blo += 1
+        suffix = 0
+        while alo < ahi - suffix and blo < bhi - suffix and a[ahi - suffix - 1] == b[bhi - suffix - 1]:
+            suffix += 1
+        ahi -= suffix
+        bhi -= suffix
+        # The suffix is emitted once the middle of the region has been diffed
+        for k in range(suffix - 1, -1, -1):
+            stack.append((1, ahi + k, bhi + k))
+
+        if alo == ahi or blo == bhi or (deadline is not None and time.monotonic() > deadline):
+            _append_change(opcodes, alo, ahi, blo, bhi)
+            continue
+
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if not anchors:
+            if (ahi - alo) * (bhi - blo) <= QUADRATIC_LIMIT:
+                matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+                for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+                    _append(opcodes, tag, alo + i1, alo + i2, blo + j1, blo + j2)
+            else:
+                _append_change(opcodes, alo, ahi, blo, bhi)
+            continue
+
+        # Push sub-tasks in reverse so they are processed left to right
+        tasks: List[Tuple[int, ...]] = []
+        prev_a, prev_b = alo, blo
+        for ai, bi in anchors:
+            tasks.append((0, prev_a, ai, prev_b, bi))
+            tasks.append((1, ai, bi))
+            prev_a, prev_b = ai + 1, bi + 1
+        tasks.append((0, prev_a, ahi, prev_b, bhi))
+        stack.extend(reversed(tasks))
+
+    return opcodes
+
+def _unique_anchors(a: Sequence[Hashable], b: Sequence[Hashable],
+                    alo: int, ahi: int, blo: int, bhi: int) -> List[Tuple[int, int]]:
+    """Longest increasing run of (a, b) positions of items occurring once on each side"""
+    a_pos: Dict[Hashable, int] = {}
+    a_count: Dict[Hashable, int] = {}
+    for i in range(alo, ahi):
+        a_count[a[i]] = a_count.get(a[i], 0) + 1
+        a_pos[a[i]] = i
+    b_pos: Dict[Hashable, int] = {}
+    b_count: Dict[Hashable, int] = {}
+    for j in range(blo, bhi):
+        b_count[b[j]] = b_count.get(b[j], 0) + 1
+        b_pos[b[j]] = j
+
+    pairs = sorted(
+        (a_pos[item], b_pos[item]) for item, count in a_count.items()
+        if count == 1 and b_count.get(item) == 1
+    )
+    if not pairs:
+        return []
+
+    # Patience sorting: tails[k] is the index into pairs ending the best run of length k + 1
+    tails: List[int] = []
+    tail_values: List[int] = []
+    previous: List[int] = [-1] * len(pairs)
+    for idx, (_, bj) in enumerate(pairs):
+        k = bisect.bisect_left(tail_values, bj)
+        if k:
+            previous[idx] = tails[k - 1]
+        if k == len(tails):
+            tails.append(idx)
+            tail_values.append(bj)
+        else:
+            tails[k] = idx
+            tail_values[k] = bj
+
+    run: List[Tuple[int, int]] = []
+    idx = tails[-1]
+    while idx != -1:
+        run.append(pairs[idx])
+        idx = previous[idx]
+    run.reverse()
+    return run
+
+def _append(opcodes: List[Opcode], tag: str, a1: int, a2: int, b1: int, b2: int) -> None:
+    if a1 == a2 and b1 == b2:
+        return
+    if opcodes and opcodes[-1][0] == tag and opcodes[-1][2] == a1 and opcodes[-1][4] == b1:
+        _, pa1, _, pb1, _ = opcodes[-1]
+        opcodes[-1] = (tag, pa1, a2, pb1, b2)
+    else:
+        opcodes.append((tag, a1, a2, b1, b2))
+
+def _append_change(opcodes: List[Opcode], alo: int, ahi: int, blo: int, bhi: int) -> None:
+    if alo < ahi and blo < bhi:
+        _append(opcodes, 'replace', alo, ahi, blo, bhi)
+    elif alo < ahi:
+        _append(opcodes, 'delete', alo, ahi, blo, blo)
+    elif blo < bhi:
+        _append(opcodes, 'insert', alo, alo, blo, bhi)
+
+def token_diff(original: str, rewritten: str) -> List[Dict[str, str]]:
+    """Word-level diff of two short strings as a list of {'type', 'text'} runs"""
+    a = original.split()
+    b = rewritten.split()
+    runs: List[Dict[str, str]] = []
+    for tag, i1, i2, j1, j2 in patience_opcodes(a, b):
+        if tag == 'equal':
+            runs.append({"type": "unchanged", "text": ' '.join(a[i1:i2])})
+            continue
+        if i1 < i2:
+            runs.append({"type": "removed", "text": ' '.join(a[i1:i2])})
+        if j1 < j2:
+            runs.append({"type": "added", "text": ' '.join(b[j1:j2])})
+    return runs
@@ -0,0 +1,85 @@
+"""Articles cleaned once, with sections held as offset spans into the cleaned text"""
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, overload
+
+from backend.lexicon import LexiconScanner, default_scanner
+from backend.metrics import observe_document, stage
+from backend.text_utils import OffsetMap, clean_text_with_offsets, section_spans
+
+class Document:
+    """
+    An article's cleaned text plus the start/end offsets of its sections.
+
+    The cleaned text is the only copy of the content kept; sections are two
+    int64 arrays of offsets and are sliced out only when an analyzer asks for
+    one, so a large article costs about its own size plus 16 bytes per
+    section. Offsets in the cleaned text map back to the original text
+    through `offsets`, which is what highlighting in the page needs. Text
+    that has already been through clean_text is passed with cleaned=True and
+    is used as it is.
+    """
+
+    def __init__(self, original: str, max_section_length: int = 1000, cleaned: bool = False) -> None:
+        observe_document(len(original))
+        if cleaned:
+            self.text, self.offsets = original, OffsetMap()
+        else:
+            with stage('clean_text', len(original)):
+                self.text, self.offsets = clean_text_with_offsets(original)
+        with stage('split_into_sections', len(original)):
+            self.section_starts, self.section_ends = section_spans(self.text, max_section_length) \
+                if self.text else (array('q'), array('q'))
+        self.sections = SectionView(self)
+
+    def __len__(self) -> int:
+        return len(self.section_starts)
+
+    def section_span(self, index: int) -> Tuple[int, int]:
+        return self.section_starts[index], self.section_ends[index]
+
+    def to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a span of the cleaned text to the matching span of the original text"""
+        return self.offsets.span_to_original(start, end)
+
+    def scan(self, index: Optional[int] = None,
+             scanner: LexiconScanner = default_scanner) -> List[Dict[str, Any]]:
+        """
+        Lexicon hits in one section (or the whole document) with their
+        offsets in the original text.
+        """
+        start, end = self.section_span(index) if index is not None else (0, len(self.text))
+        highlights: List[Dict[str, Any]] = []
+        for hit in scanner.iter_hits(self.text, start, end):
+            original_start, original_end = self.to_original(hit.start, hit.end)
+            highlights.append({
+                'category': hit.category,
+                'text': hit.text,
+                'start': original_start,
+                'end': original_end
+            })
+        return highlights
+
+class SectionView(Sequence[str]):
+    """Read-only sequence of a document's sections, sliced from its text on access"""
+
+    def __init__(self, document: Document) -> None:
+        self._document = document
+
+    def __len__(self) -> int:
+        return len(self._document)
+
+    @overload
+    def __getitem__(self, index: int) -> str: ...
+    @overload
+    def __getitem__(self, index: slice) -> List[str]: ...
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        start, end = self._document.section_span(index)
+        return self._document.text[start:end]
+
+    def __iter__(self) -> Iterator[str]:
+        text = self._document.text
+        for start, end in zip(self._document.section_starts, self._document.section_ends):
+            yield text[start:end]
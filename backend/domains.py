@@ -0,0 +1,283 @@
+"""Domain parsing against the public suffix list and a compact domain-suffix trie"""
+import functools
+import json
+import math
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+# Suffixes used when no public suffix list file is configured. Point
+# PUBLIC_SUFFIX_LIST at a copy of https://publicsuffix.org/list/public_suffix_list.dat
+# for full coverage.
+_DEFAULT_SUFFIXES = '''
+com org net edu gov mil int info biz name io co ai app news tv me us uk ca au de fr it es nl be ch at
+se no dk fi ie pl pt ru cn jp kr in br mx ar za nz sg hk tw il tr gr cz hu ro ua eu
+co.uk org.uk ac.uk gov.uk ltd.uk plc.uk me.uk net.uk nhs.uk police.uk sch.uk
+com.au net.au org.au edu.au gov.au asn.au id.au
+co.nz org.nz net.nz govt.nz ac.nz
+co.jp or.jp ne.jp ac.jp go.jp
+co.kr or.kr go.kr ac.kr
+com.br org.br gov.br net.br
+com.cn org.cn gov.cn net.cn edu.cn
+co.in org.in gov.in net.in ac.in nic.in
+com.mx org.mx gob.mx
+co.za org.za gov.za
+com.sg org.sg gov.sg edu.sg
+com.hk org.hk gov.hk
+com.tw org.tw gov.tw
+co.il org.il gov.il ac.il
+com.tr org.tr gov.tr
+com.ar gob.ar
+gc.ca
+*.ck !www.ck
+'''
+
+class PublicSuffixList:
+    """
+    Public suffix rules (plain, wildcard and exception), in the format of
+    publicsuffix.org's public_suffix_list.dat.
+    """
+
+    def __init__(self, rules: Iterable[str]) -> None:
+        self._rules = set()
+        self._wildcards = set()
+        self._exceptions = set()
+        for rule in rules:
+            rule = rule.strip().lower()
+            if not rule or rule.startswith('//'):
+                continue
+            rule = rule.split()[0]
+            if rule.startswith('!'):
+                self._exceptions.add(rule[1:])
+            elif rule.startswith('*.'):
+                self._wildcards.add(rule[2:])
+            else:
+                self._rules.add(rule)
+
+    @classmethod
+    def load(cls, path: str) -> 'PublicSuffixList':
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f)
+
+    def public_suffix(self, host: str) -> str:
+        """The longest public suffix of host; an unlisted TLD is its own suffix"""
+        labels = host.split('.')
+        for i in range(len(labels)):
+            candidate = '.'.join(labels[i:])
+            if candidate in self._exceptions:
+                return '.'.join(labels[i + 1:])
+            if candidate in self._rules:
+                return candidate
+            if i + 1 < len(labels) and '.'.join(labels[i + 1:]) in self._wildcards:
+                return candidate
+        return labels[-1]
+
+    def registrable_domain(self, host: str) -> Optional[str]:
+        """The public suffix plus one label (e.g. example.co.uk), or None for a bare suffix"""
+        suffix = self.public_suffix(host)
+        if host == suffix:
+            return None
+        head = host[:-len(suffix) - 1]
+        return f"{head.rsplit('.', 1)[-1]}.{suffix}"
+
+@functools.lru_cache(maxsize=1)
+def default_suffix_list() -> PublicSuffixList:
+    path = os.environ.get('PUBLIC_SUFFIX_LIST')
+    if path and os.path.exists(path):
+        return PublicSuffixList.load(path)
+    return PublicSuffixList(_DEFAULT_SUFFIXES.split())
+
+class SourceDomain(NamedTuple):
+    """The host of a URL and where it sits under the public suffix list"""
+    host: str
+    registrable_domain: Optional[str]
+    public_suffix: str
+
+def normalize_host(host: str) -> str:
+    """Lower-case, IDNA-encoded host without a trailing dot or leading www."""
+    host = host.strip().lower().rstrip('.')
+    if not host.isascii():
+        try:
+            host = host.encode('idna').decode('ascii')
+        except UnicodeError:
+            pass
+    return host[4:] if host.startswith('www.') else host
+
+@functools.lru_cache(maxsize=10000)
+def parse_source(url: str) -> Optional[SourceDomain]:
+    """Parse a URL (or bare host) once into its normalized SourceDomain"""
+    try:
+        host = urlsplit(url if '//' in url else f'//{url}').hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = normalize_host(host)
+    suffixes = default_suffix_list()
+    return SourceDomain(host, suffixes.registrable_domain(host), suffixes.public_suffix(host))
+
+# Trie node: child nodes by label, plus the (score, source) value under the key None
+_Node = Dict[Optional[str], Any]
+
+class DomainTrie:
+    """
+    In-memory trie of domains keyed by reversed labels, used to build a
+    CompactDomainTrie. Values are a (score, source) pair.
+    """
+
+    def __init__(self) -> None:
+        self._root: _Node = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def insert(self, domain: str, score: float, source: Optional[str] = None) -> None:
+        node = self._root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        if None not in node:
+            self._count += 1
+        node[None] = (score, source)
+
+    def longest_match(self, domain: str) -> Optional[Tuple[str, float, Optional[str]]]:
+        labels = domain.split('.')
+        node = self._root
+        best = None
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label)
+            if node is None:
+                break
+            if None in node:
+                score, source = node[None]
+                best = ('.'.join(labels[-depth:]), score, source)
+        return best
+
+    def write(self, path: str) -> None:
+        """Serialize to the compact format read by CompactDomainTrie"""
+        write_compact_trie(self._root, path)
+
+# File layout: header, then one fixed-size record per node in breadth-first
+# order (so each node's children are contiguous and sorted by label), then a
+# blob of distinct labels, then a JSON list of source names.
+_MAGIC = b'DTR1'
+_HEADER = struct.Struct('<4sIII')  # magic, node count, label blob size, sources size
+# label offset, label length, first child, child count, score (NaN if unrated), source id + 1
+_NODE = struct.Struct('<IHIIfH')
+
+def write_compact_trie(root: _Node, path: str) -> None:
+    labels: Dict[bytes, int] = {}
+    blob = bytearray()
+    sources: Dict[str, int] = {}
+    records: List[Tuple[int, int, int, int, float, int]] = []
+
+    def value_of(node: _Node) -> Tuple[float, int]:
+        value = node.get(None)
+        if value is None:
+            return math.nan, 0
+        score, source = value
+        source_id = sources.setdefault(source, len(sources) + 1) if source else 0
+        return float(score), source_id
+
+    def label_ref(label: str) -> Tuple[int, int]:
+        encoded = label.encode('utf-8')
+        if encoded not in labels:
+            labels[encoded] = len(blob)
+            blob.extend(encoded)
+        return labels[encoded], len(encoded)
+
+    # Breadth-first: node i's children are assigned the next free indexes
+    queue: List[Tuple[str, _Node]] = [('', root)]
+    next_index = 1
+    head = 0
+    while head < len(queue):
+        label, node = queue[head]
+        head += 1
+        children = sorted(((k, v) for k, v in node.items() if k is not None),
+                          key=lambda item: item[0].encode('utf-8'))
+        offset, length = label_ref(label)
+        score, source_id = value_of(node)
+        records.append((offset, length, next_index, len(children), score, source_id))
+        queue.extend(children)
+        next_index += len(children)
+
+    names = json.dumps([name for name, _ in sorted(sources.items(), key=lambda item: item[1])]).encode('utf-8')
+    tmp = path + '.tmp'
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(records), len(blob), len(names)))
+        for record in records:
+            f.write(_NODE.pack(*record))
+        f.write(blob)
+        f.write(names)
+    os.replace(tmp, path)
+
+class CompactDomainTrie:
+    """
+    Read-only domain trie memory-mapped from a file written by DomainTrie.
+
+    Loading costs one mmap regardless of size and pages are shared between
+    worker processes. A lookup walks one node per label of the domain,
+    binary-searching each node's sorted children. `built` is the file's
+    mtime, which CredibilityStore.build_index sets to when it read the ratings.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as f:
+            self.built = os.fstat(f.fileno()).st_mtime
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.node_count, blob_size, names_size = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a domain trie file")
+        self._nodes = _HEADER.size
+        self._labels = self._nodes + self.node_count * _NODE.size
+        names = self._map[self._labels + blob_size:self._labels + blob_size + names_size]
+        self._sources: List[str] = json.loads(names.decode('utf-8'))
+
+    def _node(self, index: int) -> Tuple[int, int, int, int, float, int]:
+        return _NODE.unpack_from(self._map, self._nodes + index * _NODE.size)
+
+    def _label(self, offset: int, length: int) -> bytes:
+        start = self._labels + offset
+        return self._map[start:start + length]
+
+    def _child(self, first: int, count: int, label: bytes) -> Optional[int]:
+        lo, hi = first, first + count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset, length = self._node(mid)[:2]
+            current = self._label(offset, length)
+            if current < label:
+                lo = mid + 1
+            elif current > label:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def longest_match(self, domain: str) -> Optional[Tuple[str, float, Optional[str]]]:
+        """Return (rated domain, score, source) for the most specific rated ancestor of domain"""
+        labels = domain.split('.')
+        best = None
+        _, _, first, count, _, _ = self._node(0)
+        for depth, label in enumerate(reversed(labels), 1):
+            index = self._child(first, count, label.encode('utf-8'))
+            if index is None:
+                break
+            _, _, first, count, score, source_id = self._node(index)
+            if not math.isnan(score):
+                source = self._sources[source_id - 1] if source_id else None
+                best = ('.'.join(labels[-depth:]), round(score, 6), source)
+        return best
+
+    def close(self) -> None:
+        self._map.close()
+
+def ancestors(host: str) -> Iterator[str]:
+    """host and each parent domain, most specific first"""
+    labels = host.split('.')
+    for i in range(len(labels)):
+        yield '.'.join(labels[i:])
@@ -21,6 +21,16 @@ class APIError(BiasDetectorError):
     def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
         super().__init__(message, status_code=502, details=details)
 
+class QueueFullError(BiasDetectorError):
+    """Raised when the background job queue cannot accept more work"""
+    def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(message, status_code=503, details=details)
+
+class ProfilerBusyError(BiasDetectorError):
+    """Raised when a profile is requested while another is running"""
+    def __init__(self, message: str, details: Optional[Dict[str, Any]] = None):
+        super().__init__(message, status_code=409, details=details)
+
 def handle_error(error: Exception) -> tuple[Dict[str, Any], int]:
     """Convert exceptions to JSON responses"""
     if isinstance(error, BiasDetectorError):
@@ -0,0 +1,193 @@
+"""Main-content extraction from raw article HTML"""
+import functools
+import logging
+import re
+from html.parser import HTMLParser
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever extraction output changes so cached extractions are not reused
+EXTRACTOR_VERSION = '1.0.0'
+
+# Elements whose contents are never article text
+_SKIP_TAGS = frozenset((
+    'script', 'style', 'noscript', 'template', 'svg', 'canvas', 'iframe', 'object',
+    'nav', 'header', 'footer', 'aside', 'form', 'button', 'select', 'textarea', 'head'
+))
+# Elements that end the current block of text
+_BLOCK_TAGS = frozenset((
+    'p', 'div', 'section', 'article', 'main', 'li', 'ul', 'ol', 'blockquote', 'pre',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'td', 'th', 'tr', 'table', 'dd', 'dt', 'dl',
+    'br', 'hr', 'figcaption', 'body'
+))
+_HEADINGS = frozenset(('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+_VOID_TAGS = frozenset((
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr'
+))
+# class/id values of page furniture inside otherwise content-bearing containers
+_BOILERPLATE_RE = re.compile(
+    r'comment|share|social|promo|related|newsletter|subscribe|advert|sponsor|cookie|'
+    r'sidebar|menu|breadcrumb|byline-tools|popup|modal|paywall',
+    re.IGNORECASE
+)
+_AD_TEXT_RE = re.compile(r'(advertisement|subscribe|sign up)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+# Blocks shorter than this are kept only inside an article container or as headings
+MIN_BLOCK_LENGTH = 50
+# Blocks with more than this fraction of their text inside links are navigation
+MAX_LINK_DENSITY = 0.5
+
+class _Block:
+    __slots__ = ('text', 'link_chars', 'in_article', 'heading')
+
+    def __init__(self, text: str, link_chars: int, in_article: bool, heading: bool) -> None:
+        self.text = text
+        self.link_chars = link_chars
+        self.in_article = in_article
+        self.heading = heading
+
+class ArticleParser(HTMLParser):
+    """
+    Incremental HTML parser that collects the text blocks of a page.
+
+    Pages are fed in chunks and only the current block is buffered, so the
+    parser never builds a DOM. Text inside navigation, scripts and elements
+    whose class or id looks like page furniture is dropped as it streams by.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.blocks: List[_Block] = []
+        self.title: Optional[str] = None
+        self._meta_title: Optional[str] = None
+        # Open elements as (tag, skipped, article container)
+        self._stack: List[Tuple[str, bool, bool]] = []
+        self._skip_depth = 0
+        self._article_depth = 0
+        self._link_depth = 0
+        self._in_title = False
+        self._title_parts: List[str] = []
+        self._parts: List[str] = []
+        self._link_chars = 0
+        self._heading = False
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        attributes = dict(attrs)
+        if tag == 'meta' and attributes.get('property') == 'og:title':
+            self._meta_title = attributes.get('content') or self._meta_title
+        if tag == 'title':
+            self._in_title = True
+        if tag in _BLOCK_TAGS:
+            self._flush()
+            if tag in _HEADINGS:
+                self._heading = True
+        if tag in _VOID_TAGS:
+            return
+
+        marker = ' '.join(filter(None, (attributes.get('class'), attributes.get('id'))))
+        skipped = tag in _SKIP_TAGS or (tag != 'body' and bool(marker) and bool(_BOILERPLATE_RE.search(marker)))
+        article = tag in ('article', 'main') or attributes.get('itemprop') == 'articleBody'
+        self._stack.append((tag, skipped, article))
+        self._skip_depth += skipped
+        self._article_depth += article
+        if tag == 'a':
+            self._link_depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == 'title':
+            self._in_title = False
+            self.title = _SPACE_RE.sub(' ', ''.join(self._title_parts)).strip() or None
+        if tag in _BLOCK_TAGS:
+            self._flush()
+        # Close the most recent matching element, and anything left unclosed inside it
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                for open_tag, skipped, article in self._stack[i:]:
+                    self._skip_depth -= skipped
+                    self._article_depth -= article
+                    if open_tag == 'a':
+                        self._link_depth -= 1
+                del self._stack[i:]
+                break
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        if self._skip_depth:
+            return
+        self._parts.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def close(self) -> None:
+        super().close()
+        self._flush()
+        # og:title omits the site name that <title> usually carries
+        self.title = self._meta_title or self.title
+
+    def _flush(self) -> None:
+        if self._parts:
+            text = _SPACE_RE.sub(' ', ''.join(self._parts)).strip()
+            if text:
+                self.blocks.append(_Block(text, self._link_chars, self._article_depth > 0, self._heading))
+        self._parts = []
+        self._link_chars = 0
+        self._heading = False
+
+    def main_text(self) -> str:
+        """Paragraphs of the main content, separated by blank lines"""
+        blocks = self.blocks
+        # Prefer an explicit article container when the page has one with real text
+        in_article = [b for b in blocks if b.in_article]
+        if sum(len(b.text) for b in in_article) >= MIN_BLOCK_LENGTH:
+            blocks = in_article
+
+        paragraphs = [
+            b.text for b in blocks
+            if b.link_chars <= MAX_LINK_DENSITY * len(b.text)
+            and (b.heading or b.in_article or len(b.text) >= MIN_BLOCK_LENGTH)
+            and not (len(b.text) < 200 and _AD_TEXT_RE.search(b.text))
+        ]
+        return '\n\n'.join(paragraphs)
+
+def extract_article(html: str, url: Optional[str] = None, chunk_size: int = 65536) -> Dict[str, Any]:
+    """
+    Extract the main text and title of an article page.
+
+    Uses trafilatura when it is installed and finds content, otherwise the
+    streaming ArticleParser. Returns a dict with 'text', 'title' and the
+    'extractor' that produced them.
+    """
+    trafilatura = _trafilatura()
+    if trafilatura is not None:
+        try:
+            text = trafilatura.extract(html, url=url, include_comments=False, include_tables=False)
+            if text:
+                metadata = trafilatura.extract_metadata(html)
+                title = getattr(metadata, 'title', None) if metadata is not None else None
+                return {'text': text, 'title': title, 'extractor': 'trafilatura'}
+        except Exception:
+            logger.exception("trafilatura extraction failed, using the built-in parser")
+
+    parser = ArticleParser()
+    for start in range(0, len(html), chunk_size):
+        parser.feed(html[start:start + chunk_size])
+    parser.close()
+    return {
+        'text': parser.main_text(),
+        'title': parser.title,
+        'extractor': 'parser'
+    }
+
+@functools.lru_cache(maxsize=None)
+def _trafilatura() -> Any:
+    """The trafilatura module, or None when it is not installed"""
+    try:
+        import trafilatura  # type: ignore
+    except ImportError:
+        return None
+    return trafilatura
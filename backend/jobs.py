@@ -0,0 +1,285 @@
+"""Background job queue for expensive rewrite and comparison requests"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.errors import QueueFullError
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict[str, Any]], Any]
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+class JobStore:
+    """
+    Jobs persisted in SQLite so that any worker can report on a job and
+    queued work survives a restart. Claiming a job is an atomic
+    queued -> running transition, so a job runs once even though every
+    process polls the same queue.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, kind TEXT NOT NULL, payload TEXT NOT NULL, '
+            'priority INTEGER NOT NULL, status TEXT NOT NULL, result TEXT, error TEXT, '
+            'owner INTEGER, owner_start REAL, created REAL NOT NULL, started REAL, finished REAL)'
+        )
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(jobs)')]
+        if 'owner_start' not in columns:
+            conn.execute('ALTER TABLE jobs ADD COLUMN owner_start REAL')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_queued ON jobs (status, priority, created)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, kind: str, payload: Dict[str, Any], priority: int) -> Dict[str, Any]:
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'priority': priority,
+            'status': QUEUED,
+            'created': time.time()
+        }
+        self._connect().execute(
+            'INSERT INTO jobs (id, kind, payload, priority, status, created) VALUES (?, ?, ?, ?, ?, ?)',
+            (job['id'], kind, json.dumps(payload), priority, QUEUED, job['created'])
+        )
+        return job
+
+    def claim_next(self) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Mark the first queued job (lowest priority number, then oldest) as
+        running by this process; returns (id, kind, payload), or None if no
+        job is queued.
+        """
+        conn = self._connect()
+        pid = os.getpid()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT id, kind, payload FROM jobs WHERE status = ? ORDER BY priority, created LIMIT 1',
+                (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, owner = ?, owner_start = ?, started = ? WHERE id = ?',
+                    (RUNNING, pid, _process_start_time(pid), time.time(), row[0])
+                )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        job_id, kind, payload = row
+        return job_id, kind, json.loads(payload)
+
+    def count(self, status: str = QUEUED) -> int:
+        """Number of jobs with the given status, across every process using the store"""
+        (count,) = self._connect().execute('SELECT COUNT(*) FROM jobs WHERE status = ?', (status,)).fetchone()
+        return int(count)
+
+    def finish(self, job_id: str, result: Any = None, error: Optional[str] = None) -> None:
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE id = ?',
+            (FAILED if error else SUCCEEDED, None if error else json.dumps(result), error, time.time(), job_id)
+        )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            'SELECT id, kind, priority, status, result, error, created, started, finished FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        keys = ('id', 'kind', 'priority', 'status', 'result', 'error', 'created', 'started', 'finished')
+        job = dict(zip(keys, row))
+        job['result'] = json.loads(job['result']) if job['result'] is not None else None
+        return job
+
+    def recover(self) -> int:
+        """Requeue jobs whose owning process has died; returns how many were requeued"""
+        conn = self._connect()
+        running = conn.execute('SELECT id, owner, owner_start FROM jobs WHERE status = ?', (RUNNING,)).fetchall()
+        requeued = 0
+        for job_id, owner, owner_start in running:
+            if not _process_alive(owner, owner_start):
+                cursor = conn.execute(
+                    'UPDATE jobs SET status = ?, owner = NULL, owner_start = NULL WHERE id = ? AND status = ?',
+                    (QUEUED, job_id, RUNNING)
+                )
+                requeued += cursor.rowcount
+        return requeued
+
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs that completed before older_than"""
+        cursor = self._connect().execute(
+            'DELETE FROM jobs WHERE status IN (?, ?) AND finished < ?', (SUCCEEDED, FAILED, older_than)
+        )
+        return cursor.rowcount
+
+def _process_start_time(pid: int) -> Optional[float]:
+    """When a process started, in clock ticks since boot; None where /proc is unavailable"""
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            stat = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses, so count fields from the last ')'
+    return float(stat.rsplit(b')', 1)[1].split()[19])
+
+def _process_alive(pid: Optional[int], start: Optional[float] = None) -> bool:
+    """Whether process pid is running and, if its start time is known, is the same process"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    # After a restart the pid may belong to an unrelated process
+    if start is not None:
+        current = _process_start_time(pid)
+        if current is not None and current != start:
+            return False
+    return True
+
+class JobQueue:
+    """
+    Priority queue of jobs drained by a pool of background threads.
+
+    The store is the queue: idle threads claim the next queued job from it,
+    so jobs submitted through any process sharing the store are run by
+    whichever worker is free. Lower priority numbers run first; equal
+    priorities run in submission order. Submissions beyond max_pending
+    queued jobs are refused so a flood of rewrites cannot grow the backlog
+    without bound.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 2, max_pending: int = 100,
+                 retention: float = 86400.0, poll_interval: float = 1.0,
+                 recover_interval: float = 30.0) -> None:
+        self.store = store
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self.recover_interval = recover_interval
+        self._handlers: Dict[str, JobHandler] = {}
+        self._cond = threading.Condition()
+        self._done = threading.Condition()
+        self._pid: Optional[int] = None
+        self._recovered = 0.0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    @property
+    def kinds(self) -> List[str]:
+        return sorted(self._handlers)
+
+    def submit(self, kind: str, payload: Dict[str, Any], priority: int = 5) -> Dict[str, Any]:
+        """Persist and enqueue a job; raises QueueFullError when the backlog is full"""
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job type: {kind}")
+        self.start()
+        pending = self.store.count(QUEUED)
+        if pending >= self.max_pending:
+            raise QueueFullError(
+                "Job queue is full, retry later",
+                details={'pending': pending, 'max_pending': self.max_pending}
+            )
+        job = self.store.create(kind, payload, priority)
+        with self._cond:
+            self._cond.notify()
+        return job
+
+    def get(self, job_id: str, wait: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Return a job, waiting up to `wait` seconds for it to finish"""
+        self.start()
+        deadline = time.monotonic() + wait
+        job = self.store.get(job_id)
+        while job is not None and job['status'] in (QUEUED, RUNNING):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Jobs may finish in another process, so wake up periodically to re-read the store
+            with self._done:
+                self._done.wait(min(remaining, 0.5))
+            job = self.store.get(job_id)
+        return job
+
+    def pending(self) -> int:
+        return self.store.count(QUEUED)
+
+    def start(self) -> None:
+        """
+        Requeue the jobs left by dead processes and start the worker threads,
+        once per process. Called on first use, and from gunicorn.conf.py when a
+        worker boots so that queued jobs run without waiting for a request.
+        """
+        # Threads do not survive fork, so each worker process starts its own
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._recover()
+            for i in range(self.workers):
+                threading.Thread(target=self._run, name=f'job-worker-{i}', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _recover(self) -> None:
+        self._recovered = time.monotonic()
+        requeued = self.store.recover()
+        if requeued:
+            logger.info(f"Requeued {requeued} jobs left running by exited processes")
+
+    def _run(self) -> None:
+        while True:
+            claimed = self.store.claim_next()
+            if claimed is None:
+                # Jobs submitted here wake the thread at once; jobs submitted by
+                # other processes, or orphaned by one that died, are found by polling
+                with self._cond:
+                    self._cond.wait(self.poll_interval)
+                if time.monotonic() - self._recovered >= self.recover_interval:
+                    self._recover()
+                continue
+
+            job_id, kind, payload = claimed
+            try:
+                result = self._handlers[kind](payload)
+            except Exception as e:
+                logger.exception(f"Job {job_id} ({kind}) failed")
+                self.store.finish(job_id, error=str(e))
+            else:
+                self.store.finish(job_id, result=result)
+
+            with self._done:
+                self._done.notify_all()
+            if self.retention:
+                self.store.purge(time.time() - self.retention)
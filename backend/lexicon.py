@@ -0,0 +1,111 @@
+"""Single-pass lexicon scanning for bias and emotional language"""
+import re
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Words are runs of word characters, optionally joined by apostrophes ("don't").
+# A possessive 's is left out, so "everyone's" still matches the term "everyone".
+_WORD_RE = re.compile(r"\w+(?:['’](?![sS]\b)\w+)*")
+# Characters allowed between the words of a multi-word term ("ought to", "left-wing")
+_JOINERS = frozenset(' -‐‑')
+
+# Term categories used by detect_bias. Multi-word terms are written with single spaces.
+BIAS_LEXICON: Dict[str, List[str]] = {
+    'absolutes': ['always', 'never', 'everyone', 'nobody'],
+    'prescriptive': ['must', 'should', 'ought to'],
+    'certainty': ['obviously', 'clearly', 'undoubtedly'],
+}
+
+EMOTION_LEXICON: Dict[str, List[str]] = {
+    'emotions': ['hate', 'love', 'angry', 'happy', 'sad', 'furious', 'delighted'],
+    'evaluative': ['terrible', 'amazing', 'awful', 'wonderful', 'horrible'],
+}
+
+class LexiconHit(NamedTuple):
+    """A lexicon term found in a text, with character offsets into that text"""
+    category: str
+    term: str
+    text: str
+    start: int
+    end: int
+
+class LexiconScanner:
+    """
+    Match every term of every category in a single left-to-right scan.
+
+    Terms are compiled into a trie keyed by lower-cased words, so the work per
+    word in the text is bounded by the longest term rather than by the size of
+    the lexicon. At each position the longest matching term wins.
+    """
+
+    def __init__(self, lexicons: Dict[str, Iterable[str]]) -> None:
+        self._root: Dict[str, Any] = {}
+        self.categories: Tuple[str, ...] = tuple(lexicons)
+        self.max_term_words = 0
+        for category, terms in lexicons.items():
+            for term in terms:
+                self.add(category, term)
+
+    def add(self, category: str, term: str) -> None:
+        """Add a term to the scanner. A term added twice keeps its latest category."""
+        words = [w.casefold() for w in _WORD_RE.findall(term)]
+        if not words:
+            return
+        node = self._root
+        for word in words:
+            node = node.setdefault(word, {})
+        node[None] = (category, ' '.join(words))
+        self.max_term_words = max(self.max_term_words, len(words))
+
+    def scan(self, text: str, categories: Optional[Iterable[str]] = None,
+             start: int = 0, end: Optional[int] = None) -> List[LexiconHit]:
+        """Return all hits in text order, optionally restricted to some categories"""
+        wanted = frozenset(categories) if categories is not None else None
+        return [hit for hit in self.iter_hits(text, start, end) if wanted is None or hit.category in wanted]
+
+    def iter_hits(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[LexiconHit]:
+        """
+        Yield non-overlapping hits while scanning the text once. start and end
+        limit the scan to text[start:end] without copying it; hit offsets are
+        still relative to the whole text.
+        """
+        root = self._root
+        words = _WORD_RE.finditer(text, start, len(text) if end is None else end)
+        # Small lookahead window so multi-word terms can be matched without rescanning
+        window: List[re.Match[str]] = []
+        exhausted = False
+
+        while True:
+            while not exhausted and len(window) < max(self.max_term_words, 1):
+                nxt = next(words, None)
+                if nxt is None:
+                    exhausted = True
+                else:
+                    window.append(nxt)
+            if not window:
+                return
+
+            node = root.get(window[0].group().casefold())
+            match: Optional[Tuple[int, Tuple[str, str]]] = None
+            i = 0
+            while node is not None:
+                if None in node:
+                    match = (i, node[None])
+                i += 1
+                if i >= len(window) or not _is_joined(text, window[i - 1].end(), window[i].start()):
+                    break
+                node = node.get(window[i].group().casefold())
+
+            if match is None:
+                window.pop(0)
+                continue
+
+            last, (category, term) = match
+            hit_start, hit_end = window[0].start(), window[last].end()
+            yield LexiconHit(category, term, text[hit_start:hit_end], hit_start, hit_end)
+            del window[:last + 1]
+
+def _is_joined(text: str, end: int, start: int) -> bool:
+    """Whether two adjacent words are separated only by spaces or hyphens"""
+    return start > end and all(ch in _JOINERS for ch in text[end:start])
+
+default_scanner = LexiconScanner({**BIAS_LEXICON, **EMOTION_LEXICON})
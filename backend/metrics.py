@@ -0,0 +1,87 @@
+"""Prometheus metrics for the analysis pipeline, collected across worker processes"""
+import contextlib
+import functools
+import os
+import time
+from types import SimpleNamespace
+from typing import Iterator, Optional, Tuple
+
+from backend.tracing import record
+
+# Upper bounds (in characters) of the size classes that stage timings are labelled with
+SIZE_CLASSES = ((1_000, '<1k'), (10_000, '1k-10k'), (100_000, '10k-100k'), (1_000_000, '100k-1M'))
+# Stages range from microseconds (lexicon scan of a short article) to seconds
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (500, 1_000, 2_500, 5_000, 10_000, 25_000, 50_000, 100_000, 250_000, 1_000_000, 5_000_000)
+
+def size_class(chars: int) -> str:
+    for limit, name in SIZE_CLASSES:
+        if chars < limit:
+            return name
+    return '>=1M'
+
+@functools.lru_cache(maxsize=None)
+def _pipeline_metrics() -> Optional[SimpleNamespace]:
+    """Create the pipeline histograms on first use; None when prometheus_client is not installed"""
+    try:
+        from prometheus_client import Histogram
+    except ImportError:
+        return None
+    return SimpleNamespace(
+        stage_seconds=Histogram('pipeline_stage_seconds', 'Time spent in each analysis pipeline stage',
+                                ['stage', 'size_class'], buckets=STAGE_BUCKETS),
+        document_size=Histogram('document_size_characters', 'Size of analyzed documents',
+                                buckets=SIZE_BUCKETS)
+    )
+
+@contextlib.contextmanager
+def stage(name: str, size: int) -> Iterator[None]:
+    """
+    Time a pipeline stage run on a document of `size` characters, recording
+    it in the stage histogram and as a span of the current request's trace
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        record(name, elapsed)
+        metrics = _pipeline_metrics()
+        if metrics is not None:
+            metrics.stage_seconds.labels(stage=name, size_class=size_class(size)).observe(elapsed)
+
+def observe_document(size: int) -> None:
+    metrics = _pipeline_metrics()
+    if metrics is not None:
+        metrics.document_size.observe(size)
+
+def prepare_multiprocess(directory: str) -> None:
+    """
+    Point prometheus_client at a fresh PROMETHEUS_MULTIPROC_DIR (`directory`
+    unless it is already set), so that every worker process writes its
+    samples there and /metrics can sum them. Call before forking workers and
+    before prometheus_client is first imported, which is when it reads the
+    variable.
+    """
+    path = os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', directory)
+    os.makedirs(path, exist_ok=True)
+    # Samples left by a previous run would be added to this one's
+    for name in os.listdir(path):
+        if name.endswith('.db'):
+            os.remove(os.path.join(path, name))
+
+def mark_process_dead(pid: int) -> None:
+    """Drop an exited worker's live gauge samples (gunicorn child_exit hook)"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+
+def exposition() -> Tuple[bytes, str]:
+    """Metrics of every worker process in the Prometheus text format, and its content type"""
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
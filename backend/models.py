@@ -1,8 +1,8 @@
 """Data models for the BiasDetector application"""
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from collections import defaultdict
-import json
-import os
+from backend.credibility import CredibilityStore, Rating, get_domain_index, get_store
+from backend.domains import SourceDomain, ancestors, parse_source
 
 class BiasMetrics:
     def __init__(self) -> None:
@@ -24,25 +24,43 @@ class BiasMetrics:
         }
 
 class SourceCredibility:
-    def __init__(self, cache_file: str = 'credibility_cache.json') -> None:
-        self.cache_file = cache_file
-        self.credibility_cache: Dict[str, float] = {}
-        self._load_cache()
+    """Credibility scores of news sources, backed by the shared CredibilityStore"""
 
-    def _load_cache(self) -> None:
-        if os.path.exists(self.cache_file):
-            with open(self.cache_file, 'r') as f:
-                self.credibility_cache = json.load(f)
+    # Score for domains nobody has rated
+    DEFAULT_SCORE = 0.5
 
-    def _save_cache(self) -> None:
-        with open(self.cache_file, 'w') as f:
-            json.dump(self.credibility_cache, f)
+    def __init__(self, store: Optional[CredibilityStore] = None) -> None:
+        self.store = store or get_store()
 
     def get_credibility(self, domain: str) -> float:
-        if domain in self.credibility_cache:
-            return self.credibility_cache[domain]
-        # Default score for unknown domains
-        score = 0.5
-        self.credibility_cache[domain] = score
-        self._save_cache()
-        return score
+        rating = self.get_rating(domain)
+        return rating.score if rating is not None else self.DEFAULT_SCORE
+
+    def get_rating(self, domain: str) -> Optional[Rating]:
+        """Rating of a URL or host; see lookup()"""
+        source = parse_source(domain)
+        return self.lookup(source) if source is not None else None
+
+    def lookup(self, source: SourceDomain) -> Optional[Rating]:
+        """
+        The most specific rating covering the source: the host itself, a
+        parent domain such as the registrable domain, or a rated suffix
+        (e.g. gov.uk). Unrated sources are noted by registrable domain.
+        """
+        index = get_domain_index()
+        match = index.longest_match(source.host) if index is not None else None
+        rating = Rating(*match) if match is not None else None
+        # The trie holds every rating read when the import command last built it; the
+        # store is only consulted once ratings have been written since, for the host
+        # and each parent down to the trie's match
+        if index is None or self.store.updated_since(index.built):
+            for domain in ancestors(source.host):
+                stored = self.store.get(domain)
+                if stored is not None:
+                    rating = stored
+                    break
+                if match is not None and domain == match[0]:
+                    break
+        if rating is None:
+            self.store.record_unrated(source.registrable_domain or source.host)
+        return rating
@@ -0,0 +1,95 @@
+"""Process-pool execution of section scoring for large documents"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# Number of pool processes; 0 keeps section scoring serial in the request thread
+PARALLEL_WORKERS = int(os.environ.get('PARALLEL_WORKERS', '0'))
+# Documents with fewer sections to score than this are always scored serially
+PARALLEL_THRESHOLD = int(os.environ.get('PARALLEL_SECTION_THRESHOLD', '64'))
+
+def _warm_worker() -> None:
+    """Load TextBlob's lexicon once per worker instead of on its first task"""
+    try:
+        from textblob import TextBlob  # type: ignore
+        TextBlob('Warm up the sentiment lexicon.').sentiment  # type: ignore
+    except Exception as e:
+        logger.warning(f"Failed to warm section worker: {e}")
+
+def _run_chunk(func: Callable[[Any], T], items: Sequence[Any]) -> List[Optional[T]]:
+    """Apply func to each item, recording failures as None like the serial path skips them"""
+    results: List[Optional[T]] = []
+    for item in items:
+        try:
+            results.append(func(item))
+        except Exception as e:
+            logger.error(f"Error scoring section in worker: {e}")
+            results.append(None)
+    return results
+
+class SectionPool:
+    """
+    A persistent pool of warm worker processes.
+
+    Work is split into contiguous chunks, one or a few per worker, and results
+    come back in input order, so aggregating them gives the same answer as the
+    serial path regardless of scheduling.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = max(1, workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            # A pool inherited across fork (e.g. gunicorn preload) cannot be used by the child
+            if self._executor is None or self._pid != os.getpid():
+                context = multiprocessing.get_context('forkserver' if os.name == 'posix' else 'spawn')
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=context, initializer=_warm_worker
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def map(self, func: Callable[[Any], T], items: Sequence[Any]) -> List[Optional[T]]:
+        """Apply a picklable module-level func to every item, preserving order"""
+        if not items:
+            return []
+        executor = self._get_executor()
+        chunks = self.workers * 4
+        size = max(1, -(-len(items) // chunks))
+        futures = [executor.submit(_run_chunk, func, items[i:i + size]) for i in range(0, len(items), size)]
+        results: List[Optional[T]] = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=True)
+            self._executor = None
+            self._pid = None
+
+_pool: Optional[SectionPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> Optional[SectionPool]:
+    """Return the shared section pool, or None when parallel scoring is disabled"""
+    global _pool
+    if PARALLEL_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SectionPool(PARALLEL_WORKERS)
+    return _pool
@@ -0,0 +1,65 @@
+"""Sampling profiler for a live worker, producing collapsed stacks for flame graphs"""
+import collections
+import functools
+import os
+import sys
+import threading
+import time
+from typing import Counter, Dict
+
+from backend.errors import ProfilerBusyError
+
+# One profile at a time per process; overlapping samplers would profile each other
+_profiling = threading.Lock()
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter[str]:
+    """
+    Sample the stack of every other thread in this process every `interval`
+    seconds for `seconds`, counting identical stacks. Stacks are keyed root
+    first, starting with the thread name, with frames separated by ';'.
+    """
+    counts: Counter[str] = collections.Counter()
+    me = threading.get_ident()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        names: Dict[int, str] = {thread.ident: thread.name for thread in threading.enumerate() if thread.ident}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            current = frame
+            while current is not None:
+                stack.append(_label(current.f_code.co_filename, current.f_code.co_name, current.f_code.co_firstlineno))
+                current = current.f_back
+            stack.append(names.get(ident, f'thread-{ident}'))
+            counts[';'.join(reversed(stack))] += 1
+        del frame
+        time.sleep(interval)
+    return counts
+
+def profile(seconds: float, interval: float = 0.005) -> str:
+    """
+    Profile this process and return the samples in the collapsed-stack
+    format read by flamegraph.pl and speedscope ("frame;frame;frame count").
+    Raises ProfilerBusyError if a profile is already running.
+    """
+    if not _profiling.acquire(blocking=False):
+        raise ProfilerBusyError("A profile is already running in this worker")
+    try:
+        counts = sample_stacks(seconds, interval)
+    finally:
+        _profiling.release()
+    return ''.join(f'{stack} {count}\n' for stack, count in sorted(counts.items()))
+
+@functools.lru_cache(maxsize=4096)
+def _label(filename: str, function: str, first_line: int) -> str:
+    return f'{function} ({_short_path(filename)}:{first_line})'.replace(';', ':')
+
+def _short_path(filename: str) -> str:
+    """filename relative to the sys.path entry it was imported from"""
+    best = ''
+    for entry in sys.path:
+        entry = os.path.abspath(entry) if entry else os.getcwd()
+        if filename.startswith(entry + os.sep) and len(entry) > len(best):
+            best = entry
+    return filename[len(best) + 1:] if best else filename
@@ -0,0 +1,279 @@
+"""Rewrite providers: pooled, batched clients for remote rewriting models"""
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from backend.errors import APIError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASE_URL = 'https://api.openai.com/v1'
+
+# Statuses worth retrying: rate limiting and server-side failures
+_RETRY_STATUSES = frozenset((408, 429, 500, 502, 503, 504))
+
+_INSTRUCTIONS = (
+    "Rewrite each sentence in the JSON array in neutral, unbiased language, keeping its "
+    "meaning and facts. Reply with only a JSON array of the rewritten sentences, in the "
+    "same order and of the same length."
+)
+
+class CircuitBreaker:
+    """
+    Fail fast while a provider is down.
+
+    After `failure_threshold` consecutive failures the breaker opens and calls
+    are refused for `reset_timeout` seconds. Then a single trial call is let
+    through: success closes the breaker, failure opens it again, and an
+    outcome that says nothing about the provider (record_neutral) lets the
+    next call be the trial.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._trial or time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now"""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_neutral(self) -> None:
+        """End a call that neither succeeded nor showed the provider failing"""
+        with self._lock:
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+class RewriteProvider:
+    """A model that rewrites sentences into neutral language"""
+
+    def configured(self, api_key: Optional[str] = None) -> bool:
+        """Whether rewrite() can be called, given the caller's API key if any"""
+        raise NotImplementedError
+
+    def rewrite(self, sentences: Sequence[str], api_key: Optional[str] = None) -> List[str]:
+        """Return one rewritten sentence per input sentence; raises APIError on failure"""
+        raise NotImplementedError
+
+class RemoteRewriteProvider(RewriteProvider):
+    """
+    Client for an OpenAI-compatible chat completions endpoint.
+
+    Sentences are packed into batches of up to `max_batch_sentences` /
+    `max_batch_chars`, so an article costs a few calls rather than one per
+    sentence, and the batches of an article are sent concurrently. Calls go
+    through one requests.Session whose keep-alive pool is sized to
+    `max_concurrency`, which also bounds the calls in flight from this
+    process. Rate-limited and failed calls are retried with jittered
+    exponential backoff, and a CircuitBreaker stops calls while the
+    provider keeps failing. Rejections of a caller's own key (an auth error,
+    or its rate limit) do not count against the provider.
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, model: str = 'gpt-4o',
+                 api_key: Optional[str] = None, max_batch_sentences: int = 20,
+                 max_batch_chars: int = 6000, max_concurrency: int = 8, timeout: float = 30.0,
+                 max_retries: int = 3, backoff: float = 0.5, max_backoff: float = 8.0,
+                 breaker: Optional[CircuitBreaker] = None) -> None:
+        self.url = base_url.rstrip('/') + '/chat/completions'
+        self.model = model
+        self.api_key = api_key
+        self.max_batch_sentences = max_batch_sentences
+        self.max_batch_chars = max_batch_chars
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._session: Any = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+
+    def configured(self, api_key: Optional[str] = None) -> bool:
+        return bool(api_key or self.api_key)
+
+    def _resources(self) -> Any:
+        """The pooled session and batch executor, created per process since neither survives a fork"""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    try:
+                        import requests  # deferred: only needed once remote rewriting is used
+                        from requests.adapters import HTTPAdapter
+                    except ImportError:
+                        raise APIError("Remote rewriting requires the requests package") from None
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._session = session
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                                        thread_name_prefix='rewrite-provider')
+                    self._pid = os.getpid()
+        return self._session
+
+    def batches(self, sentences: Sequence[str]) -> List[List[int]]:
+        """Group sentence indexes into batches within the sentence and character limits"""
+        batches: List[List[int]] = []
+        batch: List[int] = []
+        chars = 0
+        for i, sentence in enumerate(sentences):
+            if batch and (len(batch) >= self.max_batch_sentences or chars + len(sentence) > self.max_batch_chars):
+                batches.append(batch)
+                batch = []
+                chars = 0
+            batch.append(i)
+            chars += len(sentence)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def rewrite(self, sentences: Sequence[str], api_key: Optional[str] = None) -> List[str]:
+        key = api_key or self.api_key
+        if not key:
+            raise APIError("No API key configured for remote rewriting")
+        if not sentences:
+            return []
+        self._resources()
+        batches = [[sentences[i] for i in batch] for batch in self.batches(sentences)]
+        if len(batches) == 1:
+            results = [self._call(batches[0], key)]
+        else:
+            assert self._executor is not None
+            futures = [self._executor.submit(self._call, batch, key) for batch in batches]
+            results = [future.result() for future in futures]
+        return [sentence for result in results for sentence in result]
+
+    def _call(self, batch: List[str], api_key: str) -> List[str]:
+        if not self.breaker.allow():
+            raise APIError("Remote rewriting is unavailable after repeated failures",
+                           {'circuit': self.breaker.state})
+        payload = {
+            'model': self.model,
+            'temperature': 0,
+            'messages': [
+                {'role': 'system', 'content': _INSTRUCTIONS},
+                {'role': 'user', 'content': json.dumps(batch)}
+            ]
+        }
+        headers = {'Authorization': f'Bearer {api_key}'}
+        error = APIError("Remote rewriting failed")
+        status = None
+        # Every way out of the call reports to the breaker, so a trial call never stays open
+        recorded = False
+        try:
+            for attempt in range(self.max_retries + 1):
+                delay = None
+                try:
+                    with self._slots:
+                        response = self._resources().post(self.url, json=payload, headers=headers,
+                                                          timeout=self.timeout)
+                    status = response.status_code
+                    if status == 200:
+                        rewritten = _parse_sentences(response.json(), len(batch))
+                        self.breaker.record_success()
+                        recorded = True
+                        return rewritten
+                    error = APIError(f"Rewrite provider returned HTTP {status}", {'status': status})
+                    if status not in _RETRY_STATUSES:
+                        # The caller's request or key is at fault, not the provider
+                        raise error
+                    delay = _retry_after(response.headers.get('Retry-After'))
+                except ValueError as e:
+                    # Caught before OSError, as requests' JSONDecodeError is both. Retrying would
+                    # get the same body, and a malformed reply does not mean the provider is down
+                    raise APIError(f"Rewrite provider sent an unusable response: {e}") from e
+                except OSError as e:
+                    # requests' exceptions (timeouts, refused and reset connections) are OSErrors
+                    status = None
+                    error = APIError(f"Rewrite provider request failed: {e}")
+                if attempt < self.max_retries:
+                    # Full jitter keeps workers that failed together from retrying together
+                    backoff = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                    time.sleep(min(self.max_backoff, delay) if delay is not None else backoff)
+            # A caller's own key running into its rate limit says nothing about the
+            # provider, and must not shut off rewriting for the server's key
+            if not (status == 429 and api_key != self.api_key):
+                self.breaker.record_failure()
+                recorded = True
+            logger.warning("Remote rewrite of %d sentences failed: %s", len(batch), error.message)
+            raise error
+        finally:
+            if not recorded:
+                self.breaker.record_neutral()
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+def _parse_sentences(body: Dict[str, Any], expected: int) -> List[str]:
+    try:
+        content = body['choices'][0]['message']['content'].strip()
+    except (KeyError, IndexError, TypeError, AttributeError):
+        raise ValueError("no message content") from None
+    if content.startswith('```'):
+        content = content.strip('`').split('\n', 1)[-1]
+    sentences = json.loads(content)
+    if not isinstance(sentences, list) or len(sentences) != expected or \
+            not all(isinstance(sentence, str) for sentence in sentences):
+        raise ValueError(f"expected a JSON array of {expected} strings")
+    return sentences
+
+_provider: Optional[RewriteProvider] = None
+_provider_lock = threading.Lock()
+
+def get_provider() -> RewriteProvider:
+    """Return the shared remote rewrite provider, configured from the environment"""
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = RemoteRewriteProvider(
+                    base_url=os.environ.get('REWRITE_PROVIDER_URL', DEFAULT_BASE_URL),
+                    model=os.environ.get('REWRITE_MODEL', 'gpt-4o'),
+                    api_key=os.environ.get('OPENAI_API_KEY'),
+                    max_batch_sentences=int(os.environ.get('REWRITE_BATCH_SENTENCES', '20')),
+                    max_concurrency=int(os.environ.get('REWRITE_MAX_CONCURRENCY', '8')),
+                    timeout=float(os.environ.get('REWRITE_TIMEOUT', '30'))
+                )
+    return _provider
@@ -0,0 +1,145 @@
+"""Token-bucket rate limiting shared across worker processes"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+class BucketStore:
+    """
+    Storage for token buckets. take() must be atomic: it refills the bucket
+    for the elapsed time, then removes cost tokens if enough are available.
+    """
+
+    def take(self, client: str, capacity: float, rate: float, cost: float, now: float) -> Tuple[bool, float]:
+        """Return (allowed, tokens left) for the client"""
+        raise NotImplementedError
+
+    def evict_idle(self, older_than: float) -> int:
+        """Forget buckets untouched since older_than; they would be full again anyway"""
+        raise NotImplementedError
+
+def _refill(tokens: float, updated: float, capacity: float, rate: float, now: float) -> float:
+    return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+class MemoryBucketStore(BucketStore):
+    """Buckets held in this process only"""
+
+    def __init__(self) -> None:
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, client: str, capacity: float, rate: float, cost: float, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated = self._buckets.get(client, (capacity, now))
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[client] = (tokens, now)
+            return allowed, tokens
+
+    def evict_idle(self, older_than: float) -> int:
+        with self._lock:
+            idle = [client for client, (_, updated) in self._buckets.items() if updated < older_than]
+            for client in idle:
+                del self._buckets[client]
+            return len(idle)
+
+class SQLiteBucketStore(BucketStore):
+    """
+    Buckets in a SQLite file shared by every worker on the host.
+
+    Each take() runs in a BEGIN IMMEDIATE transaction, which holds the write
+    lock for the read-refill-write, so concurrent workers cannot over-admit.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'client TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+        self._connect().execute('CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated)')
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, client: str, capacity: float, rate: float, cost: float, now: float) -> Tuple[bool, float]:
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE client = ?', (client,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = _refill(tokens, updated, capacity, rate, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets (client, tokens, updated) VALUES (?, ?, ?)',
+                (client, tokens, now)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, tokens
+
+    def evict_idle(self, older_than: float) -> int:
+        cursor = self._connect().execute('DELETE FROM buckets WHERE updated < ?', (older_than,))
+        return cursor.rowcount
+
+class TokenBucketLimiter:
+    """
+    Allow each client `capacity` requests in a burst, refilled continuously so
+    that at most `capacity` requests are admitted per `period` seconds.
+
+    Memory is one (tokens, timestamp) pair per active client. Buckets idle for
+    longer than a full refill are evicted, since a fresh bucket is equivalent.
+    """
+
+    def __init__(self, store: BucketStore, capacity: float, period: float = 3600.0,
+                 evict_every: int = 1000) -> None:
+        self.store = store
+        self.capacity = float(capacity)
+        self.period = float(period)
+        self.rate = self.capacity / self.period
+        self.evict_every = evict_every
+        self._calls = 0
+
+    def acquire(self, client: str, cost: float = 1.0, now: Optional[float] = None) -> RateLimitResult:
+        """Consume tokens for one request and report whether it is allowed"""
+        now = time.time() if now is None else now
+        allowed, tokens = self.store.take(client, self.capacity, self.rate, cost, now)
+
+        self._calls += 1
+        if self._calls % self.evict_every == 0:
+            self.store.evict_idle(now - self.period)
+
+        retry_after = 0.0 if allowed else (cost - tokens) / self.rate
+        return RateLimitResult(allowed, int(tokens), retry_after)
+
+def create_limiter(capacity: float, period: float = 3600.0, backend: str = 'memory',
+                   path: Optional[str] = None) -> TokenBucketLimiter:
+    """Build a limiter by backend name ('memory' or 'sqlite')"""
+    if backend == 'memory':
+        store: BucketStore = MemoryBucketStore()
+    elif backend == 'sqlite':
+        store = SQLiteBucketStore(path or 'cache/rate_limit.sqlite3')
+    else:
+        raise ValueError(f"Unknown rate limit backend: {backend}")
+    return TokenBucketLimiter(store, capacity, period)
@@ -0,0 +1,256 @@
+"""Local rule-based rewriting of loaded language into neutral phrasing"""
+import hashlib
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from backend.cache import MemoryBackend
+from backend.lexicon import LexiconScanner, default_scanner
+from backend.text_utils import sentence_spans
+
+# Loaded phrase -> neutral replacement. An empty replacement drops the phrase,
+# which suits intensifiers and loaded adjectives. Longer phrases win over the
+# words they contain, so "corporate puppets" is rewritten as a unit.
+NEUTRAL_PHRASES: Dict[str, str] = {
+    # Labels for people and groups
+    'right-wing extremists': 'conservative lawmakers',
+    'radical left-wing democrats': 'Democrats',
+    'radical left-wing': 'progressive',
+    'out-of-touch coastal elites': 'lawmakers',
+    'out-of-touch conservative politicians': 'conservative politicians',
+    'corporate puppets': 'industry-aligned lawmakers',
+    'political puppets': 'political allies',
+    'corporate masters': 'corporate supporters',
+    'billionaire donors': 'wealthy donors',
+    'ultra-wealthy elite': 'wealthiest households',
+    'wealthy donors': 'donors',
+    'climate change deniers': 'opponents of the legislation',
+    'digital overlords': 'technology companies',
+    'arrogant billionaires with god complexes': 'executives',
+    'big tech monopolies': 'large technology companies',
+    'dangerous monopolies': 'large technology companies',
+    'tech-captured regulators': 'regulators',
+    'bought-and-paid-for politicians': 'politicians',
+    'corrupt politicians': 'politicians',
+    'heartless opponents': 'opponents',
+    'profiteers': 'industry groups',
+    'polluters': 'energy producers',
+    'radical base': 'base',
+    'dangerous levels': 'higher levels',
+    'dangerous regression': 'return',
+    'extreme agenda': 'agenda',
+    'complete disregard': 'disregard',
+    'complete dismissal': 'dismissal',
+    # Characterisations of policy
+    'legislative disaster': 'legislation',
+    'power grab': 'expansion of government authority',
+    'assault on their livelihoods': 'change affecting their livelihoods',
+    'class warfare': 'a policy',
+    'socialist experiments': 'policies',
+    'failed trickle-down experiments': 'tax-cut policies',
+    'failed policies': 'earlier policies',
+    'destructive ideology': 'approach',
+    'moral bankruptcy': 'shortcomings',
+    'thinly veiled attempt': 'attempt',
+    'cynical attempt': 'attempt',
+    'handouts': 'benefits',
+    'propaganda': 'messaging',
+    'obscene profits': 'profits',
+    'dirty energy money': 'energy industry funding',
+    'corrupt alliance': 'alliance',
+    'sinister alliance': 'alliance',
+    'intergenerational crime against humanity': 'long-term risk',
+    'attack on our values and way of life': 'significant change',
+    # Predictions stated as certainties
+    'will surely destroy jobs': 'could reduce jobs',
+    'destroy jobs': 'reduce jobs',
+    'wreck our economy': 'affect the economy',
+    'bankrupt our nation': 'increase the national debt',
+    'will devastate': 'will affect',
+    'devastate': 'affect',
+    'dooms future generations to': 'could expose future generations to',
+    'condemns millions of americans to': 'could expose millions of Americans to',
+    'always fail': 'have had mixed results',
+    'every credible economist warns': 'some economists warn',
+    'every legitimate scientist has warned us': 'many scientists have warned',
+    'every reputable medical organization supports': 'many medical organizations support',
+    'independent experts universally condemn': 'some independent experts criticize',
+    'cannot be overstated': 'is significant',
+    'the undeniable reality is that': 'supporters argue that',
+    'history has proven time and again that': 'supporters argue that',
+    # Loaded modifiers, dropped. Words that are also used literally ("dangerous
+    # drivers", "extreme weather") are only rewritten as part of the phrases above.
+    'heartless': '', 'cruel': '', 'callous': '', 'callously': '', 'shameful': '',
+    'reckless': '', 'recklessly': '', 'heroic': '', 'heroically': '', 'courageously': '',
+    'brave': '', 'blatant': '', 'predatory': '', 'arrogant': '', 'sinister': '',
+    'catastrophic': 'serious', 'radical': '',
+    'deliberately': '', 'conveniently': '', 'systematically': '', 'completely': '',
+    'once again': '', 'nothing but': '', 'truly': '',
+    'overwhelming': '', 'massively': '', 'devastating': '', 'disastrous': '',
+    'terrible': '', 'outrageous': '',
+}
+
+_VOWEL_SOUND = re.compile(r'[aeiouAEIOU]')
+_DETERMINER_END = re.compile(r'\b(?:a|an|the|this|that|these|those|its|their|our|his|her|your)\s*$', re.IGNORECASE)
+# A following word that a dropped adverb or phrase could have been modifying
+_FOLLOWING_WORD = re.compile(r'\s+(?!(?:and|or|but|nor|than|as)\b)\w', re.IGNORECASE)
+# A following word that a dropped adjective could have been modifying: not a
+# conjunction, preposition, determiner, pronoun or auxiliary ("cruel to the poor")
+_MODIFIED_WORD = re.compile(
+    r"\s+(?!(?:and|or|but|nor|than|as|to|of|in|on|at|for|with|by|from|about|into|onto|upon|over|under"
+    r"|toward|towards|against|because|if|when|while|that|which|who|whom|whose|the|a|an|this|these"
+    r"|those|it|they|he|she|we|you|i|is|are|was|were|be|been|enough)\b)\w",
+    re.IGNORECASE
+)
+# Words after which an adjective is the predicate ("the plan was cruel") or is
+# itself modified ("a very cruel plan") rather than standing in a noun phrase
+_PREDICATE_END = re.compile(
+    r"(?:\b(?:is|are|was|were|be|been|being|am|seems?|seemed|becomes?|became|remains?|remained"
+    r"|appears?|appeared|looks?|looked|sounds?|sounded|feels?|felt|so|too|very|how|as|more|most"
+    r"|less|least|quite|rather|really|not)|['’](?:s|re))\s*$",
+    re.IGNORECASE
+)
+_SENTENCE_RE = re.compile(r'[^.!?]+(?:[.!?]+|$)')
+
+class RewriteResult(NamedTuple):
+    text: str
+    changes: int
+    # (start, end) of sentences in the rewritten text that still contain lexicon terms
+    residue: List[Tuple[int, int]]
+
+class RuleRewriter:
+    """
+    Rewrite loaded phrases with a replacement table.
+
+    The phrases are compiled into a LexiconScanner, so each sentence is
+    rewritten in a single scan whatever the size of the table. Rewritten
+    sentences are cached by hash, since the same boilerplate and quotes recur
+    across articles. Sentences that still contain bias or emotion lexicon
+    terms afterwards are reported as residue for a model to handle.
+    """
+
+    def __init__(self, phrases: Optional[Dict[str, str]] = None, cache_size: int = 50000) -> None:
+        phrases = NEUTRAL_PHRASES if phrases is None else phrases
+        # Phrases are grouped under their replacement, so a hit's category is its replacement
+        by_replacement: Dict[str, List[str]] = {}
+        for phrase, replacement in phrases.items():
+            by_replacement.setdefault(replacement, []).append(phrase)
+        self._scanner = LexiconScanner(by_replacement)
+        self._cache = MemoryBackend(max_entries=cache_size)
+
+    def rewrite(self, text: str) -> RewriteResult:
+        pieces: List[str] = []
+        residue: List[Tuple[int, int]] = []
+        changes = 0
+        pos = 0
+        length = 0
+        for start, end in _sentences(text):
+            between = text[pos:start]
+            rewritten, sentence_changes, biased = self.rewrite_sentence(text[start:end])
+            pieces.append(between)
+            length += len(between)
+            if biased:
+                residue.append((length, length + len(rewritten)))
+            pieces.append(rewritten)
+            length += len(rewritten)
+            changes += sentence_changes
+            pos = end
+        pieces.append(text[pos:])
+        return RewriteResult(''.join(pieces), changes, residue)
+
+    def rewrite_sentence(self, sentence: str) -> Tuple[str, int, bool]:
+        """Return (rewritten sentence, replacements made, still contains lexicon terms)"""
+        key = hashlib.blake2b(sentence.encode('utf-8'), digest_size=16).hexdigest()
+        cached = self._cache.get(key)
+        if cached is None:
+            cached = self._rewrite_sentence(sentence)
+            self._cache.set(key, cached)
+        return cached
+
+    def _rewrite_sentence(self, sentence: str) -> Tuple[str, int, bool]:
+        # The rewritten sentence up to `pos`; an article in it may have to agree with what now follows
+        head = ''
+        pos = 0
+        changes = 0
+        kept = False
+        for hit in self._scanner.iter_hits(sentence):
+            replacement = hit.category
+            if not replacement:
+                # A modifier can be dropped when it directly precedes the word it modifies
+                # inside a noun phrase ("a cruel plan"), or is one of a list of them ("a
+                # costly, cruel plan"). Elsewhere it is the predicate ("the plan was cruel to
+                # the poor") and is left for a model to rephrase.
+                preceding = head + sentence[pos:hit.start]
+                in_list = sentence.startswith(',', hit.end) and bool(_DETERMINER_END.search(preceding))
+                if ' ' in hit.text or hit.text.lower().endswith('ly'):
+                    attributive = bool(_FOLLOWING_WORD.match(sentence, hit.end))
+                else:
+                    attributive = bool(_MODIFIED_WORD.match(sentence, hit.end)) and \
+                        not _PREDICATE_END.search(preceding)
+                if not (in_list or attributive):
+                    kept = True
+                    continue
+                pos = hit.end + in_list
+                changes += 1
+                # Take the space before the phrase with it, or the one after at the start of the sentence
+                head = _fix_article(preceding, sentence[pos:].lstrip())
+                if head.endswith(', '):
+                    head = head[:-2]
+                elif head.endswith(' '):
+                    head = head[:-1]
+                elif sentence.startswith(' ', pos):
+                    pos += 1
+                continue
+            changes += 1
+            if hit.text[0].isupper():
+                replacement = replacement[0].upper() + replacement[1:]
+            head = _fix_article(head + sentence[pos:hit.start], replacement) + replacement
+            pos = hit.end
+        if not changes:
+            rewritten = sentence
+        else:
+            rewritten = _tidy(head + sentence[pos:], sentence)
+        biased = kept or next(default_scanner.iter_hits(rewritten), None) is not None
+        return rewritten, changes, biased
+
+def _fix_article(before: str, following: str) -> str:
+    """Make a trailing 'a'/'an' agree with the word that now follows it"""
+    match = re.search(r'\b([Aa]n?) $', before)
+    if not match or not following:
+        return before
+    article = 'an' if _VOWEL_SOUND.match(following[0]) else 'a'
+    if match.group(1)[0] == 'A':
+        article = article.capitalize()
+    return before[:match.start(1)] + article + ' '
+
+def _tidy(rewritten: str, original: str) -> str:
+    """Restore the sentence's leading capital and remove spacing left by dropped words"""
+    rewritten = re.sub(r' {2,}', ' ', rewritten)
+    rewritten = re.sub(r' ([,.;:!?])', r'\1', rewritten)
+    rewritten = re.sub(r'[,;:]+([,.;:!?])', r'\1', rewritten)
+    stripped = rewritten.lstrip()
+    if stripped and original.lstrip()[:1].isupper():
+        rewritten = rewritten[:len(rewritten) - len(stripped)] + stripped[0].upper() + stripped[1:]
+    return rewritten
+
+def _sentences(text: str) -> List[Tuple[int, int]]:
+    try:
+        starts, ends = sentence_spans(text)
+        return list(zip(starts, ends))
+    except Exception:
+        # Without the NLTK tokenizer, split after sentence-ending punctuation
+        spans = []
+        for match in _SENTENCE_RE.finditer(text):
+            start = match.start() + len(match.group()) - len(match.group().lstrip())
+            if start < match.end():
+                spans.append((start, match.end()))
+        return spans
+
+_rewriter: Optional[RuleRewriter] = None
+
+def get_rewriter() -> RuleRewriter:
+    """Return the shared rule rewriter, building it on first use"""
+    global _rewriter
+    if _rewriter is None:
+        _rewriter = RuleRewriter(cache_size=int(os.environ.get('REWRITE_CACHE_SIZE', '50000')))
+    return _rewriter
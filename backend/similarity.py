@@ -0,0 +1,362 @@
+"""Approximate nearest-neighbour index of articles for similarity search"""
+import glob
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from array import array
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process use only
+    fcntl = None  # type: ignore
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have he her his i in is it its of on or our "
+    "she that the their them they this to was we were which who will with you your".split()
+)
+
+class HashingEmbedder:
+    """
+    Embed text as a fixed-size, L2-normalised bag-of-words vector.
+
+    Words are feature-hashed into `dim` buckets with a hash-derived sign, and
+    term counts are dampened with 1 + log(tf). Hashing needs no vocabulary, so
+    vectors stay comparable as the corpus grows and across processes.
+    """
+
+    def __init__(self, dim: int = 512) -> None:
+        self.dim = dim
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        counts = Counter(tok for tok in _TOKEN_RE.findall(text.lower()) if tok not in _STOPWORDS)
+        for token, tf in counts.items():
+            h = zlib.crc32(token.encode('utf-8'))
+            sign = 1.0 if h & 0x80000000 else -1.0
+            vector[h % self.dim] += sign * (1.0 + math.log(tf))
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else vector
+
+class ArticleIndex:
+    """
+    Inverted-file (IVF) index over article vectors, persisted in a directory.
+
+    vectors.f32 holds one float32 row per article and is memory-mapped for
+    queries; meta.jsonl and assign.i32 hold each row's url/title and its
+    coarse cluster. Inserts append to all three files and then commit the
+    new row count to length.json, which is replaced atomically; readers only
+    see committed rows, and the next insert cuts off anything a crash left
+    after them. Once `train_size` articles exist, k-means centroids are
+    trained and a query only scores the rows of the `nprobe` clusters
+    closest to it. Training also writes a copy of the vectors grouped by
+    cluster (lists-<rows>.f32, laid out by ivf.npz), so each probed cluster is
+    scored as one contiguous slice; rows added since are assigned to their
+    nearest centroid and read from vectors.f32. The index is retrained, with
+    more clusters, whenever it has doubled in size since the last training.
+    Several processes may share a directory: appends are serialised with a
+    file lock and readers pick up rows written by others on their next query.
+    """
+
+    def __init__(self, directory: str, dim: int = 512, train_size: int = 4096, nprobe: int = 8) -> None:
+        self.directory = directory
+        self.dim = dim
+        self.train_size = train_size
+        self.nprobe = nprobe
+        self.embedder = HashingEmbedder(dim)
+        os.makedirs(directory, exist_ok=True)
+        self._vectors_path = os.path.join(directory, 'vectors.f32')
+        self._meta_path = os.path.join(directory, 'meta.jsonl')
+        self._assign_path = os.path.join(directory, 'assign.i32')
+        self._ivf_path = os.path.join(directory, 'ivf.npz')
+        self._length_path = os.path.join(directory, 'length.json')
+        self._lock_path = os.path.join(directory, '.lock')
+        self._lock = threading.RLock()
+
+        self._count = 0
+        self._meta: List[Dict[str, Any]] = []
+        self._meta_offset = 0
+        self._ids_by_url: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._ivf_version: Optional[Tuple[int, int]] = None
+        # Rows covered by the last training, as cluster-ordered vectors and their row ids;
+        # cluster c is rows _list_offsets[c]:_list_offsets[c + 1] of both
+        self._trained_rows = 0
+        self._list_vectors: Optional[np.ndarray] = None
+        self._list_rows = np.zeros(0, dtype=np.int64)
+        self._list_offsets = np.zeros(1, dtype=np.int64)
+        # Row ids added since training, by cluster (-1: not yet trained), appended to as rows arrive
+        self._lists: Dict[int, array] = {}
+        self._vectors: Optional[np.ndarray] = None
+        with self._file_lock():
+            if not os.path.exists(self._length_path):
+                # A new index, or one written before row counts were committed
+                self._commit(self._scan_length())
+        self.refresh()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, text: str, url: str, title: Optional[str] = None) -> int:
+        """Index an article and return its row id; an already indexed url keeps its row"""
+        vector = self.embedder.embed(text)
+        with self._lock, self._file_lock():
+            self.refresh()
+            if url in self._ids_by_url:
+                return self._ids_by_url[url]
+            row = self._count
+            cluster = self._nearest_centroids(vector, 1)[0] if self._centroids is not None else -1
+            line = (json.dumps({'url': url, 'title': title}) + '\n').encode('utf-8')
+            # Write past the committed length, dropping whatever an interrupted insert left there
+            _append_at(self._vectors_path, row * self.dim * 4, vector.astype(np.float32).tobytes())
+            _append_at(self._assign_path, row * 4, np.asarray([cluster], dtype=np.int32).tobytes())
+            _append_at(self._meta_path, self._meta_offset, line)
+            self._commit(row + 1)
+            self.refresh()
+            needs_training = self._count >= max(self.train_size, 2 * self._trained_rows)
+        if needs_training:
+            self.train()
+        return row
+
+    def search(self, text: str, k: int = 10, exclude_url: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Return up to k most similar indexed articles as dicts with url, title and score"""
+        query = self.embedder.embed(text)
+        with self._lock:
+            self.refresh()
+            if self._count == 0 or self._vectors is None:
+                return []
+            candidates, scores = self._score(query)
+            if candidates.size == 0:
+                return []
+            top = min(k + 1, scores.size)
+            best = np.argpartition(-scores, top - 1)[:top]
+            best = best[np.argsort(-scores[best])]
+
+            results: List[Dict[str, Any]] = []
+            for i in best:
+                meta = self._meta[int(candidates[i])]
+                if exclude_url and meta['url'] == exclude_url:
+                    continue
+                results.append({'url': meta['url'], 'title': meta.get('title'), 'score': float(scores[i])})
+            return results[:k]
+
+    def train(self, iterations: int = 10, seed: int = 0) -> None:
+        """
+        Fit k-means centroids on a sample of the vectors, reassign every row
+        and rewrite the cluster-ordered copy of the vectors
+        """
+        with self._lock, self._file_lock():
+            self.refresh()
+            if self._vectors is None or self._count == 0:
+                return
+            vectors = self._vectors
+            nlist = max(1, int(math.sqrt(self._count)))
+            rng = np.random.default_rng(seed)
+            sample = vectors[rng.choice(self._count, size=min(self._count, nlist * 64), replace=False)]
+            centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(nlist):
+                    members = sample[labels == c]
+                    if len(members):
+                        centroid = members.mean(axis=0)
+                        norm = np.linalg.norm(centroid)
+                        centroids[c] = centroid / norm if norm > 0 else centroid
+
+            count = self._count
+            assignments = np.concatenate([
+                np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1)
+                for start in range(0, count, 65536)
+            ]).astype(np.int32)
+            order = np.argsort(assignments, kind='stable')
+            offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=nlist))])
+
+            lists_path = self._lists_path(count)
+            with open(lists_path + '.tmp', 'wb') as f:
+                for start in range(0, count, 65536):
+                    f.write(np.ascontiguousarray(vectors[order[start:start + 65536]]).tobytes())
+            os.replace(lists_path + '.tmp', lists_path)
+            _atomic_write(self._assign_path, assignments.tobytes())
+            # The layout is published last, so readers never see it before its vectors
+            with open(self._ivf_path + '.tmp', 'wb') as f:
+                np.savez(f, centroids=centroids.astype(np.float32), offsets=offsets.astype(np.int64),
+                         rows=order.astype(np.int64))
+            os.replace(self._ivf_path + '.tmp', self._ivf_path)
+            # Readers may still be mapping the previous copy, so only older ones are removed
+            for path in glob.glob(os.path.join(self.directory, 'lists-*.f32')):
+                if path not in (lists_path, self._lists_path(self._trained_rows)):
+                    os.remove(path)
+            self.refresh()
+
+    def refresh(self) -> None:
+        """Load rows committed by this or other processes since the last refresh"""
+        with self._lock:
+            with open(self._length_path, 'r', encoding='utf-8') as f:
+                count = json.load(f)['rows']
+
+            ivf_version = _file_version(self._ivf_path)
+            retrained = ivf_version != self._ivf_version
+            if count == self._count and not retrained:
+                return
+
+            if count > len(self._meta):
+                with open(self._meta_path, 'rb') as f:
+                    f.seek(self._meta_offset)
+                    while len(self._meta) < count:
+                        meta = json.loads(f.readline())
+                        self._ids_by_url[meta['url']] = len(self._meta)
+                        self._meta.append(meta)
+                    self._meta_offset = f.tell()
+
+            if retrained:
+                self._load_ivf(ivf_version)
+            if retrained or not self._count:
+                start = self._trained_rows
+                self._lists = _cluster_lists(
+                    np.fromfile(self._assign_path, dtype=np.int32, count=count - start, offset=start * 4), start
+                ) if count > start else {}
+            elif count > self._count:
+                # Only the new rows' clusters are read; the lists grow in place
+                new = np.fromfile(self._assign_path, dtype=np.int32, count=count - self._count,
+                                  offset=self._count * 4)
+                for row, cluster in enumerate(new.tolist(), self._count):
+                    self._lists.setdefault(cluster, array('q')).append(row)
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(count, self.dim)) \
+                if count else None
+            self._count = count
+
+    def _load_ivf(self, version: Optional[Tuple[int, int]]) -> None:
+        if version is None:
+            self._centroids, self._list_vectors, self._trained_rows = None, None, 0
+            self._list_rows = np.zeros(0, dtype=np.int64)
+            self._list_offsets = np.zeros(1, dtype=np.int64)
+        else:
+            with np.load(self._ivf_path) as ivf:
+                self._centroids = ivf['centroids']
+                self._list_offsets = ivf['offsets']
+                self._list_rows = ivf['rows']
+            self._trained_rows = len(self._list_rows)
+            self._list_vectors = np.memmap(self._lists_path(self._trained_rows), dtype=np.float32, mode='r',
+                                           shape=(self._trained_rows, self.dim))
+        self._ivf_version = version
+
+    def _lists_path(self, rows: int) -> str:
+        return os.path.join(self.directory, f'lists-{rows}.f32')
+
+    def _commit(self, rows: int) -> None:
+        """Publish the first `rows` rows to readers"""
+        _atomic_write(self._length_path, json.dumps({'rows': rows}).encode('utf-8'))
+
+    def _scan_length(self) -> int:
+        """Number of rows present in full in all three files"""
+        rows = min(_file_size(self._vectors_path) // (self.dim * 4), _file_size(self._assign_path) // 4)
+        count = 0
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, 'rb') as f:
+                for line in f:
+                    if count == rows or not line.endswith(b'\n'):
+                        break
+                    count += 1
+        return count
+
+    def _nearest_centroids(self, vector: np.ndarray, n: int) -> List[int]:
+        assert self._centroids is not None
+        scores = self._centroids @ vector
+        n = min(n, len(scores))
+        return [int(c) for c in np.argpartition(-scores, n - 1)[:n]]
+
+    def _score(self, query: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Row ids of the candidates for a query and their scores"""
+        assert self._vectors is not None
+        if self._centroids is None:
+            return np.arange(self._count), self._vectors @ query
+
+        rows: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        probed = self._nearest_centroids(query, self.nprobe)
+        assert self._list_vectors is not None
+        for c in probed:
+            start, end = int(self._list_offsets[c]), int(self._list_offsets[c + 1])
+            if end > start:
+                rows.append(self._list_rows[start:end])
+                scores.append(self._list_vectors[start:end] @ query)
+        # Rows added since training sit together at the end of vectors.f32
+        added = [np.frombuffer(self._lists[c], dtype=np.int64) for c in probed if c in self._lists]
+        if added:
+            added_rows = np.sort(np.concatenate(added))
+            rows.append(added_rows)
+            scores.append(self._vectors[added_rows] @ query)
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(scores)
+
+    def _file_lock(self) -> "_FileLock":
+        return _FileLock(self._lock_path)
+
+class _FileLock:
+    """Exclusive advisory lock on a file, held for the duration of a with-block"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._file: Optional[Any] = None
+
+    def __enter__(self) -> "_FileLock":
+        self._file = open(self.path, 'a')
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        assert self._file is not None
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        self._file.close()
+
+def _cluster_lists(assignments: np.ndarray, first_row: int = 0) -> Dict[int, array]:
+    """Row ids grouped by cluster, for rows numbered from first_row"""
+    order = np.argsort(assignments, kind='stable')
+    clusters, starts = np.unique(assignments[order], return_index=True)
+    bounds = list(starts[1:]) + [len(order)]
+    rows = order.astype(np.int64) + first_row
+    return {int(c): array('q', rows[s:e].tobytes()) for c, s, e in zip(clusters, starts, bounds)}
+
+def _file_version(path: str) -> Optional[Tuple[int, int]]:
+    """Identity of a file's current contents, which changes when it is replaced"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+def _file_size(path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+def _append_at(path: str, offset: int, data: bytes) -> None:
+    """Write data at offset, cutting the file off there first"""
+    with open(path, 'ab') as f:
+        f.truncate(offset)
+        f.write(data)
+
+def _atomic_write(path: str, data: bytes) -> None:
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+_index: Optional[ArticleIndex] = None
+_index_lock = threading.Lock()
+
+def get_index() -> ArticleIndex:
+    """Return the shared article index, opening it on first use"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ArticleIndex(os.environ.get('SIMILARITY_INDEX_DIR', 'cache/similarity'))
+    return _index
@@ -0,0 +1,122 @@
+"""Coalescing of concurrent identical computations"""
+import contextlib
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays within each process
+    fcntl = None  # type: ignore
+
+class _Call:
+    __slots__ = ('done', 'value', 'error')
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class FileLockStore:
+    """
+    Per-key locks shared by the processes on a host, held as byte-range locks
+    on a single file.
+
+    Each key locks one byte at an offset derived from its hash, so no lock
+    files accumulate, and the kernel releases the locks of a process that
+    dies. A caller that cannot get a lock within `timeout` seconds goes ahead
+    without it rather than queue behind a stuck computation.
+    """
+
+    def __init__(self, path: str, timeout: float = 30.0, poll_interval: float = 0.01) -> None:
+        self.path = path
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _file(self) -> int:
+        # Record locks are per process and are dropped when any descriptor of the
+        # file is closed, so each process keeps exactly one open
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                    self._pid = os.getpid()
+        assert self._fd is not None
+        return self._fd
+
+    @contextlib.contextmanager
+    def hold(self, key: str) -> Iterator[bool]:
+        """Hold the key's lock for the duration of the block; yields whether it was acquired"""
+        if fcntl is None:
+            yield False
+            return
+        fd = self._file()
+        offset = int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'big') >> 2
+        deadline = time.monotonic() + self.timeout
+        acquired = False
+        while True:
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, offset)
+                acquired = True
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    break
+                time.sleep(self.poll_interval)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, offset)
+
+class SingleFlight:
+    """
+    Run one computation per key at a time and share its result.
+
+    The first caller for a key computes it; callers that arrive while it is
+    running wait for it and get the same value (or exception) rather than
+    repeating the work. With a FileLockStore the leaders in different
+    processes also take turns per key, which lets a process pick up the
+    result another one stored in a shared cache.
+    """
+
+    def __init__(self, lock_store: Optional[FileLockStore] = None) -> None:
+        self.lock_store = lock_store
+        self.coalesced = 0
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, compute: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            if self.lock_store is not None:
+                with self.lock_store.hold(key):
+                    call.value = compute()
+            else:
+                call.value = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value
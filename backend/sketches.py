@@ -0,0 +1,141 @@
+"""Mergeable cardinality sketches for corpus-wide set comparisons"""
+import base64
+import hashlib
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count sketch with 2**precision one-byte registers.
+
+    The relative standard error of cardinality() is about 1.04 / sqrt(2**precision).
+    Sketches with the same precision merge losslessly by taking the register-wise
+    maximum, so per-article sketches can be stored and combined later.
+    """
+
+    def __init__(self, precision: int = 12) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @classmethod
+    def for_error(cls, error: float) -> 'HyperLogLog':
+        """Create a sketch whose standard error is at most `error` (e.g. 0.02 for 2%)"""
+        precision = math.ceil(math.log2((1.04 / error) ** 2))
+        return cls(min(18, max(4, precision)))
+
+    def add(self, item: str) -> None:
+        h = int.from_bytes(hashlib.blake2b(item.encode('utf-8'), digest_size=8).digest(), 'big')
+        bits = 64 - self.precision
+        index = h >> bits
+        rest = h & ((1 << bits) - 1)
+        rank = bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items: Iterable[str]) -> 'HyperLogLog':
+        for item in items:
+            self.add(item)
+        return self
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        """Fold another sketch into this one; the result estimates the union"""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge sketches with different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def cardinality(self) -> float:
+        m = float(len(self.registers))
+        alpha = 0.7213 / (1 + 1.079 / m) if m >= 128 else {16: 0.673, 32: 0.697, 64: 0.709}[int(m)]
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate while many registers are still empty
+        if estimate <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)
+        return estimate
+
+    def copy(self) -> 'HyperLogLog':
+        sketch = HyperLogLog(self.precision)
+        sketch.registers[:] = self.registers
+        return sketch
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + self.registers.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'HyperLogLog':
+        sketch = cls(data[0])
+        sketch.registers = np.frombuffer(data[1:], dtype=np.uint8).copy()
+        return sketch
+
+class ContextSketch:
+    """
+    Sketch of one or more articles' `related_events` and `missing_context`.
+
+    Holds a HyperLogLog per field for the distinct items plus the exact total
+    item counts, which is all analyze_context_overlap needs. Sketches can be
+    precomputed per article, stored with to_dict(), and merged.
+    """
+
+    def __init__(self, error: float = 0.02) -> None:
+        self.events = HyperLogLog.for_error(error)
+        self.missing = HyperLogLog.for_error(error)
+        self.events_total = 0
+        self.missing_total = 0
+
+    @classmethod
+    def from_context(cls, context: Dict[str, List[str]], error: float = 0.02) -> 'ContextSketch':
+        sketch = cls(error)
+        events = context.get('related_events', [])
+        missing = context.get('missing_context', [])
+        sketch.events.update(events)
+        sketch.missing.update(missing)
+        sketch.events_total = len(events)
+        sketch.missing_total = len(missing)
+        return sketch
+
+    def copy(self) -> 'ContextSketch':
+        sketch = ContextSketch.__new__(ContextSketch)
+        sketch.events = self.events.copy()
+        sketch.missing = self.missing.copy()
+        sketch.events_total = self.events_total
+        sketch.missing_total = self.missing_total
+        return sketch
+
+    def merge(self, other: 'ContextSketch') -> 'ContextSketch':
+        self.events.merge(other.events)
+        self.missing.merge(other.missing)
+        self.events_total += other.events_total
+        self.missing_total += other.missing_total
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'events': base64.b64encode(self.events.to_bytes()).decode('ascii'),
+            'missing': base64.b64encode(self.missing.to_bytes()).decode('ascii'),
+            'events_total': self.events_total,
+            'missing_total': self.missing_total
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ContextSketch':
+        sketch = cls.__new__(cls)
+        sketch.events = HyperLogLog.from_bytes(base64.b64decode(data['events']))
+        sketch.missing = HyperLogLog.from_bytes(base64.b64decode(data['missing']))
+        sketch.events_total = int(data['events_total'])
+        sketch.missing_total = int(data['missing_total'])
+        return sketch
+
+def merge_context_sketches(sketches: Iterable[ContextSketch]) -> Optional[ContextSketch]:
+    """Merge sketches into a new sketch, leaving the inputs untouched"""
+    merged: Optional[ContextSketch] = None
+    for sketch in sketches:
+        if merged is None:
+            merged = sketch.copy()
+        else:
+            merged.merge(sketch)
+    return merged
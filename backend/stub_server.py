@@ -0,0 +1,116 @@
+"""Local stand-in for an OpenAI-compatible rewriting model
+
+Usage: python -m backend.stub_server [--port N] [--latency SECONDS] [--fail-rate P]
+
+Answers chat completion requests made by RemoteRewriteProvider with the
+local rule rewriter's output, after an optional delay and with optional
+injected failures, so retries, batching and pooling can be exercised
+without an API key. Point REWRITE_PROVIDER_URL at http://HOST:PORT/v1.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from backend.rewriter import get_rewriter
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Any, latency: float = 0.0, fail_rate: float = 0.0) -> None:
+        super().__init__(address, _Handler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        # Completion requests and TCP connections seen, to check batching and keep-alive
+        self.calls = 0
+        self.connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, calls: int = 0, connections: int = 0) -> None:
+        with self._lock:
+            self.calls += calls
+            self.connections += connections
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server: StubServer
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.count(connections=1)
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if not self.path.endswith('/chat/completions'):
+            self._reply(404, {'error': {'message': 'Not found'}})
+            return
+        if not self.headers.get('Authorization', '').startswith('Bearer '):
+            self._reply(401, {'error': {'message': 'Missing API key'}})
+            return
+        self.server.count(calls=1)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if random.random() < self.server.fail_rate:
+            self._reply(503, {'error': {'message': 'Injected failure'}}, {'Retry-After': '0'})
+            return
+        try:
+            sentences = json.loads(json.loads(body)['messages'][-1]['content'])
+        except (ValueError, KeyError, IndexError, TypeError):
+            self._reply(400, {'error': {'message': 'Expected a JSON array of sentences'}})
+            return
+        rewriter = get_rewriter()
+        rewritten = [rewriter.rewrite_sentence(sentence)[0] for sentence in sentences]
+        self._reply(200, {
+            'object': 'chat.completion',
+            'model': 'stub',
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': json.dumps(rewritten)},
+                'finish_reason': 'stop'
+            }]
+        })
+
+    def _reply(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+def start(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, fail_rate: float = 0.0) -> StubServer:
+    """Serve on a background thread; port 0 picks a free port (see StubServer.base_url)"""
+    server = StubServer((host, port), latency=latency, fail_rate=fail_rate)
+    threading.Thread(target=server.serve_forever, name='stub-server', daemon=True).start()
+    return server
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds to wait before each reply')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Fraction of calls answered with HTTP 503')
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), latency=args.latency, fail_rate=args.fail_rate)
+    print(f"Stub rewriting model at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -1,28 +1,194 @@
 """Text processing utilities for BiasDetector"""
+import html
+import os
 import re
+import time
+import unicodedata
 import logging
-import difflib
-from typing import List, Dict, cast
+from array import array
+from bisect import bisect_right
+from typing import Any, List, Dict, Optional, Tuple, cast
 from nltk.tokenize import sent_tokenize as nltk_sent_tokenize  # type: ignore
+from backend.diff import intern_sequences, patience_opcodes, token_diff
+from backend.extraction import extract_article
 
 logger = logging.getLogger(__name__)
 
+# Seconds compare_texts may spend diffing before reporting the remainder as whole blocks
+DIFF_TIME_BUDGET = float(os.environ.get('DIFF_TIME_BUDGET', '2.0'))
+# Combined sentence count above which only the common prefix and suffix are matched
+DIFF_MAX_SENTENCES = int(os.environ.get('DIFF_MAX_SENTENCES', '200000'))
+
 def sent_tokenize(text: str) -> List[str]:
     """Wrapper around NLTK's sent_tokenize with proper type hints."""
     return cast(List[str], nltk_sent_tokenize(text))
 
+# Zero-width characters, dropped from text
+_ZERO_WIDTH = '\u200b\u200c\u200d\u2060\ufeff'
+# A tag, comment or declaration; a '<' that does not open one (as in "a < b") is text
+_TAG = r'<[A-Za-z/!?][^<>]*>'
+# One item of a run of markup and whitespace: a tag, a whitespace or zero-width
+# character, or an entity for a space
+_RUN_ITEM = (
+    rf'(?:{_TAG}|[\s{_ZERO_WIDTH}]'
+    r'|&(?:nbsp|ensp|emsp|thinsp|#32|#160|#[xX]20|#[xX][aA]0);)'
+)
+# Runs never start with a plain space, so ordinary prose is skipped by the
+# leading character test alone without entering the pattern; entities that are
+# not spaces are decoded on their own.
+_NORMALIZE_RE = re.compile(
+    rf'(?=[<&{_ZERO_WIDTH}\t\n\v\f\r\x1c-\x1f\x85\xa0\u1680\u2000-\u200a\u2028\u2029\u202f\u205f\u3000])'
+    rf'(?:(?P<run>(?:{_TAG}|[^\S ]|[{_ZERO_WIDTH}]'
+    r'|&(?:nbsp|ensp|emsp|thinsp|#32|#160|#[xX]20|#[xX][aA]0);)'
+    rf'{_RUN_ITEM}*)'
+    r'|(?P<entity>&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});))'
+)
+# Repeated plain spaces, which the scan above leaves in place
+_SPACES_RE = re.compile(r'  +')
+# Whitespace, space entities and block-level tags separate words; inline tags and
+# zero-width characters do not
+_BREAK_RE = re.compile(
+    r'[\s&]|<\s*/?\s*(?:p|div|br|hr|li|ul|ol|h[1-6]|tr|td|th|table|blockquote|section|article'
+    r'|header|footer|aside|nav|pre|dd|dt|figure|figcaption)\b',
+    re.IGNORECASE
+)
+
+def _replacement(match: 're.Match[str]') -> str:
+    start = match.start()
+    if match.lastgroup == 'run':
+        # A plain space kept just before the run already separates the words
+        if start and match.string[start - 1] == ' ':
+            return ''
+        return ' ' if _BREAK_RE.search(match.group()) else ''
+    decoded = html.unescape(match.group())
+    return ' ' if decoded.isspace() else decoded
+
 def clean_text(text: str) -> str:
-    """Clean article text by removing extra whitespace and normalizing text"""
-    # Remove extra spaces, newlines, and tabs
-    text = re.sub(r'\s+', ' ', text)
-    # Remove HTML tags if any
-    text = re.sub(r'<[^>]+>', '', text)
-    return text.strip()
+    """
+    Normalize article text in a single scan: strip HTML tags, decode entities,
+    drop zero-width characters and collapse whitespace (including whitespace
+    around removed tags) to single spaces, then apply Unicode NFC.
+
+    Tags are stripped in the same scan that decodes entities, so an escaped
+    tag such as "&lt;b&gt;" is kept as the text "<b>". Cleaning that output
+    again would strip it, so callers clean once and pass the cleaned text on.
+    """
+    text = _NORMALIZE_RE.sub(_replacement, text).strip()
+    if '  ' in text:
+        text = _SPACES_RE.sub(' ', text)
+    if not text.isascii():
+        text = unicodedata.normalize('NFC', text)
+    return text
+
+_ZERO_WIDTH_TABLE = dict.fromkeys(map(ord, _ZERO_WIDTH))
+_WHITESPACE_RE = re.compile(r'\s+')
+
+def normalize_whitespace(text: str) -> str:
+    """
+    Normalize plain text, such as extracted article text, the way clean_text
+    does but without touching markup: its '<' and '&' are literal characters.
+    """
+    text = _WHITESPACE_RE.sub(' ', text.translate(_ZERO_WIDTH_TABLE)).strip()
+    if not text.isascii():
+        text = unicodedata.normalize('NFC', text)
+    return text
+
+class OffsetMap:
+    """
+    Map offsets in cleaned text back to offsets in the text it was cleaned from.
+
+    Stored as the cleaned offsets at which the distance between the two texts
+    changes, so an article costs one entry per removed tag or collapsed run of
+    whitespace rather than one per character.
+    """
+
+    def __init__(self) -> None:
+        self._clean = array('q')
+        self._original = array('q')
+
+    def add(self, clean_pos: int, original_pos: int) -> None:
+        """Record that cleaned text from clean_pos on continues at original_pos"""
+        if self._clean and self._original[-1] - self._clean[-1] == original_pos - clean_pos:
+            return
+        self._clean.append(clean_pos)
+        self._original.append(original_pos)
+
+    def to_original(self, pos: int) -> int:
+        k = bisect_right(self._clean, pos) - 1
+        if k < 0:
+            return pos
+        return self._original[k] + pos - self._clean[k]
+
+    def span_to_original(self, start: int, end: int) -> Tuple[int, int]:
+        """Map a [start, end) span, excluding anything removed just after its last character"""
+        if end <= start:
+            original = self.to_original(start)
+            return original, original
+        return self.to_original(start), self.to_original(end - 1) + 1
+
+def clean_text_with_offsets(text: str) -> Tuple[str, OffsetMap]:
+    """
+    Clean text like clean_text, also returning an OffsetMap from positions
+    in the cleaned text to positions in text.
+    """
+    # (position in text, piece of cleaned output) in output order
+    pieces: List[Tuple[int, str]] = []
+    pos = 0
+    for match in _NORMALIZE_RE.finditer(text):
+        if match.start() > pos:
+            _add_literal(pieces, text, pos, match.start())
+        replacement = _replacement(match)
+        if replacement:
+            pieces.append((match.start(), replacement))
+        pos = match.end()
+    if pos < len(text):
+        _add_literal(pieces, text, pos, len(text))
+
+    # Strip leading and trailing whitespace, as clean_text does
+    while pieces and not pieces[-1][1].strip():
+        pieces.pop()
+    if pieces:
+        pieces[-1] = (pieces[-1][0], pieces[-1][1].rstrip())
+    first = 0
+    while first < len(pieces) and not pieces[first][1].strip():
+        first += 1
+    del pieces[:first]
+    if pieces:
+        pos, piece = pieces[0]
+        stripped = piece.lstrip()
+        pieces[0] = (pos + len(piece) - len(stripped), stripped)
+
+    offsets = OffsetMap()
+    length = 0
+    for original_pos, piece in pieces:
+        offsets.add(length, original_pos)
+        length += len(piece)
+    return ''.join(piece for _, piece in pieces), offsets
+
+def _add_literal(pieces: List[Tuple[int, str]], text: str, start: int, end: int) -> None:
+    """Append text[start:end], which has no markup, collapsing any repeated spaces"""
+    literal = text[start:end]
+    if '  ' in literal:
+        pos = 0
+        for match in _SPACES_RE.finditer(literal):
+            _add_literal(pieces, text, start + pos, start + match.start() + 1)
+            pos = match.end()
+        _add_literal(pieces, text, start + pos, end)
+        return
+    if not literal.isascii():
+        literal = unicodedata.normalize('NFC', literal)
+    pieces.append((start, literal))
+
+# Markup that marks a whole page rather than text with the odd stray tag
+_HTML_PAGE_RE = re.compile(r'<(?:html|body|article|main|p|div)\b', re.IGNORECASE)
 
 def extract_main_content(text: str) -> str:
-    """Extract the main content from article text, removing ads, navigation, etc."""
-    # Basic implementation - more sophisticated content extraction would be needed
-    # for production but this gives a starting point
+    """
+    Extract the main content from article text, removing ads, navigation, etc.
+    HTML pages go through the extraction pipeline; plain text is filtered by paragraph.
+    """
+    if _HTML_PAGE_RE.search(text):
+        return extract_article(text)['text']
     paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
     # Filter out likely non-content paragraphs (too short, or containing common ad phrases)
     content_paragraphs = [p for p in paragraphs if len(p) > 50 and not re.search(r'(advertisement|subscribe|sign up)', p, re.IGNORECASE)]
@@ -31,64 +197,124 @@ def extract_main_content(text: str) -> str:
 
 def split_into_sections(text: str, max_length: int = 1000) -> List[str]:
     """Split large articles into manageable sections for analysis"""
-    sections: List[str] = []
-    
+    starts, ends = section_spans(text, max_length)
+    return [text[start:end] for start, end in zip(starts, ends)]
+
+def sentence_spans(text: str) -> Tuple[array, array]:
+    """Start and end offsets of each sentence in text, as two arrays"""
+    starts, ends = array('q'), array('q')
+    for start, end in _locate(text, sent_tokenize(text)):
+        starts.append(start)
+        ends.append(end)
+    return starts, ends
+
+def section_spans(text: str, max_length: int = 1000) -> Tuple[array, array]:
+    """
+    Group sentences into sections of about max_length characters and return
+    each section's start and end offsets in text, as two arrays.
+    """
+    starts, ends = array('q'), array('q')
     try:
-        # Try to split by sentences first
-        sentences: List[str] = sent_tokenize(text)
-        current_section: List[str] = []
+        sentence_starts, sentence_ends = sentence_spans(text)
+        section_start = -1
         current_length = 0
-        
-        for sentence in sentences:
-            if current_length + len(sentence) > max_length and current_section:
-                sections.append(' '.join(current_section))
-                current_section = [sentence]
-                current_length = len(sentence)
+        for start, end in zip(sentence_starts, sentence_ends):
+            length = end - start
+            if current_length + length > max_length and section_start >= 0:
+                starts.append(section_start)
+                ends.append(previous_end)
+                section_start = start
+                current_length = length
             else:
-                current_section.append(sentence)
-                current_length += len(sentence)
-        
-        if current_section:
-            sections.append(' '.join(current_section))
+                if section_start < 0:
+                    section_start = start
+                current_length += length
+            previous_end = end
+
+        if section_start >= 0:
+            starts.append(section_start)
+            ends.append(previous_end)
     except Exception:
         # Fallback: split by character count if sentence tokenization fails
+        starts, ends = array('q'), array('q')
         text_length = len(text)
         for i in range(0, text_length, max_length):
-            end = min(i + max_length, text_length)
-            sections.append(text[i:end])
-    
-    return sections
+            starts.append(i)
+            ends.append(min(i + max_length, text_length))
 
-def compare_texts(original: str, rewritten: str) -> List[Dict[str, str]]:
+    return starts, ends
+
+def compare_texts(original: str, rewritten: str,
+                  time_budget: Optional[float] = None) -> List[Dict[str, Any]]:
     """
     Compare original and rewritten texts and return a structured diff.
-    Returns a list of dicts with 'type' ('unchanged', 'removed', or 'added') and 'text'.
+    Returns a list of dicts with 'type' ('unchanged', 'removed', or 'added') and 'text',
+    plus 'start'/'end' character offsets into the text the sentence came from
+    (the original for unchanged and removed, the rewritten text for added).
+    Added sentences that replace removed ones also carry a word-level diff in 'tokens'.
+
+    Sentences are diffed with patience diff over interned sentence ids. Past
+    DIFF_TIME_BUDGET seconds (or DIFF_MAX_SENTENCES sentences) the remaining
+    changed regions are reported as whole removed/added blocks.
     """
     if not original or not rewritten:
         return []
 
     try:
-        original_sentences = list(sent_tokenize(original))
-        rewritten_sentences = list(sent_tokenize(rewritten))
+        try:
+            original_sentences = list(sent_tokenize(original))
+            rewritten_sentences = list(sent_tokenize(rewritten))
+        except LookupError:
+            original_sentences, rewritten_sentences = [], []
 
         # If sentence tokenization fails, fall back to line-by-line
         if not original_sentences or not rewritten_sentences:
             original_sentences = original.splitlines()
             rewritten_sentences = rewritten.splitlines()
 
-        differ = difflib.Differ()
-        diff = list(differ.compare(original_sentences, rewritten_sentences))
-        
-        formatted_diff: List[Dict[str, str]] = []
-        for line in diff:
-            if line.startswith('  '):
-                formatted_diff.append({"type": "unchanged", "text": line[2:]})
-            elif line.startswith('- '):
-                formatted_diff.append({"type": "removed", "text": line[2:]})
-            elif line.startswith('+ '):
-                formatted_diff.append({"type": "added", "text": line[2:]})
+        budget = DIFF_TIME_BUDGET if time_budget is None else time_budget
+        if len(original_sentences) + len(rewritten_sentences) > DIFF_MAX_SENTENCES:
+            budget = 0.0
+        a, b = intern_sequences(original_sentences, rewritten_sentences)
+        opcodes = patience_opcodes(a, b, deadline=time.monotonic() + budget)
+
+        original_spans = _locate(original, original_sentences)
+        rewritten_spans = _locate(rewritten, rewritten_sentences)
+
+        def entry(kind: str, text: str, span: Tuple[int, int]) -> Dict[str, Any]:
+            return {"type": kind, "text": text, "start": span[0], "end": span[1]}
+
+        formatted_diff: List[Dict[str, Any]] = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                formatted_diff.extend(
+                    entry("unchanged", original_sentences[i], original_spans[i]) for i in range(i1, i2)
+                )
+                continue
+            formatted_diff.extend(
+                entry("removed", original_sentences[i], original_spans[i]) for i in range(i1, i2)
+            )
+            for offset, j in enumerate(range(j1, j2)):
+                added = entry("added", rewritten_sentences[j], rewritten_spans[j])
+                # Word-level detail only inside changed hunks, pairing sentences in order
+                if tag == 'replace' and i1 + offset < i2:
+                    added["tokens"] = token_diff(original_sentences[i1 + offset], rewritten_sentences[j])
+                formatted_diff.append(added)
         
         return formatted_diff
     except Exception as e:
         print(f"Error comparing texts: {str(e)}")
         return []
+
+def _locate(text: str, parts: List[str]) -> List[Tuple[int, int]]:
+    """Character spans of consecutive substrings of text, in order"""
+    spans: List[Tuple[int, int]] = []
+    pos = 0
+    for part in parts:
+        start = text.find(part, pos)
+        if start < 0:
+            start = pos
+        end = start + len(part)
+        spans.append((start, end))
+        pos = end
+    return spans
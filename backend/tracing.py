@@ -0,0 +1,59 @@
+"""Per-request stage timing traces, reported in a Server-Timing header"""
+import contextvars
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+class Trace:
+    """Spans recorded while handling one request, as (name, seconds) in the order they ended"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, seconds: float) -> None:
+        self.spans.append((name, seconds))
+
+    def server_timing(self) -> str:
+        """
+        The spans as a Server-Timing header value. Repeated stages are summed
+        and their count given as the description; `total` covers the request.
+        """
+        totals: Dict[str, List[float]] = {}
+        for name, seconds in self.spans:
+            entry = totals.setdefault(name, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+        metrics = [
+            f'{name};dur={seconds * 1000:.2f}' + (f';desc="x{count:.0f}"' if count > 1 else '')
+            for name, (seconds, count) in totals.items()
+        ]
+        metrics.append(f'total;dur={(time.perf_counter() - self.started) * 1000:.2f}')
+        return ', '.join(metrics)
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar('trace', default=None)
+
+def record(name: str, seconds: float) -> None:
+    """Add a span to the current request's trace, if it is being traced"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add(name, seconds)
+
+def install(app: Any) -> None:
+    """
+    Trace the requests to a Flask app that ask for it with an `X-Trace: 1`
+    header or `?trace=1`, and answer them with a Server-Timing header.
+    """
+    from flask import request
+
+    @app.before_request
+    def _start_trace() -> None:
+        # Always reset, so a trace never leaks into the next request on this thread
+        _current.set(Trace() if request.headers.get('X-Trace') or request.args.get('trace') else None)
+
+    @app.after_request
+    def _finish_trace(response: Any) -> Any:
+        trace = _current.get()
+        if trace is not None:
+            response.headers['Server-Timing'] = trace.server_timing()
+            _current.set(None)
+        return response
@@ -1,33 +1,152 @@
 """Vector math utility functions for bias analysis"""
-from typing import List, Dict, Set
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+import numpy as np
+from backend.sketches import ContextSketch, merge_context_sketches
 
-def calculate_variance(values: List[float]) -> float:
+class OnlineStats:
+    """
+    Streaming count, mean, variance, min and max in constant memory.
+
+    Values are folded in one at a time with Welford's update, and partial
+    results from separate shards or workers are combined with merge() using
+    Chan et al.'s parallel formula, so the full list is never held.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def update(self, values: Iterable[float]) -> 'OnlineStats':
+        for value in values:
+            self.add(value)
+        return self
+
+    def merge(self, other: 'OnlineStats') -> 'OnlineStats':
+        """Fold another accumulator into this one"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> float:
+        """Population variance, as returned by calculate_variance"""
+        return self.m2 / self.count if self.count else 0.0
+
+    @property
+    def sample_variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'm2': self.m2,
+            'min': self.min if self.count else 0.0,
+            'max': self.max if self.count else 0.0
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, float]) -> 'OnlineStats':
+        """Rebuild an accumulator serialized with to_dict, e.g. by another worker"""
+        stats = cls()
+        stats.count = int(data.get('count', 0))
+        if stats.count:
+            stats.mean = float(data['mean'])
+            stats.m2 = float(data['m2'])
+            stats.min = float(data['min'])
+            stats.max = float(data['max'])
+        return stats
+
+def calculate_variance(values: Iterable[float]) -> float:
     """Calculate the statistical variance of a list of values"""
-    if not values:
-        return 0
-    mean = sum(values) / len(values)
-    squared_diff_sum = sum((x - mean) ** 2 for x in values)
-    return squared_diff_sum / len(values)
-
-def calculate_bias_similarity(category_lists: List[Dict[str, float]]) -> float:
-    """Calculate similarity between bias category distributions"""
-    # Convert category lists to vectors and calculate cosine similarity
-    all_categories: Set[str] = set()
-    for cats in category_lists:
-        all_categories.update(cats.keys())
-        
-    vectors: List[List[float]] = []
+    return OnlineStats().update(values).variance
+
+# Above this many articles the pairwise similarity matrix is computed in row blocks
+PAIRWISE_CHUNK_THRESHOLD = 2048
+
+def category_matrix(category_lists: List[Dict[str, float]]) -> Tuple[np.ndarray, List[str]]:
+    """Stack category distributions into an (articles x categories) matrix"""
+    columns: Dict[str, int] = {}
     for cats in category_lists:
-        vector = [cats.get(cat, 0.0) for cat in sorted(all_categories)]
-        vectors.append(vector)
-        
-    # Calculate average pairwise similarity
-    similarities: List[float] = []
-    for i in range(len(vectors)):
-        for j in range(i + 1, len(vectors)):
-            similarities.append(cosine_similarity(vectors[i], vectors[j]))
-            
-    return sum(similarities) / len(similarities) if similarities else 0.0
+        for cat in cats:
+            if cat not in columns:
+                columns[cat] = len(columns)
+
+    matrix = np.zeros((len(category_lists), len(columns)), dtype=np.float64)
+    for row, cats in enumerate(category_lists):
+        for cat, value in cats.items():
+            matrix[row, columns[cat]] = value
+    return matrix, list(columns)
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length; all-zero rows stay zero so their similarity is 0"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms != 0)
+
+def pairwise_bias_similarity(category_lists: List[Dict[str, float]]) -> np.ndarray:
+    """Return the matrix of cosine similarities between every pair of distributions"""
+    unit = _normalize_rows(category_matrix(category_lists)[0])
+    return unit @ unit.T
+
+def calculate_bias_similarity(category_lists: List[Dict[str, float]], chunk_size: Optional[int] = None) -> float:
+    """
+    Calculate similarity between bias category distributions as the average
+    pairwise cosine similarity.
+
+    All pairs come from one matrix product of the row-normalised category
+    matrix. For large inputs (or when chunk_size is given) the product is
+    taken in blocks of chunk_size rows so memory stays O(chunk_size * n).
+    """
+    n = len(category_lists)
+    if n < 2:
+        return 0.0
+
+    unit = _normalize_rows(category_matrix(category_lists)[0])
+    if chunk_size is None and n > PAIRWISE_CHUNK_THRESHOLD:
+        chunk_size = max(1, (PAIRWISE_CHUNK_THRESHOLD ** 2) // n)
+
+    if chunk_size is None:
+        similarities = unit @ unit.T
+        total = float(np.triu(similarities, k=1).sum())
+    else:
+        total = 0.0
+        for start in range(0, n, chunk_size):
+            # Rows start..stop against columns start..n: only the block's upper triangle is new
+            block = unit[start:start + chunk_size] @ unit[start:].T
+            total += float(np.triu(block, k=1).sum())
+
+    return total / (n * (n - 1) / 2)
 
 def cosine_similarity(v1: List[float], v2: List[float]) -> float:
     """Calculate cosine similarity between two vectors"""
@@ -36,8 +155,19 @@ def cosine_similarity(v1: List[float], v2: List[float]) -> float:
     norm2 = sum(b * b for b in v2) ** 0.5
     return dot_product / (norm1 * norm2) if norm1 * norm2 != 0 else 0.0
 
-def analyze_context_overlap(context_lists: List[Dict[str, List[str]]]) -> Dict[str, float]:
-    """Analyze how much context overlaps between articles"""
+def analyze_context_overlap(context_lists: List[Union[Dict[str, List[str]], ContextSketch]],
+                            approximate: bool = False, error: float = 0.02) -> Dict[str, float]:
+    """
+    Analyze how much context overlaps between articles.
+
+    With approximate=True the distinct counts come from HyperLogLog sketches
+    with about `error` relative standard error, so no union of raw strings is
+    built. Entries may then be precomputed ContextSketch objects as well as
+    raw context dicts.
+    """
+    if approximate:
+        return _approximate_context_overlap(context_lists, error)
+
     # Extract all related events and missing context
     all_events: Set[str] = set()
     all_missing: Set[str] = set()
@@ -59,3 +189,21 @@ def analyze_context_overlap(context_lists: List[Dict[str, List[str]]]) -> Dict[s
         'event_overlap': event_overlap,
         'missing_context_overlap': missing_overlap
     }
+
+def _approximate_context_overlap(context_lists: List[Union[Dict[str, List[str]], ContextSketch]],
+                                 error: float) -> Dict[str, float]:
+    sketches = (
+        ctx if isinstance(ctx, ContextSketch) else ContextSketch.from_context(ctx, error)
+        for ctx in context_lists
+    )
+    merged = merge_context_sketches(sketches)
+    if merged is None:
+        return {'event_overlap': 0.0, 'missing_context_overlap': 0.0}
+
+    # The estimate can slightly exceed the item count; the exact ratio never exceeds 1
+    events = min(merged.events.cardinality(), merged.events_total)
+    missing = min(merged.missing.cardinality(), merged.missing_total)
+    return {
+        'event_overlap': events / (merged.events_total or 1),
+        'missing_context_overlap': missing / (merged.missing_total or 1)
+    }
@@ -0,0 +1,63 @@
+"""Startup warm-up of tokenizers, lexicons and compiled patterns"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_ready = threading.Event()
+_timings: Dict[str, float] = {}
+
+def _load_punkt() -> None:
+    from backend.text_utils import sent_tokenize
+    sent_tokenize("Warm up the tokenizer. It caches the model on first use.")
+
+def _load_textblob() -> None:
+    from textblob import TextBlob  # type: ignore
+    from textblob.en import sentiment  # type: ignore
+    sentiment.load()
+    TextBlob("Warm up the sentiment lexicon.").sentiment  # type: ignore
+
+def _load_batch_scorer() -> None:
+    from backend.batch import get_scorer
+    get_scorer()
+
+def _load_lexicon() -> None:
+    from backend.lexicon import default_scanner
+    default_scanner.scan("Everyone must obviously love this terrible warm up.")
+
+STAGES: List[Tuple[str, Callable[[], None]]] = [
+    ('punkt', _load_punkt),
+    ('textblob', _load_textblob),
+    ('batch_scorer', _load_batch_scorer),
+    ('lexicon', _load_lexicon),
+]
+
+def warm_up() -> Dict[str, float]:
+    """
+    Load every lazily initialised model once and mark the process ready.
+
+    Call this in the gunicorn master before workers fork (preload_app) so the
+    loaded state is shared copy-on-write instead of loaded per worker on the
+    first request. A stage that fails is logged and skipped; the request path
+    will retry loading it lazily.
+    """
+    for name, stage in STAGES:
+        start = time.perf_counter()
+        try:
+            stage()
+        except Exception as e:
+            logger.warning(f"Warm-up stage {name} failed: {e}")
+            continue
+        _timings[name] = time.perf_counter() - start
+        logger.info(f"Warm-up stage {name} loaded in {_timings[name]:.3f}s")
+    _ready.set()
+    return dict(_timings)
+
+def is_ready() -> bool:
+    """Whether warm-up has completed in this process"""
+    return _ready.is_set()
+
+def warmup_status() -> Dict[str, object]:
+    return {'ready': is_ready(), 'stages': dict(_timings)}
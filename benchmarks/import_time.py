@@ -0,0 +1,71 @@
+"""Check that importing main.py stays within a startup time budget
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter, fails if
+the cumulative import time exceeds the budget or if any module that should be
+loaded lazily was imported, and lists the slowest imports.
+
+Usage: python -m benchmarks.import_time [--budget-ms N] [--top N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Imported only by the routes or commands that need them
+LAZY_MODULES = ('nltk', 'markdown', 'prometheus_client', 'textblob', 'numpy', 'backend.app')
+
+IMPORT_BUDGET_MS = float(os.environ.get('IMPORT_BUDGET_MS', '400'))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def import_times(module: str = 'main') -> List[Tuple[str, int, int]]:
+    """Return (module, self_us, cumulative_us) for every import made by `import module`"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr}")
+
+    rows: List[Tuple[str, int, int]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+def measure(module: str = 'main') -> float:
+    """Return the cumulative time of `import module` in ms"""
+    cumulative = {name: cum for name, _, cum in import_times(module)}
+    return cumulative.get(module, 0) / 1000
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=IMPORT_BUDGET_MS,
+                        help='Maximum cumulative import time of main in ms (default: 400)')
+    parser.add_argument('--top', type=int, default=10, help='Number of slowest imports to list (default: 10)')
+    args = parser.parse_args()
+
+    rows = import_times()
+    cumulative: Dict[str, int] = {name: cum for name, _, cum in rows}
+    total_ms = cumulative.get('main', 0) / 1000
+
+    print(f"import main: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print("slowest imports (cumulative ms):")
+    for name, _, cum in sorted(rows, key=lambda row: row[2], reverse=True)[:args.top]:
+        print(f"  {cum / 1000:8.1f}  {name}")
+
+    failed = False
+    eager = [name for name in LAZY_MODULES if name in cumulative]
+    if eager:
+        print(f"FAIL: imported eagerly: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.1f} ms exceeds budget of {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
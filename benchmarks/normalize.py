@@ -0,0 +1,68 @@
+"""Benchmark clean_text throughput on scraped-page sized HTML
+
+Usage: python -m benchmarks.normalize [--size-mb N] [--repeat N]
+"""
+import argparse
+import random
+import re
+import time
+from typing import Callable
+
+from backend.text_utils import clean_text, clean_text_with_offsets
+
+WORDS = (
+    "the bill reckless policy economy families workers great terrible fair unfair "
+    "strong weak growth decline support oppose happy angry clearly maybe new old "
+    "café naïve résumé"
+).split()
+
+def make_page(size: int, seed: int = 0) -> str:
+    """Build roughly `size` characters of paragraph markup with links, entities and indentation"""
+    rng = random.Random(seed)
+    parts = []
+    length = 0
+    while length < size:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(20, 60))]
+        for _ in range(rng.randint(0, 3)):
+            i = rng.randrange(len(words))
+            words[i] = f'<a href="/article/{rng.randint(1, 99999)}">{words[i]}</a>'
+        if rng.random() < 0.3:
+            words.insert(rng.randrange(len(words)), rng.choice(['&amp;', '&nbsp;', '&#8217;', '&quot;']))
+        paragraph = f"\n    <p class=\"body\">\n      {' '.join(words)}.\n    </p>"
+        parts.append(paragraph)
+        length += len(paragraph)
+    return ''.join(parts)
+
+def two_pass(text: str) -> str:
+    """The previous clean_text, for comparison"""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'<[^>]+>', '', text)
+    return text.strip()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=float, default=4.0, help='Page size in MB (default: 4)')
+    parser.add_argument('--repeat', type=int, default=5, help='Best of N runs (default: 5)')
+    args = parser.parse_args()
+
+    page = make_page(int(args.size_mb * 1024 * 1024))
+    megabytes = len(page.encode('utf-8')) / (1024 * 1024)
+
+    def best(run: Callable[[str], object]) -> float:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run(page)
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    print(f"{megabytes:.1f} MB page")
+    print(f"{'normalizer':>24} {'seconds':>9} {'MB/s':>8}")
+    for name, run in (('two-pass regex (old)', two_pass),
+                      ('clean_text', clean_text),
+                      ('clean_text_with_offsets', clean_text_with_offsets)):
+        elapsed = best(run)
+        print(f"{name:>24} {elapsed:9.3f} {megabytes / elapsed:8.1f}")
+
+if __name__ == '__main__':
+    main()
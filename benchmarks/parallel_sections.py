@@ -0,0 +1,58 @@
+"""Benchmark serial vs. process-pool section scoring at increasing worker counts
+
+Usage: python -m benchmarks.parallel_sections [--sections N] [--repeat N]
+"""
+import argparse
+import os
+import random
+import time
+from typing import List
+
+from backend.ai_processor import _analyze_sentiment
+from backend.parallel import SectionPool
+
+WORDS = (
+    "the bill reckless policy economy families workers great terrible fair unfair "
+    "strong weak growth decline support oppose happy angry clearly maybe new old"
+).split()
+
+def make_sections(count: int, seed: int = 0) -> List[str]:
+    """Build distinct ~1000 character sections, the size split_into_sections produces"""
+    rng = random.Random(seed)
+    sections = []
+    for _ in range(count):
+        sentences = [' '.join(rng.choice(WORDS) for _ in range(12)).capitalize() + '.' for _ in range(12)]
+        sections.append(' '.join(sentences))
+    return sections
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sections', type=int, default=2000, help='Sections to score (default: 2000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Best of N runs (default: 3)')
+    args = parser.parse_args()
+
+    sections = make_sections(args.sections)
+
+    def best(run) -> float:
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+        return min(timings)
+
+    serial = best(lambda: [_analyze_sentiment(s) for s in sections])
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+    print(f"{'serial':>8} {serial:9.3f} {1.0:8.2f}")
+
+    cores = os.cpu_count() or 1
+    counts = sorted({n for n in (1, 2, 4, 8, 16, 32, cores) if n <= cores})
+    for workers in counts:
+        pool = SectionPool(workers)
+        pool.map(_analyze_sentiment, sections[:workers])  # start and warm the workers
+        elapsed = best(lambda: pool.map(_analyze_sentiment, sections))
+        pool.shutdown()
+        print(f"{workers:>8} {elapsed:9.3f} {serial / elapsed:8.2f}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Benchmark remote rewriting against the local stub model
+
+Usage: python -m benchmarks.rewrite_provider [--sentences N] [--latency SECONDS]
+"""
+import argparse
+import time
+
+from backend.providers import CircuitBreaker, RemoteRewriteProvider
+from backend.stub_server import start
+
+SENTENCE = "The heartless plan is cruel, and its supporters know it."
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sentences', type=int, default=60, help='Residue sentences per article (default: 60)')
+    parser.add_argument('--articles', type=int, default=3, help='Articles rewritten per run (default: 3)')
+    parser.add_argument('--latency', type=float, default=0.05, help='Stub model latency in seconds (default: 0.05)')
+    args = parser.parse_args()
+
+    server = start(latency=args.latency)
+    sentences = [f"{SENTENCE} ({i})" for i in range(args.sentences)]
+    configurations = (
+        ('one call per sentence', dict(max_batch_sentences=1, max_concurrency=1)),
+        ('batched', dict(max_batch_sentences=20, max_concurrency=1)),
+        ('batched, concurrent', dict(max_batch_sentences=20, max_concurrency=8)),
+    )
+
+    print(f"{args.articles} articles x {args.sentences} sentences, {args.latency * 1000:.0f} ms per call")
+    print(f"{'client':>22} {'seconds':>9} {'calls':>6} {'connections':>12}")
+    for name, options in configurations:
+        provider = RemoteRewriteProvider(server.base_url, api_key='stub', breaker=CircuitBreaker(), **options)
+        calls, connections = server.calls, server.connections
+        start_time = time.perf_counter()
+        for _ in range(args.articles):
+            provider.rewrite(sentences)
+        elapsed = time.perf_counter() - start_time
+        print(f"{name:>22} {elapsed:9.3f} {server.calls - calls:6d} {server.connections - connections:12d}")
+    server.shutdown()
+
+if __name__ == '__main__':
+    main()
@@ -35,66 +35,15 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
     chrome.tabs.query({ active: true, currentWindow: true }, (tabs) => {
       const currentTab = tabs[0];
       
-      // Execute content script to extract article
+      // Grab the page HTML; article extraction happens on the server
       chrome.scripting.executeScript({
         target: { tabId: currentTab.id },
         function: () => {
-          // This function runs in the context of the page
-          // It extracts the article content and sends it back
-          
-          // Find the article container
-          const selectors = [
-            'article',
-            '[itemtype*="Article"]',
-            '.article-content',
-            '.story-body',
-            '.post-content',
-            '#article-body',
-            '.article-body',
-            '.entry-content',
-            '.content-article',
-            '.story',
-            '.news-content'
-          ];
-          
-          let articleContainer = null;
-          
-          for (const selector of selectors) {
-            const element = document.querySelector(selector);
-            if (element) {
-              articleContainer = element;
-              break;
-            }
-          }
-          
-          // If no article element found, use the main content or body
-          if (!articleContainer) {
-            articleContainer = document.querySelector('main') || document.querySelector('body');
-          }
-          
-          // Get the article paragraphs
-          const paragraphs = articleContainer.querySelectorAll('p');
-          let content = '';
-          
-          if (paragraphs.length > 0) {
-            content = Array.from(paragraphs)
-              .map(p => p.textContent.trim())
-              .filter(text => text.length > 0)
-              .join('\n\n');
-          } else {
-            // If no paragraphs found, use the text content of the article element
-            content = articleContainer.textContent.trim();
-          }
-          
-          // Clean up the content
-          content = content
-            .replace(/\s+/g, ' ')  // Replace multiple spaces with a single space
-            .replace(/\n\s+/g, '\n')  // Remove leading spaces after newlines
-            .trim();
-          
+          // This function runs in the context of the page.
+          // It sends back the raw page; the server extracts the article
           return {
             success: true,
-            content: content
+            html: document.documentElement.outerHTML
           };
         }
       }, (results) => {
@@ -131,7 +80,7 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
             },
             body: JSON.stringify({
               url: currentTab.url,
-              content: result.content
+              html: result.html
             })
           })
           .then(response => {
@@ -145,7 +94,7 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
             const analysisData = {
               url: currentTab.url,
               title: currentTab.title,
-              content: result.content,
+              content: data.content,
               original: data.original,
               rewritten: data.rewritten,
               biasAnalysis: data.bias_analysis,
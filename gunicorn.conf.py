@@ -0,0 +1,25 @@
+"""Gunicorn settings, read from the working directory by `gunicorn main:app`"""
+from backend.metrics import mark_process_dead, prepare_multiprocess
+
+# Workers write metrics to a shared directory so /metrics can report all of them.
+# This file is read before the app (and prometheus_client) is imported.
+prepare_multiprocess('cache/prometheus')
+
+# Threads let a worker keep serving while /admin/profile samples it
+threads = 4
+timeout = 60
+# Workers inherit the warmed-up models copy-on-write from the master
+preload_app = True
+
+def on_starting(server):
+    # Runs in the master before any worker forks; without it /ready stays 503
+    from main import prepare_server
+    prepare_server()
+
+def post_worker_init(worker):
+    # Run the jobs queued before a restart without waiting for a request to the queue
+    from main import backend_api
+    backend_api().job_queue.start()
+
+def child_exit(server, worker):
+    mark_process_dead(worker.pid)
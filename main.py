@@ -4,24 +4,35 @@ import sys
 import argparse
 import logging
 import time
+import math
 import json
 import secrets
-from functools import wraps
+from functools import wraps, lru_cache
 from datetime import datetime
 from pathlib import Path
+from types import SimpleNamespace
 
 # Third-party imports
-import nltk
-from flask import Flask, render_template, send_from_directory, request, jsonify, make_response
+# nltk, markdown, prometheus_client and the backend (TextBlob, NumPy) are imported
+# on first use so that starting the process and --help stay fast
+from flask import Flask, Response, render_template, send_from_directory, request, jsonify, make_response
 from flask_cors import CORS
-import markdown
-from werkzeug.contrib.cache import SimpleCache
-from prometheus_client import Counter, Histogram, generate_latest
+
+from backend.cache import MemoryBackend
+from backend.rate_limit import create_limiter
+from backend.tracing import install as install_tracing
 
 
 # Configure metrics
-REQUEST_COUNT = Counter('request_count', 'App Request Count', ['method', 'endpoint', 'status'])
-REQUEST_LATENCY = Histogram('request_latency_seconds', 'Request latency', ['endpoint'])
+@lru_cache(maxsize=None)
+def get_metrics() -> SimpleNamespace:
+    """Create the Prometheus metrics on first use"""
+    from prometheus_client import Counter, Histogram
+    return SimpleNamespace(
+        request_count=Counter('request_count', 'App Request Count', ['method', 'endpoint', 'status']),
+        request_latency=Histogram('request_latency_seconds', 'Request latency', ['endpoint']),
+        cache_requests=Counter('result_cache_requests', 'Result cache lookups', ['cache', 'result'])
+    )
 
 # Configure logging with more detailed format
 logging.basicConfig(
@@ -31,8 +42,8 @@ logging.basicConfig(
 )
 logger = logging.getLogger("BiasDetector")
 
-# Initialize cache with larger default timeout for API responses
-cache = SimpleCache(default_timeout=300)
+# Initialize cache with larger default timeout for rendered pages
+cache = MemoryBackend(max_entries=256, default_ttl=300)
 
 class Config:
     def __init__(self):
@@ -58,8 +69,11 @@ class Config:
     def save_config(self):
         with open(self.config_path, "w") as f:
             json.dump(self.settings, f, indent=4)
-            
-config = Config()
+
+# Loaded (and config.json written if missing) on first use, so importing main writes no files
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    return Config()
 
 # Enhanced performance monitoring decorator
 def monitor_performance(f):
@@ -69,39 +83,41 @@ def monitor_performance(f):
         try:
             response = f(*args, **kwargs)
             status = response[1] if isinstance(response, tuple) else 200
-            REQUEST_COUNT.labels(method=request.method, endpoint=request.endpoint, status=status).inc()
-            REQUEST_LATENCY.labels(endpoint=request.endpoint).observe(time.time() - start_time)
+            metrics = get_metrics()
+            metrics.request_count.labels(method=request.method, endpoint=request.endpoint, status=status).inc()
+            metrics.request_latency.labels(endpoint=request.endpoint).observe(time.time() - start_time)
             return response
         except Exception as e:
-            REQUEST_COUNT.labels(method=request.method, endpoint=request.endpoint, status=500).inc()
-            REQUEST_LATENCY.labels(endpoint=request.endpoint).observe(time.time() - start_time)
+            metrics = get_metrics()
+            metrics.request_count.labels(method=request.method, endpoint=request.endpoint, status=500).inc()
+            metrics.request_latency.labels(endpoint=request.endpoint).observe(time.time() - start_time)
             raise
     return decorated_function
 
-# Rate limiting functionality
-def get_rate_limit():
-    """Get remaining API calls for current IP"""
-    ip = request.remote_addr
-    current = cache.get(f"rate_limit_{ip}") or 0
-    return max(0, config.settings['api']['rate_limit'] - current)
-
-def update_rate_limit():
-    """Update rate limit counter for current IP"""
-    ip = request.remote_addr
-    current = cache.get(f"rate_limit_{ip}") or 0
-    cache.set(f"rate_limit_{ip}", current + 1, timeout=3600)
+# Rate limiting functionality: a token bucket per IP allowing `rate_limit` requests
+# per hour, stored in SQLite by default so that all gunicorn workers share it
+@lru_cache(maxsize=None)
+def get_rate_limiter():
+    """Create the rate limiter (and its database) on the first rate-limited request"""
+    return create_limiter(
+        get_config().settings['api']['rate_limit'],
+        period=3600,
+        backend=os.environ.get('RATE_LIMIT_BACKEND', 'sqlite'),
+        path=os.environ.get('RATE_LIMIT_PATH')
+    )
 
 # Error handling decorator
 def handle_errors(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         try:
-            # Check rate limit
-            if get_rate_limit() <= 0:
-                return jsonify({"error": "Rate limit exceeded"}), 429
-            
-            # Update rate limit counter
-            update_rate_limit()
+            # Check and consume the rate limit in one atomic step
+            limit = get_rate_limiter().acquire(request.remote_addr or 'unknown')
+            if not limit.allowed:
+                return jsonify({
+                    'error': 'Rate limit exceeded',
+                    'retry_after': math.ceil(limit.retry_after)
+                }), 429
             
             # Execute the function
             return f(*args, **kwargs)
@@ -124,97 +140,135 @@ CORS(app,
      origins=["http://localhost:*", "https://*.biasdetector.dev"],
      supports_credentials=True,
      methods=["GET", "POST", "OPTIONS"],
-     allow_headers=["Content-Type", "Authorization"])
+     allow_headers=["Content-Type", "Authorization", "X-Trace"],
+     expose_headers=["Server-Timing"])
+
+# Requests sent with X-Trace: 1 get a Server-Timing header of their pipeline stages
+install_tracing(app)
+
+
+# Backend API, imported when the first API request arrives
+@lru_cache(maxsize=None)
+def backend_api():
+    """Import backend.app on first use and hook its cache into our metrics"""
+    import backend.app as backend_app
+    for cache in (backend_app.result_cache, backend_app.extraction_cache):
+        cache.add_listener(
+            lambda name, event: get_metrics().cache_requests.labels(cache=name, result=event).inc()
+        )
+    return backend_app
 
 
 # Register backend API endpoints with enhanced functionality
-try:
-    from backend.app import (
-        health_check, analyze, rewrite, analyze_and_rewrite,
-        analyze_v2, comparative_analysis, check_source_credibility
-    )
-    
-    @app.route('/health', methods=['GET'])
-    @monitor_performance
-    @handle_errors
-    def wrapped_health_check():
-        status = health_check()
-        return {
-            **status,
-            'config': config.settings,
-            'metrics': {
-                'requests': generate_latest().decode()
-            }
-        }
+@app.route('/health', methods=['GET'])
+@monitor_performance
+@handle_errors
+def wrapped_health_check():
+    status = backend_api().health_check().get_json()
+    return {
+        **status,
+        'config': get_config().settings
+    }
+
+# Longest profile a request may ask for; the request blocks while sampling
+MAX_PROFILE_SECONDS = 30.0
+
+@app.route('/admin/profile', methods=['GET'])
+def admin_profile():
+    """
+    Sample this worker's threads for ?seconds=N (default 10) every
+    ?interval_ms=N (default 5) and return the stacks in collapsed format.
+    Requires `Authorization: Bearer $ADMIN_TOKEN`; disabled without ADMIN_TOKEN.
+    """
+    token = os.environ.get('ADMIN_TOKEN')
+    if not token:
+        return jsonify({'error': 'Not found'}), 404
+    if not secrets.compare_digest(request.headers.get('Authorization', '').encode(), f'Bearer {token}'.encode()):
+        return jsonify({'error': 'Unauthorized'}), 401
+    try:
+        seconds = min(max(float(request.args.get('seconds', '10')), 0.1), MAX_PROFILE_SECONDS)
+        interval = max(float(request.args.get('interval_ms', '5')), 1.0) / 1000
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+
+    from backend.errors import ProfilerBusyError
+    from backend.profiler import profile
+    try:
+        stacks = profile(seconds, interval)
+    except ProfilerBusyError as e:
+        return jsonify({'error': e.message}), e.status_code
+    logger.info(f"Served a {seconds:.1f}s profile to {request.remote_addr}")
+    return Response(stacks, content_type='text/plain; charset=utf-8',
+                    headers={'Content-Disposition': 'attachment; filename="profile.collapsed"'})
+
+# Prometheus scrape endpoint; not rate limited, and summed over all workers in multiprocess mode
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    from backend.metrics import exposition
+    data, content_type = exposition()
+    return Response(data, content_type=content_type)
+
+@app.route('/api/v2/analyze/batch', methods=['POST'])
+@monitor_performance
+@handle_errors
+def wrapped_analyze_batch():
+    return backend_api().analyze_batch()
+
+@app.route('/api/v2/analyze/stream', methods=['POST'])
+@monitor_performance
+@handle_errors
+def wrapped_analyze_stream():
+    return backend_api().analyze_stream()
     
-    @app.route('/api/v2/analyze', methods=['POST'])
-    @monitor_performance
-    @handle_errors
-    def wrapped_analyze_v2():
-        if get_rate_limit() <= 0:
-            return jsonify({
-                'error': 'Rate limit exceeded',
-                'retry_after': 3600
-            }), 429
-            
-        update_rate_limit()
-        return analyze_v2()
-        
-    @app.route('/api/v2/compare', methods=['POST'])
-    @monitor_performance
-    @handle_errors
-    def wrapped_comparative_analysis():
-        if get_rate_limit() <= 0:
-            return jsonify({
-                'error': 'Rate limit exceeded',
-                'retry_after': 3600
-            }), 429
-            
-        update_rate_limit()
-        return comparative_analysis()
-        
-    @app.route('/api/v2/source-credibility', methods=['GET'])
-    @monitor_performance
-    @handle_errors
-    def wrapped_source_credibility():
-        if get_rate_limit() <= 0:
-            return jsonify({
-                'error': 'Rate limit exceeded',
-                'retry_after': 3600
-            }), 429
-            
-        update_rate_limit()
-        return check_source_credibility()
-        
-    # Legacy API endpoints with rate limiting
-    @app.route('/analyze', methods=['POST'])
-    @monitor_performance
-    @handle_errors
-    def wrapped_analyze():
-        if get_rate_limit() <= 0:
-            return jsonify({
-                'error': 'Rate limit exceeded',
-                'retry_after': 3600
-            }), 429
-            
-        update_rate_limit()
-        return analyze()
+@app.route('/api/v2/jobs', methods=['POST'])
+@monitor_performance
+@handle_errors
+def wrapped_submit_job():
+    return backend_api().submit_job()
+
+@app.route('/api/v2/jobs/<job_id>', methods=['GET'])
+@monitor_performance
+@handle_errors
+def wrapped_get_job(job_id):
+    return backend_api().get_job(job_id)
     
-    @app.route('/rewrite', methods=['POST'])
-    @monitor_performance
-    @handle_errors
-    def wrapped_rewrite():
-        return rewrite()
+@app.route('/api/v2/similar', methods=['POST'])
+@monitor_performance
+@handle_errors
+def wrapped_similar_articles():
+    return backend_api().similar_articles()
+
+@app.route('/api/v2/similar/index', methods=['POST'])
+@monitor_performance
+@handle_errors
+def wrapped_index_similar_article():
+    return backend_api().index_similar_article()
     
-    @app.route('/analyze_and_rewrite', methods=['POST'])
-    @monitor_performance
-    @handle_errors
-    def wrapped_analyze_and_rewrite():
-        return analyze_and_rewrite()
+@app.route('/api/v2/source-credibility', methods=['GET'])
+@monitor_performance
+@handle_errors
+def wrapped_source_credibility():
+    return backend_api().check_source_credibility()
     
-    logger.info("Backend API routes registered successfully")
-except ImportError as e:
-    logger.warning(f"Failed to import backend API: {e}")
+# Legacy API endpoints with rate limiting
+@app.route('/analyze', methods=['POST'])
+@monitor_performance
+@handle_errors
+def wrapped_analyze():
+    return backend_api().analyze()
+
+@app.route('/rewrite', methods=['POST'])
+@monitor_performance
+@handle_errors
+def wrapped_rewrite():
+    return backend_api().rewrite()
+
+@app.route('/analyze_and_rewrite', methods=['POST'])
+@monitor_performance
+@handle_errors
+def wrapped_analyze_and_rewrite():
+    return backend_api().analyze_and_rewrite_endpoint()
+
 
 # Add system health endpoint
 @app.route('/system/health')
@@ -229,12 +283,20 @@ def system_health():
     }
     return jsonify(health_info)
 
+# Readiness probe: only reports ready once warm-up has loaded models in this process
+@app.route('/ready')
+def readiness():
+    from backend.warmup import warmup_status
+    status = warmup_status()
+    return jsonify(status), 200 if status['ready'] else 503
+
 # Utility: Render Markdown documentation with caching
 def render_markdown(path, cache_timeout=300):  # Cache for 5 minutes
     cache_key = f'markdown_{path}'
     content = cache.get(cache_key)
     
     if content is None:
+        ensure_site_files()
         try:
             with open(path, 'r', encoding='utf-8') as f:
                 content = f.read()
@@ -247,9 +309,10 @@ def render_markdown(path, cache_timeout=300):  # Cache for 5 minutes
                             if line.startswith('title:'):
                                 title = line[6:].strip()
                         content = content[end+3:].strip()
+                import markdown
                 html_content = markdown.markdown(content, extensions=['fenced_code', 'tables'])
                 rendered = render_template('layout.html', title=title, content=html_content)
-                cache.set(cache_key, rendered, timeout=cache_timeout)
+                cache.set(cache_key, rendered, ttl=cache_timeout)
                 return rendered
         except FileNotFoundError:
             return "Page not found", 404
@@ -290,12 +353,9 @@ def serve_assets(path):
     return send_from_directory('docs/assets', path)
 
 
-# Ensure template exists for Markdown rendering
+# Default template for Markdown rendering
 TEMPLATE_PATH = 'templates/layout.html'
-os.makedirs('templates', exist_ok=True)
-if not os.path.exists(TEMPLATE_PATH):
-    with open(TEMPLATE_PATH, 'w', encoding='utf-8') as f:
-        f.write('''<!DOCTYPE html>
+DEFAULT_LAYOUT = '''<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -399,29 +459,47 @@ if not os.path.exists(TEMPLATE_PATH):
         © 2025 Amar Kumar. Released under the <a href="https://opensource.org/licenses/MIT">MIT License</a>.
     </footer>
 </body>
-</html>''')
-
-
-# Ensure basic documentation files exist
-for file in ['README.md', 'installation.md', 'usage.md', 'developers.md']:
-    path = os.path.join('docs', file)
-    if not os.path.exists(path):
-        with open(path, 'w', encoding='utf-8') as f:
-            f.write(f'# {file[:-3].title()}\n\nContent coming soon.')
-
-
-# Initialize NLTK
+</html>'''
+
+_site_files_checked = False
+
+def ensure_site_files() -> None:
+    """Create the layout template and placeholder docs if they are missing"""
+    global _site_files_checked
+    if _site_files_checked:
+        return
+    os.makedirs('templates', exist_ok=True)
+    if not os.path.exists(TEMPLATE_PATH):
+        with open(TEMPLATE_PATH, 'w', encoding='utf-8') as f:
+            f.write(DEFAULT_LAYOUT)
+
+    # Ensure basic documentation files exist
+    for file in ['README.md', 'installation.md', 'usage.md', 'developers.md']:
+        path = os.path.join('docs', file)
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(f'# {file[:-3].title()}\n\nContent coming soon.')
+    _site_files_checked = True
+
+
+# Initialize NLTK: nltk reads NLTK_DATA when it is first imported, so the bundled
+# data directory is registered without importing nltk here
 nltk_data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nltk_data')
-os.makedirs(nltk_data_dir, exist_ok=True)
-nltk.data.path.append(nltk_data_dir)  # type: ignore
+os.environ['NLTK_DATA'] = os.pathsep.join(p for p in (os.environ.get('NLTK_DATA'), nltk_data_dir) if p)
 
 def ensure_nltk_data() -> None:
     """Ensure NLTK data is downloaded, with fallback for offline mode"""
-    required_packages = ['punkt', 'averaged_perceptron_tagger', 'maxent_ne_chunker', 'words']
+    import nltk
+    os.makedirs(nltk_data_dir, exist_ok=True)
+    if nltk_data_dir not in nltk.data.path:  # type: ignore
+        nltk.data.path.append(nltk_data_dir)  # type: ignore
+
+    # NLTK 3.9+ loads the sentence tokenizer from punkt_tab rather than the punkt pickle
+    required_packages = ['punkt', 'punkt_tab', 'averaged_perceptron_tagger', 'maxent_ne_chunker', 'words']
     
     for package in required_packages:
         try:
-            nltk.data.find(f'tokenizers/{package}' if package == 'punkt' else package)  # type: ignore
+            nltk.data.find(f'tokenizers/{package}' if package.startswith('punkt') else package)  # type: ignore
         except LookupError:
             try:
                 nltk.download(package, download_dir=nltk_data_dir, quiet=True)  # type: ignore
@@ -430,6 +508,17 @@ def ensure_nltk_data() -> None:
                 if package == 'punkt':
                     raise RuntimeError("Critical NLTK data 'punkt' could not be downloaded. Cannot continue.")
 
+def prepare_server() -> None:
+    """
+    Fetch NLTK data, create the site files and warm up the models. Run once
+    in the serving process, or the gunicorn master (see gunicorn.conf.py),
+    before requests are served; /ready reports 503 until it has finished.
+    """
+    ensure_nltk_data()
+    ensure_site_files()
+    from backend.warmup import warm_up
+    warm_up()
+
 # Entrypoint: Run the BiasBuster app
 def run_bias_buster() -> None:
     """Run the BiasDetector application with proper error handling"""
@@ -447,8 +536,13 @@ def run_bias_buster() -> None:
         if port < 1 or port > 65535:
             raise ValueError(f"Invalid port number: {port}")
             
-        # Initialize required NLTK data
-        ensure_nltk_data()
+        # Workers write metrics to a shared directory so /metrics can report all of them
+        if not args.dev:
+            from backend.metrics import prepare_multiprocess
+            prepare_multiprocess('cache/prometheus')
+
+        # Load tokenizers and lexicons before serving (and, under gunicorn, before workers fork)
+        prepare_server()
         
         if args.dev:
             logger.info(f"Starting BiasBuster in development mode on http://{host}:{port}")
@@ -456,6 +550,7 @@ def run_bias_buster() -> None:
         else:
             try:
                 from gunicorn.app.base import BaseApplication  # type: ignore
+                from backend.metrics import mark_process_dead
 
                 class GunicornApplication(BaseApplication):  # type: ignore
                     def __init__(self, app, options=None):
@@ -474,8 +569,14 @@ def run_bias_buster() -> None:
                 options = {
                     'bind': f'{host}:{port}',
                     'workers': 2,
+                    # Threads let a worker keep serving while /admin/profile samples it
+                    'threads': 4,
                     'timeout': 60,
-                    'reload': False
+                    'reload': False,
+                    # Workers inherit the warmed-up models copy-on-write from the master
+                    'preload_app': True,
+                    'post_worker_init': lambda worker: backend_api().job_queue.start(),
+                    'child_exit': lambda server, worker: mark_process_dead(worker.pid)
                 }
 
                 logger.info(f"Starting BiasDetector in production mode on http://{host}:{port}")
@@ -555,4 +656,7 @@ def generate_article():
 @handle_errors
 def demo():
     """Interactive demo page for the BiasDetector API"""
-    return render_template('demo.html')
\ No newline at end of file
+    return render_template('demo.html')
+
+if __name__ == '__main__':
+    run_bias_buster()
@@ -0,0 +1,34 @@
+import pytest
+from textblob import TextBlob  # type: ignore
+
+from backend.batch import LexiconSentiment, get_scorer
+
+
+@pytest.mark.parametrize('sentence', [
+    "The bill is good.",
+    "The bill is not good.",
+    "It was never a bad idea, and the vote was not a disaster.",
+    "No good deed goes unpunished.",
+    "The senator gave a long, boring and dishonest speech.",
+    "Nothing here is in the lexicon.",
+])
+def test_agrees_with_textblob(sentence):
+    polarity, subjectivity = get_scorer().score([sentence])
+    expected = TextBlob(sentence).sentiment
+    assert polarity[0] == pytest.approx(expected.polarity)
+    assert subjectivity[0] == pytest.approx(expected.subjectivity)
+
+
+def test_scores_each_section_separately():
+    scorer = LexiconSentiment({'good': (0.7, 0.6), 'bad': (-0.7, 0.7)})
+    polarity, subjectivity = scorer.score(['good good', 'not', 'bad', ''])
+    # A negation at the end of one section does not carry into the next
+    assert polarity.tolist() == pytest.approx([0.7, 0.0, -0.7, 0.0])
+    assert subjectivity.tolist() == pytest.approx([0.6, 0.0, 0.7, 0.0])
+
+
+def test_negation_flips_and_halves_polarity():
+    scorer = LexiconSentiment({'good': (0.8, 0.5)})
+    polarity, subjectivity = scorer.score(['not good', 'not a good', 'not really good'])
+    assert polarity.tolist() == pytest.approx([-0.4, -0.4, 0.8])
+    assert subjectivity.tolist() == pytest.approx([0.5, 0.5, 0.5])
@@ -0,0 +1,89 @@
+import pytest
+
+from backend.cache import DiskBackend, MemoryBackend, ResultCache, create_backend
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBackend(max_entries=2)
+    return DiskBackend(str(tmp_path / 'results.sqlite3'), max_entries=2)
+
+
+def test_set_get_delete(backend):
+    backend.set('a', {'score': 1.0})
+    assert backend.get('a') == {'score': 1.0}
+    assert backend.get('missing') is None
+    backend.delete('a')
+    assert backend.get('a') is None
+
+
+def test_evicts_least_recently_used(backend, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('backend.cache.time.time', lambda: clock[0])
+    backend.set('a', 1)
+    clock[0] += 1
+    backend.set('b', 2)
+    clock[0] += 1
+    assert backend.get('a') == 1
+    clock[0] += 1
+    backend.set('c', 3)
+    assert backend.get('b') is None
+    assert (backend.get('a'), backend.get('c')) == (1, 3)
+    assert len(backend) == 2
+
+
+def test_entries_expire(backend, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('backend.cache.time.time', lambda: clock[0])
+    monkeypatch.setattr('backend.cache.time.monotonic', lambda: clock[0])
+    backend.set('a', 1, ttl=5)
+    clock[0] += 4
+    assert backend.get('a') == 1
+    clock[0] += 1
+    assert backend.get('a') is None
+
+
+def test_disk_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'results.sqlite3')
+    DiskBackend(path).set('a', [1, 2])
+    assert DiskBackend(path).get('a') == [1, 2]
+
+
+def test_key_depends_on_version_and_namespace():
+    cache = ResultCache(MemoryBackend(), version='1')
+    key = cache.make_key('analyze', 'text')
+    assert key.startswith('analyze:')
+    assert key == cache.make_key('analyze', 'text')
+    assert key != cache.make_key('rewrite', 'text')
+    assert key != ResultCache(MemoryBackend(), version='2').make_key('analyze', 'text')
+
+
+def test_get_or_compute_counts_hits_and_misses():
+    cache = ResultCache(MemoryBackend())
+    events = []
+    cache.add_listener(lambda name, event: events.append(event))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 'result'
+
+    assert cache.get_or_compute('k', compute) == 'result'
+    assert cache.get_or_compute('k', compute) == 'result'
+    assert len(calls) == 1
+    assert events == ['miss', 'hit']
+    assert cache.stats()['entries'] == 1
+
+
+def test_uncacheable_results_are_not_stored():
+    cache = ResultCache(MemoryBackend())
+    value = cache.get_or_compute('k', lambda: {'fallback': True}, cacheable=lambda v: not v['fallback'])
+    assert value == {'fallback': True}
+    assert cache.get('k') is None
+
+
+def test_create_backend_rejects_unknown_kind():
+    assert isinstance(create_backend('memory'), MemoryBackend)
+    with pytest.raises(ValueError):
+        create_backend('redis')
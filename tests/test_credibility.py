@@ -0,0 +1,66 @@
+import json
+import threading
+
+import pytest
+
+from backend.credibility import CredibilityStore, read_ratings
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'credibility.sqlite3')
+
+
+def test_set_and_get(path):
+    store = CredibilityStore(path)
+    assert store.get('example.com') is None
+    store.set('Example.com', 0.9, source='manual')
+    rating = store.get('example.com')
+    assert (rating.domain, rating.score, rating.source) == ('example.com', 0.9, 'manual')
+    assert len(store) == 1
+
+
+def test_ratings_from_other_processes_are_seen_after_cache_ttl(path, monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('backend.cache.time.monotonic', lambda: clock[0])
+    reader = CredibilityStore(path, cache_ttl=60)
+    assert reader.get('example.com') is None
+    CredibilityStore(path).set('example.com', 0.3)
+    assert reader.get('example.com') is None
+    clock[0] += 60
+    assert reader.get('example.com').score == 0.3
+
+
+def test_concurrent_imports_keep_every_rating(path):
+    def write(worker):
+        store = CredibilityStore(path)
+        store.import_ratings(((f'site{worker}-{i}.com', 0.5) for i in range(200)), chunk_size=50)
+
+    threads = [threading.Thread(target=write, args=(worker,)) for worker in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(CredibilityStore(path)) == 800
+
+
+def test_unrated_lookups_are_batched(path):
+    store = CredibilityStore(path, batch_size=3, flush_interval=3600)
+    for domain in ('a.com', 'b.com', 'a.com'):
+        store.record_unrated(domain)
+    # Two distinct domains are below the batch size, so nothing is written yet
+    assert CredibilityStore(path)._connect().execute('SELECT COUNT(*) FROM unrated').fetchone() == (0,)
+    assert list(store.unrated()) == [('a.com', 2), ('b.com', 1)]
+
+    store.set('a.com', 0.7)
+    assert list(store.unrated()) == [('b.com', 1)]
+
+
+@pytest.mark.parametrize('name, content', [
+    ('ratings.json', json.dumps({'a.com': 0.9, 'b.org': 0.2})),
+    ('ratings.jsonl', '{"domain": "a.com", "score": 0.9}\n\n{"domain": "b.org", "score": 0.2}\n'),
+    ('ratings.csv', 'domain,score\n# comment\na.com,0.9\nb.org,0.2\n'),
+])
+def test_read_ratings_formats(tmp_path, name, content):
+    (tmp_path / name).write_text(content, encoding='utf-8')
+    assert [(d, float(s)) for d, s in read_ratings(str(tmp_path / name))] == [('a.com', 0.9), ('b.org', 0.2)]
@@ -0,0 +1,60 @@
+import difflib
+
+from backend.diff import intern_sequences, patience_opcodes, token_diff
+
+
+def _apply(a, b, opcodes):
+    """Rebuild b from a and the opcodes, checking they cover both sequences in order"""
+    out = []
+    a_pos = b_pos = 0
+    for tag, i1, i2, j1, j2 in opcodes:
+        assert (i1, j1) == (a_pos, b_pos)
+        if tag == 'equal':
+            assert a[i1:i2] == b[j1:j2]
+        out.extend(b[j1:j2])
+        a_pos, b_pos = i2, j2
+    assert (a_pos, b_pos) == (len(a), len(b))
+    return out
+
+
+def test_opcodes_rebuild_target():
+    a = "the quick brown fox jumps over the lazy dog".split()
+    b = "the slow brown fox leaps over the sleepy dog today".split()
+    assert _apply(a, b, patience_opcodes(a, b)) == b
+
+
+def test_unique_lines_anchor_the_diff():
+    a = ['}', 'def a():', 'pass', '}', 'def b():', 'pass', '}']
+    b = ['}', 'def b():', 'pass', '}']
+    opcodes = patience_opcodes(a, b)
+    assert _apply(a, b, opcodes) == b
+    matched = sum(i2 - i1 for tag, i1, i2, _, _ in opcodes if tag == 'equal')
+    assert matched == len(b)
+
+
+def test_matches_difflib_on_identical_and_empty_inputs():
+    a = ['x', 'y', 'z']
+    assert patience_opcodes(a, a) == [('equal', 0, 3, 0, 3)]
+    assert _apply([], a, patience_opcodes([], a)) == a
+    assert _apply(a, [], patience_opcodes(a, [])) == []
+    assert difflib.SequenceMatcher(None, a, a).get_opcodes() == [('equal', 0, 3, 0, 3)]
+
+
+def test_expired_deadline_reports_one_replace():
+    a, b = list('xabcdy'), list('zdcbaw')
+    assert len(patience_opcodes(a, b)) > 1
+    assert patience_opcodes(a, b, deadline=0.0) == [('replace', 0, 6, 0, 6)]
+
+
+def test_intern_sequences_shares_ids():
+    a_ids, b_ids = intern_sequences(['one', 'two'], ['two', 'three'])
+    assert a_ids[1] == b_ids[0]
+    assert len({*a_ids, *b_ids}) == 3
+
+
+def test_token_diff():
+    assert token_diff("a cruel plan", "a plan") == [
+        {'type': 'unchanged', 'text': 'a'},
+        {'type': 'removed', 'text': 'cruel'},
+        {'type': 'unchanged', 'text': 'plan'},
+    ]
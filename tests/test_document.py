@@ -0,0 +1,37 @@
+from backend.document import Document
+from backend.text_utils import clean_text, split_into_sections
+
+ARTICLE = ("<p>The committee   <b>obviously</b> ignored the report.</p>\n\n"
+           "<p>Critics say it was a terrible decision &amp; a costly one.</p>") * 30
+
+
+def test_sections_are_spans_of_the_cleaned_text():
+    document = Document(ARTICLE, max_section_length=300)
+    assert document.text == clean_text(ARTICLE)
+    assert len(document) > 1
+    assert list(document.sections) == split_into_sections(document.text, 300)
+    assert document.sections[1] == document.text[slice(*document.section_span(1))]
+    assert document.sections[-2:] == list(document.sections)[-2:]
+
+
+def test_highlights_point_into_the_original():
+    document = Document(ARTICLE, max_section_length=300)
+    highlights = document.scan(len(document) - 1)
+    assert {hit['text'] for hit in highlights} >= {'obviously', 'terrible'}
+    for hit in highlights:
+        assert ARTICLE[hit['start']:hit['end']] == hit['text']
+    assert len(document.scan()) == 60
+
+
+def test_section_span_maps_to_original():
+    document = Document(ARTICLE, max_section_length=300)
+    start, end = document.to_original(*document.section_span(0))
+    assert clean_text(ARTICLE[start:end]) == document.sections[0]
+
+
+def test_cleaned_text_is_used_as_is():
+    cleaned = clean_text(ARTICLE)
+    document = Document(cleaned, cleaned=True)
+    assert document.text is cleaned
+    assert document.to_original(5, 9) == (5, 9)
+    assert len(Document('')) == 0
@@ -0,0 +1,72 @@
+import pytest
+
+from backend.credibility import CredibilityStore
+from backend.domains import CompactDomainTrie, DomainTrie, parse_source
+from backend.models import SourceCredibility
+
+RATINGS = [('example.com', 0.9, 'list'), ('news.example.com', 0.4, None), ('gov.uk', 0.8, 'list'),
+           ('bbc.co.uk', 0.85, 'other'), ('xn--bcher-kva.de', 0.6, None)]
+
+
+def test_compact_trie_matches_in_memory_trie(tmp_path):
+    trie = DomainTrie()
+    for domain, score, source in RATINGS:
+        trie.insert(domain, score, source)
+    path = str(tmp_path / 'ratings.trie')
+    trie.write(path)
+    compact = CompactDomainTrie(path)
+    for host in ('example.com', 'www2.news.example.com', 'a.example.com', 'service.gov.uk', 'bbc.co.uk',
+                 'co.uk', 'example.org', 'xn--bcher-kva.de'):
+        assert compact.longest_match(host) == trie.longest_match(host)
+    assert compact.longest_match('deep.news.example.com') == ('news.example.com', 0.4, None)
+    assert compact.longest_match('other.gov.uk') == ('gov.uk', 0.8, 'list')
+    compact.close()
+
+
+@pytest.mark.parametrize('url, expected', [
+    ('https://www.Example.com/path', ('example.com', 'example.com', 'com')),
+    ('news.bbc.co.uk', ('news.bbc.co.uk', 'bbc.co.uk', 'co.uk')),
+    ('https://bücher.de/', ('xn--bcher-kva.de', 'xn--bcher-kva.de', 'de')),
+    ('co.uk', ('co.uk', None, 'co.uk')),
+])
+def test_parse_source(url, expected):
+    assert tuple(parse_source(url)) == expected
+
+
+@pytest.fixture
+def credibility(tmp_path, monkeypatch):
+    """A SourceCredibility over a fresh store and a trie built from it, counting store reads"""
+    store = CredibilityStore(str(tmp_path / 'credibility.sqlite3'))
+    store.import_ratings([(domain, score) for domain, score, _ in RATINGS], source='list')
+    path = str(tmp_path / 'credibility.trie')
+    store.build_index(path)
+    trie = CompactDomainTrie(path)
+    monkeypatch.setattr('backend.models.get_domain_index', lambda: trie)
+
+    reads = []
+    get = store.get
+    monkeypatch.setattr(store, 'get', lambda domain: reads.append(domain) or get(domain))
+    return SourceCredibility(store), reads
+
+
+def test_lookup_uses_the_trie_alone_when_it_is_current(credibility):
+    sources, reads = credibility
+    assert sources.get_rating('https://sport.news.example.com/x').domain == 'news.example.com'
+    assert sources.get_credibility('https://service.gov.uk') == 0.8
+    assert reads == []
+
+
+def test_lookup_sees_ratings_written_after_the_build(credibility):
+    sources, reads = credibility
+    sources.store.set('sport.news.example.com', 0.1)
+    assert sources.get_credibility('https://sport.news.example.com/x') == 0.1
+    # Parents above the trie's match are not read from the store
+    assert sources.get_credibility('https://weather.news.example.com') == 0.4
+    assert reads == ['sport.news.example.com', 'weather.news.example.com', 'news.example.com']
+
+
+def test_unrated_sources_are_recorded_by_registrable_domain(credibility):
+    sources, _ = credibility
+    assert sources.get_rating('https://a.b.unknown.co.uk') is None
+    assert sources.get_credibility('https://unknown.co.uk') == SourceCredibility.DEFAULT_SCORE
+    assert list(sources.store.unrated()) == [('unknown.co.uk', 2)]
@@ -0,0 +1,63 @@
+import pytest
+
+from backend import extraction
+from backend.app import app
+from backend.extraction import extract_article
+
+PARAGRAPH = "The council voted on the new housing plan after a long debate about its costs and benefits."
+
+PAGE = f"""<html><head><title>Housing vote | Daily</title>
+<meta property="og:title" content="Housing vote">
+<script>var tracking = "not article text";</script></head>
+<body>
+<nav><a href="/">Home</a> <a href="/news">News</a></nav>
+<div class="sidebar">Trending now: a story nobody should read as part of this article.</div>
+<article>
+  <h1>Housing vote</h1>
+  <p>{PARAGRAPH}</p>
+  <p>Members said the &lt;b&gt; tag in the draft was a typo &amp; fixed it.</p>
+  <div class="share-tools">Share this on social media with all of your friends and family.</div>
+</article>
+<footer>Copyright and other footer text that is long enough to look like a paragraph.</footer>
+</body></html>"""
+
+
+@pytest.fixture(autouse=True)
+def builtin_parser(monkeypatch):
+    # Test the streaming parser whether or not trafilatura is installed
+    monkeypatch.setattr(extraction, '_trafilatura', lambda: None)
+
+
+def test_extracts_article_paragraphs():
+    extracted = extract_article(PAGE)
+    assert extracted['extractor'] == 'parser'
+    assert extracted['title'] == 'Housing vote'
+    assert extracted['text'].split('\n\n') == [
+        'Housing vote',
+        PARAGRAPH,
+        'Members said the <b> tag in the draft was a typo & fixed it.',
+    ]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 100])
+def test_result_does_not_depend_on_chunking(chunk_size):
+    assert extract_article(PAGE, chunk_size=chunk_size) == extract_article(PAGE)
+
+
+def test_without_article_container_drops_short_and_link_blocks():
+    page = (f"<body><div><p>{PARAGRAPH}</p><p>Short line.</p>"
+            f"<p><a href='/a'>{PARAGRAPH}</a></p><p>Advertisement</p></div></body>")
+    assert extract_article(page)['text'] == PARAGRAPH
+
+
+def test_analyze_keeps_escaped_tags_in_extracted_text(monkeypatch):
+    seen = []
+    monkeypatch.setattr('backend.app.analyze_text', lambda text, cleaned=False: seen.append(text) or _Metrics())
+    response = app.test_client().post('/analyze', json={'html': PAGE, 'url': 'https://example.com/vote'})
+    assert response.status_code == 200
+    assert seen == [f'Housing vote {PARAGRAPH} Members said the <b> tag in the draft was a typo & fixed it.']
+
+
+class _Metrics:
+    def to_dict(self):
+        return {}
@@ -0,0 +1,18 @@
+import subprocess
+import sys
+
+from benchmarks.import_time import IMPORT_BUDGET_MS, LAZY_MODULES, ROOT, measure
+
+
+def test_import_main_within_budget():
+    assert measure() < IMPORT_BUDGET_MS
+
+
+def test_import_main_leaves_lazy_modules_unloaded():
+    # A fresh interpreter, since other tests import these modules into this one
+    result = subprocess.run(
+        [sys.executable, '-c', 'import sys, main; print("\\n".join(sys.modules))'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    loaded = set(result.stdout.split())
+    assert [name for name in LAZY_MODULES if name in loaded] == []
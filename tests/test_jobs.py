@@ -0,0 +1,82 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from backend.errors import QueueFullError
+from backend.jobs import QUEUED, RUNNING, SUCCEEDED, JobQueue, JobStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'jobs.sqlite3')
+
+
+def test_claims_by_priority_then_age(path):
+    store = JobStore(path)
+    low = store.create('rewrite', {'n': 1}, priority=5)
+    high = store.create('rewrite', {'n': 2}, priority=1)
+    later = store.create('rewrite', {'n': 3}, priority=5)
+    assert store.count(QUEUED) == 3
+
+    claimed = [store.claim_next() for _ in range(4)]
+    assert [job[0] for job in claimed[:3]] == [high['id'], low['id'], later['id']]
+    assert claimed[0][1:] == ('rewrite', {'n': 2})
+    assert claimed[3] is None
+    assert store.count(RUNNING) == 3
+
+
+def test_recover_requeues_jobs_of_exited_owners(path):
+    store = JobStore(path)
+    exited = subprocess.Popen([sys.executable, '-c', 'pass'])
+    exited.wait()
+    jobs = [store.create('compare', {}, priority=5) for _ in range(3)]
+    for _ in jobs:
+        store.claim_next()
+    conn = store._connect()
+    conn.execute('UPDATE jobs SET owner = ? WHERE id = ?', (exited.pid, jobs[0]['id']))
+    # Same pid as a live process but a different start time: the pid was reused
+    conn.execute('UPDATE jobs SET owner_start = -1 WHERE id = ?', (jobs[1]['id'],))
+
+    assert store.recover() == 2
+    assert [store.get(job['id'])['status'] for job in jobs] == [QUEUED, QUEUED, RUNNING]
+
+
+def test_backpressure_counts_queued_jobs_of_every_process(path):
+    release = threading.Event()
+    queue = JobQueue(JobStore(path), workers=1, max_pending=1, poll_interval=0.05)
+    queue.register('compare', lambda payload: release.wait(5) and payload)
+
+    running = queue.submit('compare', {'n': 1})
+    # Wait for the only worker thread to pick it up
+    for _ in range(500):
+        if queue.get(running['id'])['status'] == RUNNING:
+            break
+        time.sleep(0.01)
+
+    # Queued through another process sharing the store
+    sibling = JobStore(path).create('compare', {'n': 2}, priority=5)
+    assert queue.pending() == 1
+    with pytest.raises(QueueFullError):
+        queue.submit('compare', {'n': 3})
+
+    release.set()
+    assert queue.get(running['id'], wait=5)['result'] == {'n': 1}
+    job = queue.get(sibling['id'], wait=5)
+    assert (job['status'], job['result']) == (SUCCEEDED, {'n': 2})
+    assert queue.pending() == 0
+
+
+def test_failed_job_records_error(path):
+    queue = JobQueue(JobStore(path), workers=1, poll_interval=0.05)
+
+    def fail(payload):
+        raise RuntimeError('model unavailable')
+
+    queue.register('rewrite', fail)
+    job = queue.get(queue.submit('rewrite', {})['id'], wait=5)
+    assert (job['status'], job['error']) == ('failed', 'model unavailable')
+    with pytest.raises(ValueError):
+        queue.submit('unknown', {})
@@ -0,0 +1,34 @@
+from backend.lexicon import LexiconScanner, default_scanner
+
+
+def test_longest_term_wins():
+    scanner = LexiconScanner({'short': ['ought'], 'long': ['ought to']})
+    hits = scanner.scan("You ought to go.")
+    assert [(hit.category, hit.text) for hit in hits] == [('long', 'ought to')]
+
+
+def test_offsets_point_into_text():
+    text = "Everyone must obviously agree."
+    for hit in default_scanner.scan(text):
+        assert text[hit.start:hit.end] == hit.text
+    assert [hit.term for hit in default_scanner.scan(text)] == ['everyone', 'must', 'obviously']
+
+
+def test_case_insensitive_and_hyphen_joined():
+    scanner = LexiconScanner({'labels': ['left wing']})
+    assert [hit.text for hit in scanner.scan("The Left-Wing press")] == ['Left-Wing']
+
+
+def test_possessive_matches_term():
+    assert [hit.term for hit in default_scanner.scan("It is everyone's problem.")] == ['everyone']
+
+
+def test_contractions_are_one_word():
+    scanner = LexiconScanner({'neg': ['don']})
+    assert scanner.scan("I don't know") == []
+
+
+def test_category_filter_and_range():
+    text = "We must always win."
+    assert [hit.term for hit in default_scanner.scan(text, ['absolutes'])] == ['always']
+    assert [hit.term for hit in default_scanner.scan(text, start=8)] == ['always']
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from prometheus_client import REGISTRY
+
+from backend.metrics import exposition, observe_document, prepare_multiprocess, size_class, stage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize('chars, expected', [(0, '<1k'), (999, '<1k'), (1000, '1k-10k'),
+                                             (250_000, '100k-1M'), (5_000_000, '>=1M')])
+def test_size_class(chars, expected):
+    assert size_class(chars) == expected
+
+
+def test_stage_is_observed_by_name_and_size_class():
+    labels = {'stage': 'test_stage', 'size_class': '1k-10k'}
+    before = REGISTRY.get_sample_value('pipeline_stage_seconds_count', labels) or 0
+    with pytest.raises(RuntimeError):
+        with stage('test_stage', 5000):
+            raise RuntimeError('a failed stage is still timed')
+    with stage('test_stage', 5000):
+        pass
+    assert REGISTRY.get_sample_value('pipeline_stage_seconds_count', labels) == before + 2
+
+    observe_document(5000)
+    data, content_type = exposition()
+    assert content_type.startswith('text/plain')
+    assert b'pipeline_stage_seconds_bucket{' in data
+    assert b'document_size_characters_count' in data
+
+
+def test_exposition_sums_every_process(tmp_path):
+    # The multiprocess directory is read when prometheus_client is imported,
+    # so the workers and the scrape each run in a fresh interpreter
+    env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=str(tmp_path))
+    worker = "from backend.metrics import stage\nwith stage('extraction', 50):\n    pass"
+    for _ in range(3):
+        subprocess.run([sys.executable, '-c', worker], cwd=ROOT, env=env, check=True)
+    scrape = "import sys\nfrom backend.metrics import exposition\nsys.stdout.write(exposition()[0].decode())"
+    output = subprocess.run([sys.executable, '-c', scrape], cwd=ROOT, env=env, check=True,
+                            capture_output=True, text=True).stdout
+    assert 'pipeline_stage_seconds_count{size_class="<1k",stage="extraction"} 3.0' in output
+
+
+def test_prepare_multiprocess_clears_samples_of_earlier_runs(tmp_path, monkeypatch):
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(tmp_path))
+    (tmp_path / 'histogram_123.db').write_bytes(b'')
+    (tmp_path / 'notes.txt').write_text('kept')
+    prepare_multiprocess(str(tmp_path / 'unused'))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['notes.txt']
@@ -0,0 +1,32 @@
+import math
+
+import pytest
+
+from backend import ai_processor
+from backend.cache import MemoryBackend
+from backend.parallel import SectionPool
+
+
+@pytest.fixture(scope='module')
+def pool():
+    pool = SectionPool(2)
+    yield pool
+    pool.shutdown()
+
+
+def test_map_preserves_order_and_records_failures(pool):
+    items = [float(i) for i in range(50)] + [-1.0, 4.0]
+    expected = [math.sqrt(i) for i in range(50)] + [None, 2.0]
+    assert pool.map(math.sqrt, items) == expected
+    assert pool.map(math.sqrt, []) == []
+
+
+def test_parallel_scoring_matches_serial(pool, monkeypatch):
+    monkeypatch.setattr(ai_processor, 'get_pool', lambda: pool)
+    sections = [f"Section {i} was {'good' if i % 3 else 'terrible'} and fair." for i in range(20)]
+
+    monkeypatch.setattr(ai_processor, '_section_scores', MemoryBackend())
+    serial = ai_processor._score_sections(sections, parallel=False)
+    monkeypatch.setattr(ai_processor, '_section_scores', MemoryBackend())
+    parallel = ai_processor._score_sections(sections, parallel=True)
+    assert parallel == serial
@@ -0,0 +1,135 @@
+import os
+
+import pytest
+
+from backend.errors import APIError
+from backend.providers import CircuitBreaker, RemoteRewriteProvider
+
+
+class _Response:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+class _Session:
+    """Stands in for requests.Session, answering every call with the given statuses in turn"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.calls = 0
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        self.calls += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        body = {'choices': [{'message': {'content': '["neutral"]'}}]} if status == 200 else None
+        return _Response(status, body)
+
+
+def _provider(session, breaker, api_key='server-key'):
+    provider = RemoteRewriteProvider(api_key=api_key, breaker=breaker, max_retries=1, backoff=0)
+    # Skip creating a real requests session; the pool is per process
+    provider._session, provider._pid = session, os.getpid()
+    return provider
+
+
+def test_breaker_opens_after_threshold(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr('backend.providers.time.monotonic', lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == 'closed'
+    breaker.record_failure()
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+
+    clock[0] += 10
+    assert breaker.allow()
+    # Only one trial call at a time
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_failed_trial_reopens(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr('backend.providers.time.monotonic', lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5)
+    breaker.record_failure()
+    clock[0] = 5
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open'
+
+
+def test_neutral_outcome_ends_trial(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr('backend.providers.time.monotonic', lambda: clock[0])
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=5)
+    breaker.record_failure()
+    clock[0] = 5
+    assert breaker.allow()
+    breaker.record_neutral()
+    assert breaker.allow()
+
+
+def test_non_retryable_status_during_trial_releases_it():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    provider = _provider(_Session(401), breaker)
+    with pytest.raises(APIError):
+        provider.rewrite(['loaded sentence'])
+    assert breaker.allow()
+
+
+def test_caller_key_rate_limit_does_not_trip_shared_breaker():
+    breaker = CircuitBreaker(failure_threshold=1)
+    session = _Session(429)
+    provider = _provider(session, breaker)
+    with pytest.raises(APIError):
+        provider.rewrite(['loaded sentence'], api_key='caller-key')
+    assert breaker.state == 'closed'
+    with pytest.raises(APIError):
+        provider.rewrite(['loaded sentence'])
+    assert breaker.state == 'open'
+
+
+def test_retries_then_succeeds():
+    breaker = CircuitBreaker()
+    session = _Session(503, 200)
+    assert _provider(session, breaker).rewrite(['loaded sentence']) == ['neutral']
+    assert session.calls == 2
+    assert breaker.state == 'closed'
+
+
+class _JSONDecodeError(OSError, ValueError):
+    """Like requests.JSONDecodeError, which is both an OSError and a ValueError"""
+
+
+class _MalformedResponse(_Response):
+    def json(self):
+        raise _JSONDecodeError('Expecting value')
+
+
+class _MalformedSession(_Session):
+    def post(self, url, json=None, headers=None, timeout=None):
+        self.calls += 1
+        return _MalformedResponse(200)
+
+
+def test_malformed_body_is_not_retried_or_counted():
+    breaker = CircuitBreaker(failure_threshold=1)
+    session = _MalformedSession(200)
+    with pytest.raises(APIError, match='unusable response'):
+        _provider(session, breaker).rewrite(['loaded sentence'])
+    assert session.calls == 1
+    assert breaker.state == 'closed'
+
+
+def test_batches_respect_limits():
+    provider = RemoteRewriteProvider(max_batch_sentences=2, max_batch_chars=10)
+    assert provider.batches(['aaaa', 'bbbb', 'cccc', 'dddddddddd', 'e']) == [[0, 1], [2], [3], [4]]
@@ -0,0 +1,33 @@
+import pytest
+
+from backend.rate_limit import MemoryBucketStore, SQLiteBucketStore, TokenBucketLimiter
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBucketStore()
+    return SQLiteBucketStore(str(tmp_path / 'rate_limit.sqlite3'))
+
+
+def test_burst_up_to_capacity(store):
+    limiter = TokenBucketLimiter(store, capacity=3, period=3.0)
+    results = [limiter.acquire('client', now=100.0) for _ in range(4)]
+    assert [result.allowed for result in results] == [True, True, True, False]
+    assert results[2].remaining == 0
+    assert results[3].retry_after == pytest.approx(1.0)
+
+
+def test_refills_over_time(store):
+    limiter = TokenBucketLimiter(store, capacity=2, period=2.0)
+    assert limiter.acquire('client', now=0.0).allowed
+    assert limiter.acquire('client', now=0.0).allowed
+    assert not limiter.acquire('client', now=0.5).allowed
+    assert limiter.acquire('client', now=1.0).allowed
+
+
+def test_clients_are_independent(store):
+    limiter = TokenBucketLimiter(store, capacity=1, period=60.0)
+    assert limiter.acquire('a', now=0.0).allowed
+    assert not limiter.acquire('a', now=0.0).allowed
+    assert limiter.acquire('b', now=0.0).allowed
@@ -0,0 +1,49 @@
+import pytest
+
+from backend.rewriter import RuleRewriter
+
+
+@pytest.fixture
+def rewriter():
+    return RuleRewriter()
+
+
+@pytest.mark.parametrize('sentence, expected', [
+    ("This shameful legislation passed.", "This legislation passed."),
+    ("Heartless officials left.", "Officials left."),
+    ("It was an outrageous, heroic effort.", "It was an effort."),
+    ("An outrageous plan.", "A plan."),
+    ("It's nothing but a thinly veiled attempt.", "It's an attempt."),
+    ("Progressive lawmakers heroically fought back.", "Progressive lawmakers fought back."),
+    ("This bill will surely destroy jobs.", "This bill could reduce jobs."),
+    ("It is a power grab.", "It is an expansion of government authority."),
+])
+def test_rewrites(rewriter, sentence, expected):
+    rewritten, changes, _ = rewriter.rewrite_sentence(sentence)
+    assert rewritten == expected
+    assert changes > 0
+
+
+@pytest.mark.parametrize('sentence', [
+    "Critics said the plan was cruel to the poor.",
+    "The plan is cruel.",
+    "It is a very cruel plan.",
+    "He acted recklessly.",
+])
+def test_predicates_are_kept_as_residue(rewriter, sentence):
+    assert rewriter.rewrite_sentence(sentence) == (sentence, 0, True)
+
+
+@pytest.mark.parametrize('sentence', [
+    "Dangerous drivers were fined.",
+    "Extreme weather hit the coast.",
+    "The complete works were published.",
+])
+def test_literal_descriptors_are_untouched(rewriter, sentence):
+    assert rewriter.rewrite_sentence(sentence) == (sentence, 0, False)
+
+
+def test_residue_spans_point_into_rewritten_text(rewriter):
+    result = rewriter.rewrite("The shameful bill passed. Everyone must obviously agree.")
+    assert result.text == "The bill passed. Everyone must obviously agree."
+    assert [result.text[start:end] for start, end in result.residue] == ["Everyone must obviously agree."]
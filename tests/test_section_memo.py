@@ -0,0 +1,49 @@
+import pytest
+
+from backend import ai_processor
+from backend.cache import MemoryBackend
+
+
+@pytest.fixture
+def scored(monkeypatch):
+    """Sections sent to TextBlob, with an empty section cache"""
+    calls = []
+    analyze = ai_processor._analyze_sentiment
+
+    def counting(section):
+        calls.append(section)
+        return analyze(section)
+
+    monkeypatch.setattr(ai_processor, '_section_scores', MemoryBackend())
+    monkeypatch.setattr(ai_processor, '_analyze_sentiment', counting)
+    return calls
+
+
+def _article(*topics):
+    # One 999-character sentence per topic, so each is its own section whether
+    # sections are built from sentences or cut every 1000 characters
+    sentences = [(f"The {topic} report was good and fair, " + 'it covered the details and ' * 40)[:998] + '.'
+                 for topic in topics]
+    return ' '.join(sentences)
+
+
+def test_reanalysis_scores_only_edited_sections(scored):
+    first = ai_processor.analyze_text(_article('budget', 'housing', 'transit'), parallel=False)
+    assert len(scored) == 3
+
+    del scored[:]
+    edited = ai_processor.analyze_text(_article('budget', 'schools', 'transit'), parallel=False)
+    assert len(scored) == 1
+    assert 'schools' in scored[0]
+    assert edited.sentiment_score == pytest.approx(first.sentiment_score)
+
+
+def test_section_sentiment_reuses_scores(scored):
+    assert ai_processor._section_sentiment('A good plan.') == ai_processor._section_sentiment('A good plan.')
+    assert scored == ['A good plan.']
+
+
+def test_score_sections_keeps_order(scored):
+    results = ai_processor._score_sections(['A good plan.', 'A bad plan.', 'A good plan.'], parallel=False)
+    assert results[0] == results[2]
+    assert results[0][0] > 0 > results[1][0]
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from backend.similarity import ArticleIndex, HashingEmbedder
+
+TOPICS = ['budget tax spending deficit', 'football league goal match', 'vaccine hospital doctor patient',
+          'election ballot vote candidate', 'rocket orbit launch satellite']
+
+
+def _article(i):
+    topic = TOPICS[i % len(TOPICS)]
+    return f"{topic} {topic} report number{i} detail{i % 7}"
+
+
+def _fill(index, start, end):
+    for i in range(start, end):
+        index.add(_article(i), f'https://example.com/{i}', title=f'Article {i}')
+
+
+def test_embedding_is_normalised():
+    vector = HashingEmbedder(64).embed('The budget and the deficit')
+    assert vector.dtype == np.float32
+    assert np.linalg.norm(vector) == pytest.approx(1.0)
+    assert not HashingEmbedder(64).embed('the and of').any()
+
+
+def test_search_before_training(tmp_path):
+    index = ArticleIndex(str(tmp_path), dim=128, train_size=1000)
+    _fill(index, 0, 20)
+    assert index.add(_article(3), 'https://example.com/3') == 3
+    results = index.search(_article(3), k=3)
+    assert results[0]['url'] == 'https://example.com/3'
+    assert results[0]['score'] == pytest.approx(1.0, abs=1e-5)
+    assert 'https://example.com/3' not in [r['url'] for r in index.search(_article(3), exclude_url='https://example.com/3')]
+
+
+def test_retrains_as_the_index_doubles(tmp_path):
+    index = ArticleIndex(str(tmp_path), dim=128, train_size=64, nprobe=4)
+    _fill(index, 0, 64)
+    assert index._trained_rows == 64
+    nlist = len(index._centroids)
+
+    # Rows added after training are found before the next training picks them up
+    _fill(index, 64, 100)
+    assert index._trained_rows == 64
+    assert index.search(_article(99), k=1)[0]['url'] == 'https://example.com/99'
+
+    _fill(index, 100, 128)
+    assert index._trained_rows == 128
+    assert len(index._centroids) > nlist
+    assert index._lists == {}
+    assert list(tmp_path.glob('lists-*.f32')) != []
+
+
+def test_probed_lists_match_exhaustive_search(tmp_path):
+    index = ArticleIndex(str(tmp_path), dim=128, train_size=64, nprobe=100)
+    _fill(index, 0, 90)
+    # Probing every cluster scores every row exactly once
+    rows, scores = index._score(index.embedder.embed(_article(7)))
+    assert sorted(rows.tolist()) == list(range(90))
+    exhaustive = np.asarray(index._vectors) @ index.embedder.embed(_article(7))
+    assert scores == pytest.approx(exhaustive[rows], abs=1e-6)
+
+
+def test_reopened_index_sees_committed_rows(tmp_path):
+    index = ArticleIndex(str(tmp_path), dim=128, train_size=32)
+    _fill(index, 0, 40)
+    reopened = ArticleIndex(str(tmp_path), dim=128, train_size=32)
+    assert len(reopened) == 40
+    assert reopened.search(_article(38), k=1)[0]['title'] == 'Article 38'
+
+    # Rows written by another instance show up on the next query
+    _fill(index, 40, 41)
+    assert reopened.search(_article(40), k=1)[0]['url'] == 'https://example.com/40'
@@ -0,0 +1,86 @@
+import multiprocessing
+import threading
+
+import pytest
+
+from backend.singleflight import FileLockStore, SingleFlight, fcntl
+
+
+def test_concurrent_callers_share_one_computation():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 'value'
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do('key', compute)))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do('key', compute))) for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while flight.coalesced < len(followers):
+        threading.Event().wait(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert results == ['value'] * 5
+    assert len(calls) == 1
+    assert flight.coalesced == 4
+
+
+def test_errors_reach_every_caller_and_are_not_remembered():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        flight.do('key', fail)
+    assert flight.do('key', lambda: 'ok') == 'ok'
+
+
+def test_distinct_keys_do_not_wait_for_each_other():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.coalesced == 0
+
+
+@pytest.mark.skipif(fcntl is None, reason="needs fcntl record locks")
+def test_file_lock_store_excludes_other_processes(tmp_path):
+    path = str(tmp_path / 'locks')
+    context = multiprocessing.get_context('fork')
+    held, release = context.Event(), context.Event()
+
+    def hold():
+        with FileLockStore(path).hold('key'):
+            held.set()
+            release.wait(5)
+
+    child = context.Process(target=hold)
+    child.start()
+    try:
+        assert held.wait(5)
+        store = FileLockStore(path, timeout=0.05, poll_interval=0.01)
+        with store.hold('key') as acquired:
+            assert not acquired
+        with store.hold('other key') as acquired:
+            assert acquired
+    finally:
+        release.set()
+        child.join(5)
+    with store.hold('key') as acquired:
+        assert acquired
+
+
+def test_single_flight_with_lock_store(tmp_path):
+    flight = SingleFlight(FileLockStore(str(tmp_path / 'locks')))
+    assert flight.do('key', lambda: 42) == 42
@@ -0,0 +1,44 @@
+import pytest
+
+from backend.sketches import ContextSketch, HyperLogLog, merge_context_sketches
+from backend.vector_math import analyze_context_overlap
+
+
+@pytest.mark.parametrize('n', [10, 1000, 50000])
+def test_cardinality_within_error(n):
+    sketch = HyperLogLog.for_error(0.02).update(f'item-{i}' for i in range(n))
+    assert sketch.cardinality() == pytest.approx(n, rel=0.06)
+
+
+def test_merge_estimates_the_union():
+    a = HyperLogLog(12).update(f'item-{i}' for i in range(0, 6000))
+    b = HyperLogLog(12).update(f'item-{i}' for i in range(3000, 9000))
+    assert a.copy().merge(b).cardinality() == pytest.approx(9000, rel=0.06)
+    assert HyperLogLog.from_bytes(a.to_bytes()).cardinality() == a.cardinality()
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(10))
+
+
+def test_approximate_overlap_tracks_exact():
+    contexts = [
+        {'related_events': [f'event-{j}' for j in range(i * 50, i * 50 + 100)],
+         'missing_context': [f'context-{j % 30}' for j in range(i, i + 40)]}
+        for i in range(20)
+    ]
+    exact = analyze_context_overlap(contexts)
+    approximate = analyze_context_overlap(contexts, approximate=True)
+    for key in ('event_overlap', 'missing_context_overlap'):
+        assert approximate[key] == pytest.approx(exact[key], rel=0.06)
+
+
+def test_stored_sketches_merge_without_changing_inputs():
+    first = ContextSketch.from_context({'related_events': ['a', 'b'], 'missing_context': ['x']})
+    second = ContextSketch.from_dict(
+        ContextSketch.from_context({'related_events': ['b', 'c']}).to_dict()
+    )
+    merged = merge_context_sketches([first, second])
+    assert (merged.events_total, merged.missing_total) == (4, 1)
+    assert round(merged.events.cardinality()) == 3
+    assert first.events_total == 2 and round(first.events.cardinality()) == 2
+    assert merge_context_sketches([]) is None
+    assert analyze_context_overlap([first, second], approximate=True)['event_overlap'] == pytest.approx(0.75, rel=0.02)
@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from backend.app import app
+
+
+@pytest.fixture
+def client():
+    return app.test_client()
+
+
+ARTICLE = "The  plan was  obviously a terrible idea.   Critics must reject it."
+
+
+def test_streams_sections_then_summary(client):
+    response = client.post('/api/v2/analyze/stream', json={'content': ARTICLE})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    sections, summary = events[:-1], events[-1]
+    assert sections and all(event['type'] == 'section' for event in sections)
+    assert [event['index'] for event in sections] == list(range(sections[0]['total']))
+    assert summary['type'] == 'summary'
+    assert set(summary['metrics']) >= {'sentiment_score', 'subjectivity_score'}
+
+    # Offsets refer to the content as sent, before whitespace was collapsed
+    for event in sections:
+        for hit in event['highlights']:
+            assert ARTICLE[hit['start']:hit['end']].lower() == hit['text'].lower()
+    assert [hit['text'].lower() for event in sections for hit in event['highlights']] == \
+        ['obviously', 'terrible', 'must']
+
+
+def test_server_sent_events(client):
+    response = client.post('/api/v2/analyze/stream', json={'content': ARTICLE},
+                           headers={'Accept': 'text/event-stream'})
+    assert response.mimetype == 'text/event-stream'
+    records = response.get_data(as_text=True).strip().split('\n\n')
+    assert records[-1].startswith('event: summary\ndata: ')
+    assert all(record.startswith('event: section\n') for record in records[:-1])
+
+
+def test_rejects_missing_content(client):
+    response = client.post('/api/v2/analyze/stream', json={'url': 'https://example.com'})
+    assert response.status_code == 400
@@ -0,0 +1,44 @@
+import pytest
+
+from backend.text_utils import clean_text, clean_text_with_offsets
+
+SAMPLES = [
+    "<p>Hello&nbsp; <b>world</b></p>\n\n<div>Next</div>",
+    "Tom &amp; Jerry said &quot;hi&quot; &#8212; then left.",
+    "a &lt; b and c &gt; d",
+    "zero\u200bwidth\ufeff and\ttabs\r\nand  spaces",
+    "<!-- comment --><script>x</script>Café",
+    "   already clean text   ",
+]
+
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_clean_text_is_idempotent(text):
+    cleaned = clean_text(text)
+    assert clean_text(cleaned) == cleaned
+
+
+@pytest.mark.parametrize('text', SAMPLES)
+def test_offsets_variant_matches(text):
+    assert clean_text_with_offsets(text)[0] == clean_text(text)
+
+
+def test_strips_tags_and_decodes_entities():
+    assert clean_text("<p>Tom &amp; Jerry</p><p>left</p>") == "Tom & Jerry left"
+    assert clean_text("in<b>line</b>") == "inline"
+
+
+def test_less_than_in_prose_is_kept():
+    assert clean_text("if a < b and c > d") == "if a < b and c > d"
+
+
+def test_escaped_tags_are_kept_as_text():
+    assert clean_text("x &lt;b&gt; y") == "x <b> y"
+
+
+def test_offsets_map_back_to_original():
+    original = "<p>The <b>cruel</b> plan</p>"
+    cleaned, offsets = clean_text_with_offsets(original)
+    start = cleaned.index("cruel")
+    begin, end = offsets.span_to_original(start, start + len("cruel"))
+    assert original[begin:end] == "cruel"
@@ -0,0 +1,75 @@
+import re
+import threading
+import time
+
+import pytest
+
+from backend.app import app
+from backend.errors import ProfilerBusyError
+from backend.profiler import profile
+from backend.tracing import Trace
+
+
+def test_server_timing_sums_repeated_stages():
+    trace = Trace()
+    trace.add('sentiment', 0.002)
+    trace.add('lexicon_scan', 0.001)
+    trace.add('sentiment', 0.003)
+    header = trace.server_timing()
+    assert header.startswith('sentiment;dur=5.00;desc="x2", lexicon_scan;dur=1.00, total;dur=')
+
+
+def test_traced_requests_get_server_timing():
+    client = app.test_client()
+    content = {'content': 'The plan was obviously a terrible idea, critics said.'}
+    traced = client.post('/analyze', json=content, headers={'X-Trace': '1'})
+    assert traced.status_code == 200
+    names = [metric.split(';')[0] for metric in traced.headers['Server-Timing'].split(', ')]
+    assert names[-1] == 'total'
+    assert 'Server-Timing' not in client.post('/analyze', json=content).headers
+
+
+def _busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_samples_other_threads():
+    stop = threading.Event()
+    thread = threading.Thread(target=_busy_worker, args=(stop,), name='busy-worker')
+    thread.start()
+    try:
+        collapsed = profile(0.2, interval=0.005)
+    finally:
+        stop.set()
+        thread.join()
+    lines = collapsed.splitlines()
+    assert lines and all(re.fullmatch(r'.+ \d+', line) for line in lines)
+    busy = [line for line in lines if line.startswith('busy-worker;')]
+    assert busy and '_busy_worker (' in busy[0]
+
+
+def test_one_profile_at_a_time():
+    done = threading.Event()
+    thread = threading.Thread(target=lambda: (profile(0.3), done.set()))
+    thread.start()
+    time.sleep(0.05)
+    try:
+        with pytest.raises(ProfilerBusyError):
+            profile(0.1)
+    finally:
+        thread.join()
+    assert done.is_set()
+
+
+def test_admin_profile_requires_token(monkeypatch):
+    from main import app as main_app
+    client = main_app.test_client()
+    monkeypatch.delenv('ADMIN_TOKEN', raising=False)
+    assert client.get('/admin/profile').status_code == 404
+
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    assert client.get('/admin/profile', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    response = client.get('/admin/profile?seconds=0.1', headers={'Authorization': 'Bearer secret'})
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename="profile.collapsed"'
@@ -0,0 +1,74 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from backend.vector_math import (
+    OnlineStats, calculate_bias_similarity, calculate_variance, category_matrix, cosine_similarity,
+    pairwise_bias_similarity
+)
+
+
+def _distributions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    categories = ['political', 'emotional', 'framing', 'omission']
+    return [{cat: float(rng.random()) for cat in categories if rng.random() > 0.3} for _ in range(n)]
+
+
+def _pairwise_mean(category_lists):
+    """The original definition: mean cosine similarity over every pair, one pair at a time"""
+    categories = sorted({cat for cats in category_lists for cat in cats})
+    vectors = [[cats.get(cat, 0.0) for cat in categories] for cats in category_lists]
+    pairs = list(itertools.combinations(vectors, 2))
+    return sum(cosine_similarity(a, b) for a, b in pairs) / len(pairs)
+
+
+def test_category_matrix_aligns_columns():
+    matrix, columns = category_matrix([{'a': 1.0}, {'b': 2.0, 'a': 3.0}])
+    assert columns == ['a', 'b']
+    assert matrix.tolist() == [[1.0, 0.0], [3.0, 2.0]]
+
+
+@pytest.mark.parametrize('chunk_size', [None, 1, 7])
+def test_matches_pairwise_definition(chunk_size):
+    category_lists = _distributions(25)
+    assert calculate_bias_similarity(category_lists, chunk_size=chunk_size) == \
+        pytest.approx(_pairwise_mean(category_lists))
+
+
+def test_empty_distributions_have_zero_similarity():
+    similarities = pairwise_bias_similarity([{}, {'a': 1.0}, {'a': 2.0}])
+    assert similarities[0].tolist() == [0.0, 0.0, 0.0]
+    assert similarities[1, 2] == pytest.approx(1.0)
+    assert calculate_bias_similarity([{'a': 1.0}]) == 0.0
+
+
+def test_online_stats_match_numpy():
+    values = np.random.default_rng(1).normal(3.0, 2.0, size=1000)
+    stats = OnlineStats().update(values)
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var())
+    assert stats.sample_variance == pytest.approx(values.var(ddof=1))
+    assert (stats.min, stats.max) == (values.min(), values.max())
+    assert calculate_variance(values.tolist()) == pytest.approx(values.var())
+
+
+def test_merged_shards_equal_one_pass():
+    values = np.random.default_rng(2).random(300) * 100
+    shards = [OnlineStats().update(values[i:i + 70]) for i in range(0, 300, 70)]
+    merged = OnlineStats()
+    for shard in shards:
+        # Shards may come from other workers, serialized
+        merged.merge(OnlineStats.from_dict(shard.to_dict()))
+    assert merged.count == 300
+    assert merged.mean == pytest.approx(values.mean())
+    assert merged.variance == pytest.approx(values.var())
+    assert merged.merge(OnlineStats()).count == 300
+
+
+def test_empty_stats():
+    stats = OnlineStats()
+    assert (stats.variance, stats.sample_variance, stats.stddev) == (0.0, 0.0, 0.0)
+    assert stats.to_dict()['min'] == 0.0
+    assert calculate_variance([]) == 0.0